@@ -0,0 +1,33 @@
+import os
+
+from django.apps import AppConfig
+from django.core.exceptions import ImproperlyConfigured
+
+
+class ApiConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "api"
+
+    def ready(self):
+        from django.conf import settings
+        from django.contrib.auth.hashers import get_hasher
+        from django.core import checks
+
+        from . import search, signals  # noqa: F401
+
+        checks.register(search.check_fulltext_indexes, checks.Tags.database)
+
+        # A per-process response cache would keep serving pages another worker invalidated
+        responses = settings.CACHES.get("responses", {})
+        if responses.get("BACKEND", "").endswith(".LocMemCache") and int(os.getenv("WEB_CONCURRENCY", 1)) > 1:
+            raise ImproperlyConfigured(
+                "RESPONSE_CACHE_BACKEND=locmem is per process; use file or redis with more than one worker.",
+            )
+
+        # Fail at startup, not on the first login, when the policy's library is missing
+        hasher = get_hasher()
+        if hasher.library:
+            try:
+                hasher._load_library()
+            except ValueError as exc:
+                raise ImproperlyConfigured(f"PASSWORD_HASH_POLICY: {exc}") from exc
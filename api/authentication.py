@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+User = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f"auth_user_{user_id}"
+
+
+def get_cached_user(user_id):
+    """Load a user by id through the cache (bounded by ``AUTH_USER_CACHE_TTL``)."""
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.get(pk=user_id)
+        cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+    return user
+
+
+class ClaimsUser(TokenUser):
+    """User built from the access token's claims, without a database query.
+
+    Returned by ``ClaimsAuthentication`` (``SIMPLE_JWT["TOKEN_USER_CLASS"]``).
+    ``id``/``pk`` and ``is_authenticated`` come straight from the token,
+    which is all the API views need. Any other attribute (``email``,
+    ``first_name``, ...) loads the full ``User`` through the cached lookup.
+    """
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.user, attr)
+
+
+class ClaimsAuthentication(JWTStatelessUserAuthentication):
+    """Stateless JWT authentication that still checks the user before a write.
+
+    Reads trust the token's claims and run no user query. Writes load the user
+    through the cached lookup and fail with 401, as ``JWTAuthentication`` does,
+    when it was deleted or deactivated after the token was issued, instead of
+    reaching the database with an owner id that no longer exists.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and request.method not in SAFE_METHODS:
+            self.check_user(result[0])
+        return result
+
+    def check_user(self, claims_user):
+        try:
+            user = claims_user.user
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
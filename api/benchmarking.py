@@ -0,0 +1,107 @@
+"""Helpers shared by the ``benchmark_*`` management commands."""
+import datetime
+import json
+import statistics
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def percentile(values, pct):
+    """``pct``-th percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def latency_summary(latencies, elapsed, errors=0):
+    """Throughput and p50/p95/p99 latency (ms) for a list of durations in seconds."""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_load(task, requests, concurrency):
+    """Call ``task(i)`` for ``i`` in ``range(requests)`` from ``concurrency`` threads.
+
+    ``task`` returns ``(ok, extra)``; failed calls count as errors and are left
+    out of the latency figures. Returns ``(latencies, errors, extras, elapsed)``.
+    """
+    latencies, extras = [], []
+    errors = 0
+    lock = threading.Lock()
+    indexes = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        try:
+            while True:
+                with lock:
+                    index = next(indexes, None)
+                if index is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    ok, extra = task(index)
+                except Exception:
+                    ok, extra = False, None
+                duration = time.perf_counter() - started
+                with lock:
+                    if ok:
+                        latencies.append(duration)
+                        extras.append(extra)
+                    else:
+                        errors += 1
+        finally:
+            # Each thread opened its own DB connections
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, extras, time.perf_counter() - started
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def report_meta(**extra):
+    """Context recorded with every benchmark report so runs can be compared."""
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "database": connections["default"].vendor,
+        **extra,
+    }
+
+
+def write_report(report, path=None, stdout=None):
+    payload = json.dumps(report, indent=2, default=str)
+    if path:
+        with open(path, "w") as handle:
+            handle.write(payload + "\n")
+    elif stdout is not None:
+        stdout.write(payload)
+    return payload
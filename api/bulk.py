@@ -0,0 +1,236 @@
+"""Batch writes for patients and mappings.
+
+Each operation validates a whole array with a fixed number of ``IN`` queries,
+writes the valid items in one transaction with ``bulk_create``/``bulk_update``
+or a single scoped ``DELETE``, and reports a result per item.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+
+from . import counts, sync
+from .models import ChangeLog, Patient, Doctor, PatientDoctorMap
+from .queries import patient_queryset, mapping_queryset
+from .serializers import (
+    PatientSerializer, BulkPatientSerializer,
+    MappingListSerializer, BulkMappingItemSerializer,
+)
+
+# Marks an email claimed by an earlier item of the same batch
+_IN_BATCH = object()
+
+
+def is_id(value):
+    """An integer id; ``True`` and ``False`` are ints to Python but not ids."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_items(data, require_id=False):
+    """Reject payloads that are not a non-empty list within the batch limit."""
+    limit = settings.API_BULK_MAX_ITEMS
+    if not isinstance(data, list) or not data:
+        raise serializers.ValidationError({"detail": "Expected a non-empty list of items."})
+    if len(data) > limit:
+        raise serializers.ValidationError({"detail": f"At most {limit} items per request."})
+    if not all(isinstance(item, dict) for item in data):
+        raise serializers.ValidationError({"detail": "Every item must be an object."})
+    if require_id:
+        ids = [item.get("id") for item in data]
+        if not all(is_id(pk) for pk in ids):
+            raise serializers.ValidationError({"detail": "Every item needs an integer 'id'."})
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError({"detail": "Duplicate ids in request."})
+    return data
+
+
+def validate_ids(data):
+    """Accept ``{"ids": [...]}`` or a bare list of ids for bulk deletes."""
+    ids = data.get("ids") if isinstance(data, dict) else data
+    if not isinstance(ids, list) or not ids or not all(is_id(pk) for pk in ids):
+        raise serializers.ValidationError({"ids": "Expected a non-empty list of integer ids."})
+    if len(ids) > settings.API_BULK_MAX_ITEMS:
+        raise serializers.ValidationError({"detail": f"At most {settings.API_BULK_MAX_ITEMS} items per request."})
+    return list(dict.fromkeys(ids))
+
+
+def summarize(results, success_status):
+    """Response body and status for a list of per-item results."""
+    failed = sum(1 for result in results if result["status"] >= 400)
+    if failed == 0:
+        code = success_status
+    elif failed == len(results):
+        code = status.HTTP_400_BAD_REQUEST
+    else:
+        code = status.HTTP_207_MULTI_STATUS
+    body = {"succeeded": len(results) - failed, "failed": failed, "results": results}
+    return body, code
+
+
+def _error(index, errors, code=status.HTTP_400_BAD_REQUEST, **extra):
+    return {"index": index, "status": code, **extra, "errors": errors}
+
+
+def _conflict(results):
+    # A concurrent writer claimed a unique value between validation and insert
+    for result in results:
+        if result["status"] < 400:
+            result.update(status=status.HTTP_409_CONFLICT,
+                          errors={"detail": "Conflicting concurrent write; retry the item."})
+            result.pop("data", None)
+    return results
+
+
+def bulk_create_patients(user, data, context):
+    validate_items(data)
+    emails = {item.get("email") for item in data if isinstance(item.get("email"), str)}
+    taken = dict(Patient.objects.filter(email__in=emails).values_list("email", "id"))
+    context = {**context, "taken_emails": taken}
+
+    results, pending = [], []
+    for index, item in enumerate(data):
+        serializer = BulkPatientSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results.append(_error(index, serializer.errors))
+            continue
+        taken[serializer.validated_data["email"]] = _IN_BATCH
+        pending.append((len(results), Patient(created_by_id=user.id, **serializer.validated_data)))
+        results.append({"index": index, "status": status.HTTP_201_CREATED})
+
+    try:
+        with transaction.atomic():
+            Patient.objects.bulk_create([obj for _, obj in pending])
+            sync.record(user.id, ChangeLog.PATIENT, [obj.pk for _, obj in pending])
+    except IntegrityError:
+        return summarize(_conflict(results), status.HTTP_201_CREATED)
+    for position, obj in pending:
+        results[position].update(id=obj.pk, data=PatientSerializer(obj, context=context).data)
+    return summarize(results, status.HTTP_201_CREATED)
+
+
+def bulk_update_patients(user, data, context, partial=True):
+    validate_items(data, require_id=True)
+    instances = patient_queryset(user).in_bulk([item["id"] for item in data])
+    emails = {item.get("email") for item in data if isinstance(item.get("email"), str)}
+    taken = dict(Patient.objects.filter(email__in=emails).values_list("email", "id"))
+    context = {**context, "taken_emails": taken}
+
+    results, pending, fields = [], [], {"updated_at"}
+    now = timezone.now()
+    for index, item in enumerate(data):
+        instance = instances.get(item["id"])
+        if instance is None:
+            results.append(_error(index, {"detail": "Not found."}, status.HTTP_404_NOT_FOUND, id=item["id"]))
+            continue
+        payload = {key: value for key, value in item.items() if key != "id"}
+        serializer = BulkPatientSerializer(instance, data=payload, partial=partial, context=context)
+        if not serializer.is_valid():
+            results.append(_error(index, serializer.errors, id=instance.pk))
+            continue
+        for name, value in serializer.validated_data.items():
+            setattr(instance, name, value)
+            fields.add(name)
+        if "email" in serializer.validated_data:
+            taken[instance.email] = _IN_BATCH
+        instance.updated_at = now
+        pending.append((len(results), instance))
+        results.append({"index": index, "status": status.HTTP_200_OK, "id": instance.pk})
+
+    if pending:
+        try:
+            with transaction.atomic():
+                Patient.objects.bulk_update([obj for _, obj in pending], sorted(fields))
+                sync.record(user.id, ChangeLog.PATIENT, [obj.pk for _, obj in pending])
+        except IntegrityError:
+            return summarize(_conflict(results), status.HTTP_200_OK)
+    for position, obj in pending:
+        results[position]["data"] = PatientSerializer(obj, context=context).data
+    return summarize(results, status.HTTP_200_OK)
+
+
+def bulk_delete(queryset, data, record_deleted, fields=()):
+    """Delete the ids in ``data`` that ``queryset`` (already owner-scoped) contains.
+
+    ``record_deleted(found)`` writes the tombstones and adjusts relationship
+    counts, in the delete's transaction. ``found`` maps each id to the tuple
+    of ``fields`` read along with the ownership check.
+    """
+    ids = validate_ids(data)
+    with transaction.atomic():
+        # Touch the rows before reading them: the UPDATE locks them until the
+        # DELETE (on SQLite it takes the write lock, so the transaction never
+        # upgrades a read lock). A concurrent delete of the same ids either
+        # finished first, and its rows aren't found here, or waits for this one;
+        # either way each row is uncounted once.
+        queryset.filter(id__in=ids).update(updated_at=timezone.now())
+        found = {pk: tuple(values) for pk, *values in queryset.filter(id__in=ids).values_list("id", *fields)}
+        if found:
+            record_deleted(found)
+            queryset.model.objects.filter(id__in=found).delete()
+    results = [
+        {"id": pk, "status": status.HTTP_204_NO_CONTENT} if pk in found
+        else {"id": pk, "status": status.HTTP_404_NOT_FOUND, "errors": {"detail": "Not found."}}
+        for pk in ids
+    ]
+    return summarize(results, status.HTTP_200_OK)
+
+
+def bulk_delete_patients(user, data):
+    def record_deleted(found):
+        counts.patients_deleting(sync.record_patients_deleted(user.id, sorted(found)))
+
+    return bulk_delete(patient_queryset(user), data, record_deleted)
+
+
+def bulk_create_mappings(user, data, context):
+    validate_items(data)
+
+    def ids(key):
+        found = set()
+        for item in data:
+            try:
+                found.add(int(item.get(key)))
+            except (TypeError, ValueError):
+                pass
+        return found
+
+    owned = set(Patient.objects.filter(created_by_id=user.id, id__in=ids("patient")).values_list("id", flat=True))
+    doctors = set(Doctor.objects.filter(id__in=ids("doctor")).values_list("id", flat=True))
+    existing = set(
+        PatientDoctorMap.objects.filter(patient_id__in=owned, doctor_id__in=doctors)
+        .values_list("patient_id", "doctor_id")
+    )
+    context = {
+        **context, "expand": set(),
+        "owned_patients": owned, "doctors": doctors, "existing_pairs": existing,
+    }
+
+    results, pending = [], []
+    for index, item in enumerate(data):
+        serializer = BulkMappingItemSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results.append(_error(index, serializer.errors))
+            continue
+        patient, doctor = serializer.validated_data["patient"], serializer.validated_data["doctor"]
+        existing.add((patient, doctor))
+        pending.append((len(results), PatientDoctorMap(patient_id=patient, doctor_id=doctor, owner_id=user.id)))
+        results.append({"index": index, "status": status.HTTP_201_CREATED})
+
+    try:
+        with transaction.atomic():
+            PatientDoctorMap.objects.bulk_create([obj for _, obj in pending])
+            sync.record(user.id, ChangeLog.MAPPING, [obj.pk for _, obj in pending])
+            counts.mappings_added(user.id, [(obj.patient_id, obj.doctor_id) for _, obj in pending])
+    except IntegrityError:
+        return summarize(_conflict(results), status.HTTP_201_CREATED)
+    for position, obj in pending:
+        results[position].update(id=obj.pk, data=MappingListSerializer(obj, context=context).data)
+    return summarize(results, status.HTTP_201_CREATED)
+
+
+def bulk_delete_mappings(user, data):
+    def record_deleted(found):
+        sync.record(user.id, ChangeLog.MAPPING, sorted(found), deleted=True)
+        counts.mappings_removed(user.id, found.values())
+
+    return bulk_delete(mapping_queryset(user, expand=()), data, record_deleted, fields=("patient_id", "doctor_id"))
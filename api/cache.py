@@ -0,0 +1,59 @@
+"""Versioned cache for responses that are the same for every user.
+
+Entries are stored under the namespace's current version; a write bumps the
+version (see ``api.signals``) so every older entry stops being read at once
+and ages out through the cache's own eviction.
+"""
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.conf import settings
+
+RESPONSE_CACHE_ALIAS = "responses"
+
+
+def response_cache():
+    alias = RESPONSE_CACHE_ALIAS if RESPONSE_CACHE_ALIAS in settings.CACHES else "default"
+    return caches[alias]
+
+
+def _version_key(namespace):
+    return f"response-version:{namespace}"
+
+
+def namespace_version(namespace):
+    cache = response_cache()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Seed from the clock: if the counter was evicted, the new one still
+        # sorts after every version already used to store entries.
+        cache.add(_version_key(namespace), time.time_ns() // 1000, timeout=None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+async def anamespace_version(namespace):
+    """``namespace_version`` through the cache's async API."""
+    cache = response_cache()
+    version = await cache.aget(_version_key(namespace))
+    if version is None:
+        await cache.aadd(_version_key(namespace), time.time_ns() // 1000, timeout=None)
+        version = await cache.aget(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace):
+    cache = response_cache()
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), time.time_ns() // 1000, timeout=None)
+
+
+def response_cache_key(namespace, request):
+    """Key for ``request``: host, path, query parameters in sorted order and the negotiated format."""
+    query = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+    renderer = getattr(request, "accepted_renderer", None)
+    raw = f"{request.get_host()}|{request.path}|{query}|{getattr(renderer, 'format', '')}"
+    return f"response:{namespace}:{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}"
@@ -0,0 +1,115 @@
+"""Denormalized relationship counts: ``Patient.doctor_count`` and ``Doctor.patient_count``.
+
+Every write that adds or removes mappings adjusts both counters with ``F()``
+increments in its own transaction, so concurrent writers queue on the row
+lock instead of overwriting each other's counts, and a list ordered by
+caseload reads the column through an index instead of counting mappings.
+
+A new count is a new representation of the row: ``updated_at`` moves with
+it (ETag / Last-Modified) and patients get a sync entry for their owner.
+Counts don't bump the doctors' response-cache version, which would throw
+away the whole directory on every mapping write; cached doctor pages show
+a ``patient_count`` at most ``RESPONSE_CACHE_COUNT_TIMEOUT`` old. ``recount()`` rebuilds every counter
+from the mapping table (``manage.py recount_relationships``).
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import sync
+from .models import ChangeLog, Doctor, Patient, PatientDoctorMap
+
+
+def _deltas(ids, sign):
+    return {pk: sign * n for pk, n in Counter(ids).items()}
+
+
+def _apply(model, field, deltas, now):
+    """Add ``deltas[pk]`` to ``field`` of each row, one UPDATE per distinct delta."""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, ids in by_delta.items():
+        # In id order, so concurrent writers lock rows in the same order
+        model.objects.filter(id__in=sorted(ids)).update(**{field: F(field) + delta, "updated_at": now})
+    return sorted(pk for ids in by_delta.values() for pk in ids)
+
+
+def _change(owner_id, removed=(), added=()):
+    # Net the deltas first: a pair side that is both removed and added isn't written
+    patients, doctors = Counter(), Counter()
+    for pairs, sign in ((removed, -1), (added, 1)):
+        for patient_id, doctor_id in pairs:
+            patients[patient_id] += sign
+            doctors[doctor_id] += sign
+    if not patients:
+        return
+    now = timezone.now()
+    sync.record(owner_id, ChangeLog.PATIENT, _apply(Patient, "doctor_count", patients, now))
+    _apply(Doctor, "patient_count", doctors, now)
+
+
+def mappings_added(owner_id, pairs):
+    """Count new mappings, given as ``(patient_id, doctor_id)`` pairs of ``owner_id``'s patients.
+
+    Call inside the transaction that inserts them.
+    """
+    _change(owner_id, added=pairs)
+
+
+def mappings_removed(owner_id, pairs):
+    """Uncount mappings about to be deleted."""
+    _change(owner_id, removed=pairs)
+
+
+def mapping_moved(owner_id, before, after):
+    """Move a mapping's counts from its ``before`` pair to its ``after`` pair.
+
+    Only the patient or doctor that changed is written.
+    """
+    _change(owner_id, removed=[before], added=[after])
+
+
+def patients_deleting(mappings):
+    """Uncount, on their doctors, the mappings that cascade with deleted patients.
+
+    ``mappings`` are their ``(patient_id, doctor_id)`` pairs, as returned by
+    ``sync.record_patients_deleted``.
+    """
+    doctors = _deltas((doctor_id for _, doctor_id in mappings), -1)
+    if doctors:
+        _apply(Doctor, "patient_count", doctors, timezone.now())
+
+
+def doctor_deleting(patients):
+    """Uncount, on their patients, the mappings that cascade with a deleted doctor.
+
+    ``patients`` are ``(owner_id, patient_id)`` rows, as returned by
+    ``sync.record_doctor_deleted``.
+    """
+    owners = defaultdict(list)
+    for owner_id, patient_id in patients:
+        owners[owner_id].append(patient_id)
+    now = timezone.now()
+    for owner_id, patient_ids in owners.items():
+        _apply(Patient, "doctor_count", _deltas(patient_ids, -1), now)
+        sync.record(owner_id, ChangeLog.PATIENT, sorted(patient_ids))
+
+
+def recount():
+    """Set every counter to its number of mappings; returns how many rows were off."""
+    now = timezone.now()
+    corrected = 0
+    for model, field, column in ((Patient, "doctor_count", "patient"), (Doctor, "patient_count", "doctor")):
+        actual = Coalesce(Subquery(
+            PatientDoctorMap.objects.filter(**{column: OuterRef("pk")})
+            .order_by().values(column).annotate(total=Count("*")).values("total")
+        ), 0)
+        stale = model.objects.alias(actual=actual).exclude(**{field: F("actual")})
+        corrected += model.objects.filter(id__in=stale.values("id")).update(
+            **{field: actual, "updated_at": now},
+        )
+    return corrected
@@ -0,0 +1,122 @@
+"""Query-string filters for the patient and doctor lists.
+
+Every filter is served by an index (see the model ``Meta``), so a filtered
+page reads only matching rows, and the list's ETag aggregate and page count
+see the same filtered queryset. Name filters match a case-insensitive prefix
+of the first or last name as a range on ``LOWER(name)``: a plain index on
+that expression serves a range on every backend, where ``LIKE 'x%'`` cannot
+use one on SQLite (case-insensitive LIKE) or on PostgreSQL without a
+pattern-ops index.
+"""
+from datetime import date
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from . import search
+from .queries import DEFAULT_ORDERING
+
+
+def _text(params, name):
+    return (params.get(name) or "").strip()
+
+
+def _date(params, name):
+    raw = _text(params, name)
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise serializers.ValidationError({name: "Expected a date as YYYY-MM-DD."})
+
+
+def name_prefix(queryset, prefix):
+    """Rows whose first or last name starts with ``prefix``, ignoring case."""
+    start = prefix.lower()
+    end = start[:-1] + chr(ord(start[-1]) + 1)
+    return queryset.alias(
+        first_name_lower=Lower("first_name"), last_name_lower=Lower("last_name"),
+    ).filter(
+        Q(first_name_lower__gte=start, first_name_lower__lt=end)
+        | Q(last_name_lower__gte=start, last_name_lower__lt=end)
+    )
+
+
+def filter_patients(queryset, params):
+    """Apply ``email``, ``phone``, ``name`` and ``date_of_birth_after``/``_before`` (inclusive)."""
+    email = _text(params, "email")
+    if email:
+        queryset = queryset.filter(email=email)
+    phone = _text(params, "phone")
+    if phone:
+        queryset = queryset.filter(phone=phone)
+    name = _text(params, "name")
+    if name:
+        queryset = name_prefix(queryset, name)
+    born_after = _date(params, "date_of_birth_after")
+    if born_after:
+        queryset = queryset.filter(date_of_birth__gte=born_after)
+    born_before = _date(params, "date_of_birth_before")
+    if born_before:
+        queryset = queryset.filter(date_of_birth__lte=born_before)
+    return queryset
+
+
+def filter_doctors(queryset, params):
+    """Apply ``specialization`` (exact, ignoring case) and ``name``."""
+    specialization = _text(params, "specialization")
+    if specialization:
+        queryset = queryset.alias(specialization_lower=Lower("specialization")).filter(
+            specialization_lower=specialization.lower(),
+        )
+    name = _text(params, "name")
+    if name:
+        queryset = name_prefix(queryset, name)
+    return queryset
+
+
+class PatientFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        return filter_patients(queryset, request.query_params)
+
+
+class DoctorFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        return filter_doctors(queryset, request.query_params)
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """``?search=`` over the text columns of ``api.search.SEARCH_COLUMNS``."""
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        text = _text(request.query_params, self.search_param)
+        if not text:
+            return queryset
+        return search.search(queryset, text)
+
+
+class OrderingFilter(BaseFilterBackend):
+    """``?ordering=<field>`` or ``-<field>`` over the view's ``ordering_fields``.
+
+    The id breaks ties in the same direction, so every ordering is unique (as
+    keyset cursors need) and is served by one index read forwards or backwards.
+    Without the parameter the list keeps ``DEFAULT_ORDERING``.
+    """
+    ordering_param = "ordering"
+
+    def get_ordering(self, request, queryset, view):
+        raw = _text(request.query_params, self.ordering_param)
+        if not raw:
+            return DEFAULT_ORDERING
+        fields = getattr(view, "ordering_fields", ())
+        if raw.lstrip("-") not in fields:
+            choices = ", ".join(f"{field}, -{field}" for field in fields)
+            raise serializers.ValidationError({self.ordering_param: f"Expected one of: {choices}."})
+        return (raw, "-id" if raw.startswith("-") else "id")
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.order_by(*self.get_ordering(request, queryset, view))
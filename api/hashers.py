@@ -0,0 +1,190 @@
+"""Password hashers for ``settings.PASSWORD_HASH_POLICY``, with settings-driven costs.
+
+The policy's hasher comes first in ``PASSWORD_HASHERS`` and hashes new
+passwords. The others stay listed so stored hashes keep verifying, and
+Django's ``check_password`` rehashes a password stored with another hasher,
+or with other costs, on the user's next successful login. Raising a cost is
+therefore a settings change: no migration, no forced password reset.
+
+With ``PASSWORD_HASH_WORKERS`` > 0 every hash runs in a pool of that many
+processes instead of on the request thread, so logins can use at most that
+many CPUs per server process and the rest stay free for the API. At most
+``PASSWORD_HASH_QUEUE`` more hashes wait for a worker. Past that, hashes
+inside ``refuse_when_busy()`` (the API's login and registration) fail fast
+with ``HashingBusy``, a 503 from DRF, rather than queueing behind a spike;
+any other caller (the admin, management commands) hashes on its own thread,
+since nothing there would turn the exception into a 503.
+"""
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Settings read by the hashers below; a change replaces the cached instances
+COST_SETTINGS = {
+    "PASSWORD_PBKDF2_ITERATIONS", "PASSWORD_SCRYPT_WORK_FACTOR",
+    "PASSWORD_ARGON2_TIME_COST", "PASSWORD_ARGON2_MEMORY_COST", "PASSWORD_ARGON2_PARALLELISM",
+}
+
+# Set in pool workers, which hash in-line
+_in_worker = False
+
+_refuse_when_busy = contextvars.ContextVar("refuse_when_busy", default=False)
+# Set while a hash runs on the calling thread instead, so verify()'s own
+# encode() doesn't go back to the pool
+_inline = contextvars.ContextVar("inline", default=False)
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-ins in progress. Please try again shortly."
+    default_code = "hashing_busy"
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+class HashPool:
+    """A process pool admitting at most ``workers + queue`` hashes at a time."""
+
+    def __init__(self, workers, queue):
+        # spawn: workers inherit no threads, locks or DB connections from the
+        # server. They re-import its main module, which manage.py, gunicorn and
+        # uvicorn guard with `if __name__ == "__main__"`.
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_start_worker,
+        )
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, hasher, method, args, inline):
+        """``hasher.method(*args)`` in a worker; ``inline()`` computes the same on this thread."""
+        if not self.slots.acquire(blocking=False):
+            if _refuse_when_busy.get():
+                raise HashingBusy()
+            return _run_inline(inline)
+        try:
+            return self.executor.submit(_call, hasher, method, args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): the next hash starts a fresh
+            # pool, and this one is done here rather than failing the request
+            get_pool.cache_clear()
+            self.shutdown()
+            return _run_inline(inline)
+        finally:
+            self.slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_inline(inline):
+    token = _inline.set(True)
+    try:
+        return inline()
+    finally:
+        _inline.reset(token)
+
+
+@contextmanager
+def refuse_when_busy():
+    """Within the block, a full pool raises ``HashingBusy`` instead of hashing on the calling thread.
+
+    For DRF views, whose exception handler turns it into a 503 with ``Retry-After``.
+    """
+    token = _refuse_when_busy.set(True)
+    try:
+        yield
+    finally:
+        _refuse_when_busy.reset(token)
+
+
+def _start_worker():
+    global _in_worker
+    _in_worker = True
+
+
+def _call(hasher, method, args):
+    return getattr(hasher, method)(*args)
+
+
+@lru_cache(maxsize=None)
+def get_pool():
+    """The process's hashing pool, or None when hashing runs on the request thread."""
+    workers = getattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    if workers <= 0:
+        return None
+    return HashPool(workers, getattr(settings, "PASSWORD_HASH_QUEUE", 0))
+
+
+def _reset_pool():
+    pool = get_pool() if get_pool.cache_info().currsize else None
+    get_pool.cache_clear()
+    if pool is not None:
+        pool.shutdown()
+
+
+# A forked server worker can't use its parent's pool
+os.register_at_fork(after_in_child=get_pool.cache_clear)
+
+
+@receiver(setting_changed)
+def _reset_hashers(setting, **kwargs):
+    if setting in ("PASSWORD_HASH_WORKERS", "PASSWORD_HASH_QUEUE"):
+        _reset_pool()
+    elif setting in COST_SETTINGS:
+        hashers.get_hashers.cache_clear()
+        hashers.get_hashers_by_algorithm.cache_clear()
+
+
+class PooledHasherMixin:
+    """Runs ``encode``/``verify`` in ``get_pool()`` when there is one.
+
+    The hasher instance is sent to the worker with its costs, so a worker
+    never reads settings. ``verify`` goes as one call, ``encode`` included.
+    """
+
+    def encode(self, password, salt, *args, **kwargs):
+        inline = partial(super().encode, password, salt, *args, **kwargs)
+        pool = None if _in_worker or _inline.get() else get_pool()
+        if pool is None:
+            return inline()
+        return pool.run(self, "_encode", (password, salt, args, kwargs), inline)
+
+    def verify(self, password, encoded):
+        inline = partial(super().verify, password, encoded)
+        pool = None if _in_worker or _inline.get() else get_pool()
+        if pool is None:
+            return inline()
+        return pool.run(self, "verify", (password, encoded), inline)
+
+    def _encode(self, password, salt, args, kwargs):
+        return self.encode(password, salt, *args, **kwargs)
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    def __init__(self):
+        self.iterations = settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ScryptPasswordHasher(PooledHasherMixin, hashers.ScryptPasswordHasher):
+    def __init__(self):
+        self.work_factor = settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """Needs the ``argon2-cffi`` package; without it hashing raises ``ValueError``."""
+
+    def __init__(self):
+        self.time_cost = settings.PASSWORD_ARGON2_TIME_COST
+        self.memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+        self.parallelism = settings.PASSWORD_ARGON2_PARALLELISM
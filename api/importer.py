@@ -0,0 +1,411 @@
+"""Streaming CSV / NDJSON import of patients, doctors and mappings.
+
+Records are read lazily and handled in batches: each batch is validated with
+plain checks that mirror the serializers' rules, checked for duplicates with
+one ``IN`` query, and inserted with ``bulk_create(ignore_conflicts=True)`` in
+its own transaction. A file of any size is processed in constant memory.
+"""
+import codecs
+import csv
+import json
+import operator
+import time
+from collections import defaultdict
+from datetime import date
+from functools import reduce
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.html import strip_tags
+
+from . import counts, sync
+from .cache import bump_version
+from .models import ChangeLog, Doctor, Patient, PatientDoctorMap
+
+IMPORT_BATCH_SIZE = 5000
+# Patients per query when looking up a batch's mapping pairs
+MAPPED_CHUNK_SIZE = 500
+FORMATS = ("csv", "ndjson")
+
+
+class ImportFormatError(ValueError):
+    """The input can't be read as the requested format at all."""
+
+
+def detect_format(name=None, content_type=None):
+    """``csv`` or ``ndjson`` from a file name or a media type; None if neither says."""
+    if name:
+        for fmt, extensions in (("csv", (".csv",)), ("ndjson", (".ndjson", ".jsonl"))):
+            if name.lower().endswith(extensions):
+                return fmt
+    if content_type:
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type in ("text/csv", "application/csv"):
+            return "csv"
+        if media_type in ("application/x-ndjson", "application/jsonl", "application/jsonlines"):
+            return "ndjson"
+    return None
+
+
+def text_lines(binary):
+    """Decode a binary stream (an upload or the raw request body) line by line."""
+    return codecs.getreader("utf-8-sig")(binary)
+
+
+def read_records(lines, fmt):
+    """Yield ``(line_number, record)`` from an iterable of text lines.
+
+    ``record`` is a dict, or an error message for an NDJSON line that is not
+    a JSON object.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        if reader.fieldnames is None:
+            return
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "ndjson":
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, f"Invalid JSON: {error}"
+                continue
+            yield number, record if isinstance(record, dict) else "Expected a JSON object."
+    else:
+        raise ImportFormatError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+
+
+class ImportResult:
+    """Counters and the first ``max_rejects`` rejected rows of one import."""
+
+    def __init__(self, max_rejects):
+        self.read = self.created = self.rejected = 0
+        self.rejects = []
+        self.max_rejects = max_rejects
+        self.started = time.perf_counter()
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if self.max_rejects is None or len(self.rejects) < self.max_rejects:
+            self.rejects.append({"line": line, "errors": errors})
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        elapsed = self.elapsed
+        return {
+            "read": self.read,
+            "created": self.created,
+            "rejected": self.rejected,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.read / elapsed, 1) if elapsed else 0.0,
+            "rejects": self.rejects,
+        }
+
+
+def _field(model, name):
+    return model._meta.get_field(name)
+
+
+def _text(record, name, errors, model, required=True, html=False):
+    """Trimmed string value of ``name``, checked like a serializer CharField."""
+    value = record.get(name)
+    if value is None:
+        value = ""
+    if not isinstance(value, str):
+        value = str(value)
+    value = value.strip()
+    if not value:
+        if required:
+            errors[name] = "This field is required."
+        return value
+    max_length = _field(model, name).max_length
+    if max_length and len(value) > max_length:
+        errors[name] = f"Ensure this field has no more than {max_length} characters."
+    if html and "<" in value:
+        # XSS protection - strip HTML tags (the parser is slow, so only when there may be any)
+        value = strip_tags(value).strip()
+    return value
+
+
+def _email(record, errors, model):
+    value = _text(record, "email", errors, model)
+    if value and "email" not in errors:
+        try:
+            validate_email(value)
+        except ValidationError:
+            errors["email"] = "Enter a valid email address."
+    return value
+
+
+def _integer(record, name, errors):
+    value = record.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        # JSON true/false are ints to Python but not ids
+        if isinstance(value, bool):
+            raise TypeError
+        return int(value)
+    except (TypeError, ValueError):
+        errors[name] = "A valid integer is required."
+        return None
+
+
+class BaseImporter:
+    """Validate and insert records batch by batch; subclasses define one model."""
+    model = None
+    kind = None
+
+    def __init__(self, user=None, batch_size=IMPORT_BATCH_SIZE, dry_run=False, max_rejects=None,
+                 on_reject=None, on_batch=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.on_reject = on_reject
+        self.on_batch = on_batch
+        self.result = ImportResult(max_rejects)
+
+    def run(self, records):
+        records = iter(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self.result.read += len(batch)
+            originals = dict(batch)
+            valid = []
+            for line, item, errors in self.clean_batch(batch):
+                if errors:
+                    self.result.reject(line, errors)
+                    if self.on_reject:
+                        self.on_reject(line, originals.get(line), errors)
+                else:
+                    valid.append(item)
+            if valid:
+                self.result.created += len(valid) if self.dry_run else self.write(valid)
+            if self.on_batch:
+                self.on_batch(self.result)
+        if self.result.created and not self.dry_run:
+            self.finish()
+        return self.result
+
+    def clean_batch(self, batch):
+        """Yield ``(line, item, errors)``; ``item`` is an unsaved instance when valid."""
+        raise NotImplementedError
+
+    def write(self, objects):
+        """Insert ``objects`` in one transaction; returns how many rows were created."""
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def clean_emails(self, batch, clean_row):
+        """Shared flow for models with a unique email: row checks, then one IN query."""
+        cleaned = []
+        for line, record in batch:
+            if not isinstance(record, dict):
+                cleaned.append((line, record, {"detail": record}))
+                continue
+            errors = {}
+            values = clean_row(record, errors)
+            cleaned.append((line, values, errors))
+        emails = {values["email"] for _, values, errors in cleaned if not errors}
+        taken = set(self.model.objects.filter(email__in=emails).values_list("email", flat=True))
+        for line, values, errors in cleaned:
+            if not errors:
+                if values["email"] in taken:
+                    errors["email"] = f"A {self.kind} with this email already exists."
+                else:
+                    taken.add(values["email"])
+                    values = self.model(**values)
+            yield line, values, errors
+
+
+class PatientImporter(BaseImporter):
+    model = Patient
+    kind = "patient"
+
+    def clean_batch(self, batch):
+        def clean_row(record, errors):
+            values = {
+                "first_name": _text(record, "first_name", errors, Patient, html=True),
+                "last_name": _text(record, "last_name", errors, Patient, required=False, html=True),
+                "email": _email(record, errors, Patient),
+                "phone": _text(record, "phone", errors, Patient, required=False),
+                "date_of_birth": None,
+                "created_by_id": self.user.id,
+            }
+            if values["phone"] and len(values["phone"]) < 10:
+                errors["phone"] = "Phone number must be at least 10 digits."
+            raw = str(record.get("date_of_birth") or "").strip()
+            if raw:
+                try:
+                    values["date_of_birth"] = date.fromisoformat(raw)
+                except ValueError:
+                    errors["date_of_birth"] = "Date has wrong format. Use one of these formats instead: YYYY-MM-DD."
+            return values
+        return self.clean_emails(batch, clean_row)
+
+    def write(self, objects):
+        with transaction.atomic():
+            Patient.objects.bulk_create(objects, ignore_conflicts=True)
+            # ignore_conflicts returns no primary keys, and rows claimed by a
+            # concurrent writer were skipped: read back what is ours
+            ids = list(Patient.objects.filter(
+                created_by_id=self.user.id, email__in=[obj.email for obj in objects],
+            ).values_list("id", flat=True))
+            sync.record(self.user.id, ChangeLog.PATIENT, ids)
+        return len(ids)
+
+
+class DoctorImporter(BaseImporter):
+    model = Doctor
+    kind = "doctor"
+
+    def clean_batch(self, batch):
+        def clean_row(record, errors):
+            values = {
+                "first_name": _text(record, "first_name", errors, Doctor, html=True),
+                "last_name": _text(record, "last_name", errors, Doctor, required=False, html=True),
+                "email": _email(record, errors, Doctor),
+                "specialization": _text(record, "specialization", errors, Doctor),
+            }
+            if "specialization" not in errors and len(values["specialization"]) < 3:
+                errors["specialization"] = "Specialization must be at least 3 characters."
+            return values
+        return self.clean_emails(batch, clean_row)
+
+    def write(self, objects):
+        emails = [obj.email for obj in objects]
+        with transaction.atomic():
+            # ignore_conflicts returns no primary keys, so count the batch's
+            # emails before and after the insert. The "before" is a no-op
+            # UPDATE rather than a read: on SQLite it takes the write lock
+            # first (see sync.record_patients_deleted), so no other writer
+            # can claim an email in between.
+            existing = Doctor.objects.filter(email__in=emails).update(updated_at=F("updated_at"))
+            Doctor.objects.bulk_create(objects, ignore_conflicts=True)
+            return Doctor.objects.filter(email__in=emails).count() - existing
+
+    def finish(self):
+        # bulk_create sends no post_save; invalidate cached directory pages
+        bump_version("doctors")
+
+
+def _mapped(pairs):
+    """``(id, patient_id, doctor_id)`` of the mappings among ``(patient_id, doctor_id)`` pairs.
+
+    Pairs with a None side are ignored. Each patient becomes one
+    ``patient_id = ? AND doctor_id IN (...)`` term, a lookup on
+    unique_patient_doctor, so only the batch's own pairs are read rather than
+    every mapping of its patients; terms are sent ``MAPPED_CHUNK_SIZE``
+    patients per query to stay under SQLite's expression depth limit.
+    """
+    by_patient = defaultdict(set)
+    for patient, doctor in pairs:
+        if patient is not None and doctor is not None:
+            by_patient[patient].add(doctor)
+    patients = sorted(by_patient)
+    rows = []
+    for start in range(0, len(patients), MAPPED_CHUNK_SIZE):
+        terms = [Q(patient_id=patient, doctor_id__in=sorted(by_patient[patient]))
+                 for patient in patients[start:start + MAPPED_CHUNK_SIZE]]
+        rows += PatientDoctorMap.objects.filter(reduce(operator.or_, terms)).values_list(
+            "id", "patient_id", "doctor_id",
+        )
+    return rows
+
+
+class MappingImporter(BaseImporter):
+    """Mappings referencing patients and doctors by id (``patient``, ``doctor``)
+    or by email (``patient_email``, ``doctor_email``)."""
+    model = PatientDoctorMap
+    kind = "mapping"
+
+    def clean_batch(self, batch):
+        parsed = []
+        for line, record in batch:
+            if not isinstance(record, dict):
+                parsed.append((line, None, None, {"detail": record}))
+                continue
+            errors = {}
+            patient = _integer(record, "patient", errors)
+            doctor = _integer(record, "doctor", errors)
+            patient_email = str(record.get("patient_email") or "").strip()
+            doctor_email = str(record.get("doctor_email") or "").strip()
+            if patient is None and not patient_email and "patient" not in errors:
+                errors["patient"] = "Give patient (id) or patient_email."
+            if doctor is None and not doctor_email and "doctor" not in errors:
+                errors["doctor"] = "Give doctor (id) or doctor_email."
+            parsed.append((line, patient if patient is not None else patient_email,
+                           doctor if doctor is not None else doctor_email, errors))
+
+        def references(position):
+            return {item[position] for item in parsed if item[3] == {}}
+
+        patient_refs, doctor_refs = references(1), references(2)
+        owned = Patient.objects.filter(created_by_id=self.user.id)
+        patients = {pk: pk for pk in owned.filter(
+            id__in=[ref for ref in patient_refs if isinstance(ref, int)]).values_list("id", flat=True)}
+        patients.update(owned.filter(
+            email__in=[ref for ref in patient_refs if isinstance(ref, str)]).values_list("email", "id"))
+        doctors = {pk: pk for pk in Doctor.objects.filter(
+            id__in=[ref for ref in doctor_refs if isinstance(ref, int)]).values_list("id", flat=True)}
+        doctors.update(Doctor.objects.filter(
+            email__in=[ref for ref in doctor_refs if isinstance(ref, str)]).values_list("email", "id"))
+        existing = {(patient, doctor) for _, patient, doctor in _mapped(
+            (patients.get(patient_ref), doctors.get(doctor_ref))
+            for _, patient_ref, doctor_ref, errors in parsed if not errors
+        )}
+
+        for line, patient_ref, doctor_ref, errors in parsed:
+            if errors:
+                yield line, None, errors
+                continue
+            patient, doctor = patients.get(patient_ref), doctors.get(doctor_ref)
+            if patient is None:
+                errors["patient"] = "You can only map doctors to your own patients."
+            if doctor is None:
+                errors["doctor"] = f'Invalid doctor "{doctor_ref}" - object does not exist.'
+            if not errors and (patient, doctor) in existing:
+                errors["detail"] = "This doctor is already assigned to this patient."
+            if errors:
+                yield line, None, errors
+                continue
+            existing.add((patient, doctor))
+            yield line, PatientDoctorMap(patient_id=patient, doctor_id=doctor, owner_id=self.user.id), errors
+
+    def write(self, objects):
+        pairs = {(obj.patient_id, obj.doctor_id) for obj in objects}
+        with transaction.atomic():
+            PatientDoctorMap.objects.bulk_create(objects, ignore_conflicts=True)
+            # None of these pairs existed at validation time. One inserted by a
+            # concurrent writer since is counted twice; recount_relationships fixes that
+            inserted = [(pk, (patient, doctor)) for pk, patient, doctor in _mapped(pairs)]
+            sync.record(self.user.id, ChangeLog.MAPPING, [pk for pk, _ in inserted])
+            counts.mappings_added(self.user.id, [pair for _, pair in inserted])
+        return len(inserted)
+
+
+IMPORTERS = {
+    "patients": PatientImporter,
+    "doctors": DoctorImporter,
+    "mappings": MappingImporter,
+}
+
+
+def import_status(result):
+    """HTTP status for an upload, following the bulk endpoints' convention."""
+    if result.rejected == 0:
+        return 201
+    return 207 if result.created else 400
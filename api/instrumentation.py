@@ -0,0 +1,81 @@
+"""Per-request timing counters.
+
+``RequestTimingMiddleware`` installs a ``RequestMetrics`` for the current
+request; code anywhere in the request can add to it with ``span()``. When
+no request is being measured, ``span()`` costs one ContextVar lookup.
+"""
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, slow_query_samples=0):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = {}
+        self.depth = {}
+        self.slow_query_samples = slow_query_samples
+        # Min-heap of (duration, sql) keeping the slowest statements
+        self.slowest = []
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if self.slow_query_samples:
+            entry = (duration, sql)
+            if len(self.slowest) < self.slow_query_samples:
+                heapq.heappush(self.slowest, entry)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def add(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def slowest_queries(self):
+        return sorted(self.slowest, reverse=True)
+
+
+def current():
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to ``name``; nested spans of the same name count once."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    depth = metrics.depth.get(name, 0)
+    metrics.depth[name] = depth + 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth[name] = depth
+        if depth == 0:
+            metrics.add(name, time.perf_counter() - started)
+
+
+def query_recorder(metrics):
+    """``connection.execute_wrapper`` callable that feeds ``metrics``."""
+    def record(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - started)
+    return record
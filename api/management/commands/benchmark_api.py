@@ -0,0 +1,339 @@
+import itertools
+import json
+import re
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.benchmarking import latency_summary, report_meta, run_load, write_report
+from api.models import Patient, Doctor, PatientDoctorMap
+from api.management.commands.seed_benchmark_data import (
+    BENCH_PASSWORD, EMAIL_DOMAIN, FIRST_NAMES, SPECIALIZATIONS, USERNAME_PREFIX,
+)
+
+User = get_user_model()
+
+# Routes in api.urls that are deliberately not driven
+UNBENCHMARKED_ROUTES = {
+    # Takes CSV/NDJSON bodies rather than JSON; measured by `manage.py import_data`
+    "import",
+}
+
+
+class InProcessTransport:
+    """Drives the WSGI handler directly and counts the SQL statements of each request."""
+    counts_queries = True
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, token=None, body=None, remote_addr="127.0.0.1"):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client()
+        extra = {"REMOTE_ADDR": remote_addr}
+        if token:
+            extra["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        kwargs = {}
+        if body is not None:
+            kwargs = {"data": json.dumps(body), "content_type": "application/json"}
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = getattr(client, method.lower())(path, **kwargs, **extra)
+            # Streamed bodies run their queries while being consumed
+            content = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content, len(queries)
+
+    def token_for(self, user):
+        refresh = RefreshToken.for_user(user)
+        return str(refresh.access_token), str(refresh)
+
+
+SERVER_TIMING_QUERIES = re.compile(r'(?:^|,)\s*db;[^,]*desc="(\d+) queries"')
+
+
+class HttpTransport:
+    """Drives a running server over HTTP.
+
+    Query counts are read from the ``Server-Timing`` header, which the server
+    only sends with ``SERVER_TIMING_SAMPLE_RATE=1``.
+    """
+    counts_queries = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, token=None, body=None, remote_addr=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read(), self.query_count(response.headers)
+        except urllib.error.HTTPError as error:
+            return error.code, error.read(), self.query_count(error.headers)
+
+    @staticmethod
+    def query_count(headers):
+        match = SERVER_TIMING_QUERIES.search(headers.get("Server-Timing") or "")
+        return int(match.group(1)) if match else None
+
+    def token_for(self, user):
+        status, content, _ = self.request(
+            "POST", reverse("login"), body={"username": user.username, "password": BENCH_PASSWORD},
+        )
+        if status != 200:
+            raise CommandError(f"Could not log in as {user.username} ({status}): {content[:200]!r}")
+        tokens = json.loads(content)
+        return tokens["access"], tokens["refresh"]
+
+
+class Scenario:
+    def __init__(self, name, method, route, path, body=None, expect=(200,), auth=True, max_requests=None, collect=None):
+        self.name = name
+        self.method = method
+        self.route = route
+        self.path = path
+        self.body = body
+        self.expect = expect
+        self.auth = auth
+        self.max_requests = max_requests
+        self.collect = collect
+
+
+def build_scenarios(ctx):
+    """Every route in api.urls, reads first, then writes that clean up after themselves."""
+    patients, doctors, mappings, run = ctx["patients"], ctx["doctors"], ctx["mappings"], ctx["run"]
+    created, created_doctors = ctx["created"], ctx["created_doctors"]
+    bulk_created, bulk_mappings = ctx["bulk_created"], ctx["bulk_mappings"]
+
+    def pick(ids, i):
+        return ids[i % len(ids)]
+
+    def new_patient(i):
+        return {"first_name": "Load", "last_name": "Test", "email": f"run-{run}-{i}@{EMAIL_DOMAIN}",
+                "date_of_birth": "1990-01-01", "phone": "+919876543210"}
+
+    def remember(target):
+        return lambda content: target.append(json.loads(content)["id"])
+
+    def remember_bulk(target):
+        return lambda content: target.extend(r["id"] for r in json.loads(content)["results"] if "id" in r)
+
+    return [
+        Scenario("api-root", "GET", "api-root", lambda i: reverse("api-root")),
+        Scenario("patients-list", "GET", "patients-list", lambda i: reverse("patients-list") + "?page_size=100"),
+        Scenario("patients-list-deep", "GET", "patients-list",
+                 lambda i: reverse("patients-list") + f"?page_size=100&page={max(ctx['owned'] // 100, 1)}"),
+        Scenario("patients-list-cursor", "GET", "patients-list",
+                 lambda i: reverse("patients-list") + "?pagination=cursor&page_size=100"),
+        Scenario("patients-detail", "GET", "patients-detail", lambda i: reverse("patients-detail", args=[pick(patients, i)])),
+        Scenario("doctors-list", "GET", "doctors-list", lambda i: reverse("doctors-list") + "?page_size=100"),
+        Scenario("doctors-by-specialization", "GET", "doctors-list",
+                 lambda i: reverse("doctors-list") + "?specialization=" + urllib.parse.quote(SPECIALIZATIONS[i % len(SPECIALIZATIONS)])),
+        Scenario("doctors-by-caseload", "GET", "doctors-list",
+                 lambda i: reverse("doctors-list") + "?ordering=-patient_count&page_size=100"),
+        Scenario("patients-search", "GET", "patients-list",
+                 lambda i: reverse("patients-list") + f"?search={FIRST_NAMES[i % len(FIRST_NAMES)]}&pagination=cursor"),
+        Scenario("doctors-patients", "GET", "doctors-patients",
+                 lambda i: reverse("doctors-patients", args=[pick(doctors, i)]) + "?page_size=20"),
+        Scenario("doctors-patients-batch", "GET", "doctors-patients-batch",
+                 lambda i: reverse("doctors-patients-batch") + "?limit=10&ids=" + ",".join(
+                     str(pick(doctors, i * 100 + j)) for j in range(100))),
+        Scenario("doctors-detail", "GET", "doctors-detail", lambda i: reverse("doctors-detail", args=[pick(doctors, i)])),
+        Scenario("mappings-list", "GET", "mappings-list", lambda i: reverse("mappings-list") + "?page_size=100"),
+        Scenario("mappings-list-expanded", "GET", "mappings-list",
+                 lambda i: reverse("mappings-list") + "?page_size=100&expand=patient,doctor"),
+        Scenario("mappings-detail", "GET", "mappings-detail", lambda i: reverse("mappings-detail", args=[pick(mappings, i)])),
+        Scenario("mappings-by-patient", "GET", "mappings-by-patient",
+                 lambda i: reverse("mappings-by-patient", args=[pick(patients, i)])),
+        Scenario("patients-export", "GET", "patients-export", lambda i: reverse("patients-export"), max_requests=20),
+        Scenario("mappings-export", "GET", "mappings-export",
+                 lambda i: reverse("mappings-export") + "?format=csv", max_requests=20),
+        Scenario("patients-create", "POST", "patients-list", lambda i: reverse("patients-list"),
+                 body=new_patient, expect=(201,), collect=remember(created)),
+        Scenario("patients-update", "PATCH", "patients-detail",
+                 lambda i: reverse("patients-detail", args=[pick(created, i)]), body=lambda i: {"last_name": f"Updated{i}"}),
+        Scenario("mappings-create", "POST", "mappings-list", lambda i: reverse("mappings-list"),
+                 body=lambda i: {"patient": pick(created, i), "doctor": doctors[(i // len(created)) % len(doctors)]},
+                 expect=(201,)),
+        Scenario("patients-bulk-create", "POST", "patients-bulk", lambda i: reverse("patients-bulk"),
+                 body=lambda i: [new_patient(f"bulk-{i}-{j}") for j in range(100)],
+                 expect=(201,), max_requests=50, collect=remember_bulk(bulk_created)),
+        Scenario("mappings-bulk-create", "POST", "mappings-bulk", lambda i: reverse("mappings-bulk"),
+                 body=lambda i: [{"patient": pick(bulk_created, i * 100 + j), "doctor": pick(doctors, i)} for j in range(100)],
+                 expect=(201,), max_requests=50, collect=remember_bulk(bulk_mappings)),
+        # Replays the change log written by the scenarios above
+        Scenario("sync", "GET", "sync", lambda i: reverse("sync") + "?since=0&limit=500"),
+        Scenario("mappings-bulk-delete", "DELETE", "mappings-bulk", lambda i: reverse("mappings-bulk"),
+                 body=lambda i: {"ids": bulk_mappings[i * 100:(i + 1) * 100] or [0]}, expect=(200, 400), max_requests=50),
+        Scenario("patients-bulk-delete", "DELETE", "patients-bulk", lambda i: reverse("patients-bulk"),
+                 body=lambda i: {"ids": bulk_created[i * 100:(i + 1) * 100] or [0]}, expect=(200, 400), max_requests=50),
+        Scenario("patients-delete", "DELETE", "patients-detail",
+                 lambda i: reverse("patients-detail", args=[pick(created, i)]), expect=(204, 404)),
+        Scenario("doctors-create", "POST", "doctors-list", lambda i: reverse("doctors-list"),
+                 body=lambda i: {"first_name": "Load", "email": f"run-{run}-doctor{i}@{EMAIL_DOMAIN}",
+                                 "specialization": "Cardiology"},
+                 expect=(201,), collect=remember(created_doctors)),
+        Scenario("doctors-delete", "DELETE", "doctors-detail",
+                 lambda i: reverse("doctors-detail", args=[pick(created_doctors, i)]), expect=(204, 404)),
+        Scenario("auth-register", "POST", "register", lambda i: reverse("register"), auth=False,
+                 body=lambda i: {"username": f"run-{run}-{i}", "email": f"run-{run}-{i}@{EMAIL_DOMAIN}",
+                                 "name": "Load", "password": "Zx9!kq2PLm-load", "password_confirm": "Zx9!kq2PLm-load"},
+                 expect=(201,), max_requests=50),
+        Scenario("auth-login", "POST", "login", lambda i: reverse("login"), auth=False,
+                 body=lambda i: {"username": ctx["user"].username, "password": BENCH_PASSWORD}, max_requests=50),
+        # A refresh blacklists the token it rotates, so each one needs its own
+        # (minted here: the server must share this tree's SECRET_KEY)
+        Scenario("auth-refresh", "POST", "token_refresh", lambda i: reverse("token_refresh"), auth=False,
+                 body=lambda i: {"refresh": str(RefreshToken.for_user(ctx["user"]))}, max_requests=50),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every API route under concurrency and report p50/p95/p99 latency, "
+        "requests per second and SQL queries per request as JSON. "
+        "Seed data first with seed_benchmark_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable).")
+        parser.add_argument("--base-url", help="Benchmark a running server (e.g. http://localhost:8000) instead of in-process.")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--compare", help="Previous JSON report to print deltas against.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=f"{USERNAME_PREFIX}0").first()
+        if user is None:
+            raise CommandError("No benchmark data; run `manage.py seed_benchmark_data` first.")
+
+        if options["base_url"]:
+            transport = HttpTransport(options["base_url"])
+            return self.run(transport, user, options)
+        # Rate limits and HTTPS redirects would otherwise dominate an in-process run
+        with override_settings(
+            RATE_LIMIT={"BACKEND": "api.ratelimit.DummyRateLimitBackend"},
+            ALLOWED_HOSTS=["*"], SECURE_SSL_REDIRECT=False, API_QUERY_BUDGET_MODE="off",
+        ):
+            return self.run(InProcessTransport(), user, options)
+
+    def run(self, transport, user, options):
+        access, _ = transport.token_for(user)
+        run = uuid.uuid4().hex[:8]
+        patients = list(Patient.objects.filter(created_by_id=user.id).order_by("-id").values_list("id", flat=True)[:1000])
+        doctors = list(Doctor.objects.order_by("id").values_list("id", flat=True)[:1000])
+        mappings = list(
+            PatientDoctorMap.objects.filter(owner_id=user.id).order_by("-id").values_list("id", flat=True)[:1000]
+        )
+        if not patients or not doctors or not mappings:
+            raise CommandError("Benchmark user has no patients or mappings, or there are no doctors; re-run seed_benchmark_data.")
+        ctx = {
+            "user": user, "run": run, "patients": patients, "doctors": doctors, "mappings": mappings,
+            "owned": Patient.objects.filter(created_by_id=user.id).count(),
+            "created": [], "created_doctors": [], "bulk_created": [], "bulk_mappings": [],
+        }
+        scenarios = build_scenarios(ctx)
+        self.check_coverage(scenarios)
+        selected = options["scenario"]
+        if selected:
+            unknown = set(selected) - {s.name for s in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [s for s in scenarios if s.name in selected]
+
+        results = {}
+        try:
+            for scenario in scenarios:
+                results[scenario.name] = self.run_scenario(transport, scenario, access, options)
+                summary = results[scenario.name]
+                self.stderr.write(
+                    f"{scenario.name:<24} {summary['rps']:>8} rps  p50 {summary['p50_ms']:>8} ms  "
+                    f"p95 {summary['p95_ms']:>8} ms  p99 {summary['p99_ms']:>8} ms  "
+                    f"queries {summary['queries_avg']}  errors {summary['errors']}"
+                )
+        finally:
+            self.cleanup(run)
+
+        report = {
+            "meta": report_meta(
+                mode="http" if options["base_url"] else "in-process",
+                concurrency=options["concurrency"], requests_per_scenario=options["requests"],
+                dataset={
+                    "users": User.objects.count(), "patients": Patient.objects.count(),
+                    "doctors": Doctor.objects.count(), "mappings": PatientDoctorMap.objects.count(),
+                    "patients_of_benchmark_user": ctx["owned"],
+                },
+            ),
+            "scenarios": results,
+        }
+        if options["compare"]:
+            self.compare(report, options["compare"])
+        write_report(report, options["output"], self.stdout)
+
+    def run_scenario(self, transport, scenario, access, options):
+        requests = min(options["requests"], scenario.max_requests or options["requests"])
+        # A distinct client address per request keeps per-IP auth limits out of the way
+        addresses = itertools.count(1)
+
+        def task(i):
+            body = scenario.body(i) if scenario.body else None
+            n = next(addresses)
+            ip = f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+            status, content, queries = transport.request(
+                scenario.method, scenario.path(i), token=access if scenario.auth else None,
+                body=body, remote_addr=ip,
+            )
+            ok = status in scenario.expect
+            if ok and scenario.collect:
+                scenario.collect(content)
+            return ok, queries
+
+        latencies, errors, queries, elapsed = run_load(task, requests, options["concurrency"])
+        summary = {"method": scenario.method, "route": scenario.route, **latency_summary(latencies, elapsed, errors)}
+        counted = [q for q in queries if q is not None]
+        summary["queries_avg"] = round(sum(counted) / len(counted), 2) if counted else None
+        summary["queries_max"] = max(counted) if counted else None
+        return summary
+
+    def check_coverage(self, scenarios):
+        resolver = get_resolver("api.urls")
+        names = {name for name in resolver.reverse_dict if isinstance(name, str)}
+        missing = names - {s.route for s in scenarios} - UNBENCHMARKED_ROUTES
+        if missing:
+            self.stderr.write(self.style.WARNING(f"Routes without a scenario: {', '.join(sorted(missing))}"))
+
+    def cleanup(self, run):
+        Patient.objects.filter(email__startswith=f"run-{run}-").delete()
+        Doctor.objects.filter(email__startswith=f"run-{run}-").delete()
+        User.objects.filter(username__startswith=f"run-{run}-").delete()
+
+    def compare(self, report, path):
+        with open(path) as handle:
+            baseline = json.load(handle)
+        self.stderr.write(f"\nvs {path} (revision {baseline['meta'].get('revision')}):")
+        for name, current in report["scenarios"].items():
+            before = baseline.get("scenarios", {}).get(name)
+            if not before:
+                continue
+
+            def delta(key):
+                return f"{(current[key] - before[key]) / before[key] * 100:+.1f}%" if before[key] else "n/a"
+
+            self.stderr.write(
+                f"{name:<24} rps {delta('rps'):>8}  p95 {delta('p95_ms'):>8}  "
+                f"queries {before['queries_avg']} -> {current['queries_avg']}"
+            )
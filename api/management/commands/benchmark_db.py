@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from api.benchmarking import percentile
+from api.models import Patient
+from api.queries import patient_queryset
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent write/read throughput of the configured database. "
+        "Run it once with DB_ENGINE=sqlite and once with DB_ENGINE=postgres to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent threads, each with its own connection.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run.")
+        parser.add_argument("--write-ratio", type=float, default=0.5, help="Share of operations that insert a patient.")
+        parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+        parser.add_argument("--keep", action="store_true", help="Keep the rows written by the benchmark.")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username="benchmark-db")
+        run = uuid.uuid4().hex[:8]
+        deadline = time.perf_counter() + options["duration"]
+        results = []
+        lock = threading.Lock()
+
+        def worker(index):
+            latencies, errors, writes = [], 0, 0
+            step = 0
+            try:
+                while time.perf_counter() < deadline:
+                    step += 1
+                    write = (step * options["write_ratio"]) % 1 < options["write_ratio"]
+                    started = time.perf_counter()
+                    try:
+                        if write:
+                            with transaction.atomic():
+                                Patient.objects.create(
+                                    created_by_id=user.id, first_name="Bench",
+                                    email=f"bench-{run}-{index}-{step}@example.com",
+                                )
+                            writes += 1
+                        else:
+                            list(patient_queryset(user)[:20])
+                    except OperationalError:
+                        # e.g. SQLite "database is locked" under write contention
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                results.append((latencies, errors, writes))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options["workers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(l for result in results for l in result[0])
+        report = {
+            "vendor": connection.vendor,
+            "workers": options["workers"],
+            "duration_s": round(elapsed, 2),
+            "operations": len(latencies),
+            "writes": sum(r[2] for r in results),
+            "errors": sum(r[1] for r in results),
+            "ops_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+
+        if not options["keep"]:
+            Patient.objects.filter(email__startswith=f"bench-{run}-").delete()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report))
+        else:
+            for key, value in report.items():
+                self.stdout.write(f"{key:>12}: {value}")
@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from api.benchmarking import latency_summary, report_meta, run_load, write_report
+from api.management.commands.seed_benchmark_data import BENCH_PASSWORD, USERNAME_PREFIX
+
+User = get_user_model()
+
+
+def policy_hashers(policy):
+    """``PASSWORD_HASHERS`` as settings.py builds it for ``policy``."""
+    return [
+        settings.PASSWORD_HASH_POLICIES[policy],
+        *(path for name, path in settings.PASSWORD_HASH_POLICIES.items() if name != policy),
+        *settings.PASSWORD_HASHERS[len(settings.PASSWORD_HASH_POLICIES):],
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Logins per second through POST /api/auth/login/ for each password-hashing policy, with "
+        "hashing on the request thread and in the api.hashers process pool. Costs come from the "
+        "PASSWORD_* settings. Policies whose library isn't installed are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--policy", action="append", choices=list(settings.PASSWORD_HASH_POLICIES),
+            help="Only run these policies (repeatable).",
+        )
+        parser.add_argument("--logins", type=int, default=100, help="Timed logins per run.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--workers", type=int, action="append",
+            help="PASSWORD_HASH_WORKERS values to run (repeatable; 0 hashes on the request thread). Default: 0 and 2.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        policies = options["policy"] or list(settings.PASSWORD_HASH_POLICIES)
+        worker_counts = options["workers"] or [0, 2]
+        results, skipped = {}, {}
+        # Rate limits and HTTPS redirects would otherwise dominate an in-process run
+        with override_settings(
+            RATE_LIMIT={"BACKEND": "api.ratelimit.DummyRateLimitBackend"},
+            ALLOWED_HOSTS=["*"], SECURE_SSL_REDIRECT=False,
+        ):
+            for policy in policies:
+                with override_settings(PASSWORD_HASHERS=policy_hashers(policy)):
+                    hasher = get_hasher()
+                    try:
+                        if hasher.library:
+                            hasher._load_library()
+                    except ValueError as exc:
+                        skipped[policy] = str(exc)
+                        self.stderr.write(f"{policy}: skipped ({exc})")
+                        continue
+                    results[policy] = self.run_policy(policy, worker_counts, options)
+
+        if not results:
+            raise CommandError("No policy could run.")
+        report = {
+            "meta": report_meta(logins=options["logins"], concurrency=options["concurrency"]),
+            "policies": results,
+            "skipped": skipped,
+        }
+        write_report(report, options["output"], self.stdout)
+
+    def run_policy(self, policy, worker_counts, options):
+        encoded = make_password(BENCH_PASSWORD)
+        params = {key: value for key, value in get_hasher().decode(encoded).items() if key not in ("hash", "salt")}
+        user, _ = User.objects.update_or_create(
+            username=f"{USERNAME_PREFIX}hashing-{policy}", defaults={"password": encoded},
+        )
+        started = time.perf_counter()
+        make_password(BENCH_PASSWORD)
+        result = {"params": params, "hash_ms": round((time.perf_counter() - started) * 1000, 1), "runs": {}}
+        try:
+            for workers in worker_counts:
+                self.stderr.write(f"{policy}, {workers} hashing workers ...")
+                with override_settings(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE=options["logins"]):
+                    # Start the pool's processes outside the timed run
+                    for _ in range(workers):
+                        make_password(BENCH_PASSWORD)
+                    result["runs"][f"workers={workers}"] = self.run_logins(user, options)
+        finally:
+            user.delete()
+        return result
+
+    def run_logins(self, user, options):
+        local, statuses = threading.local(), []
+        body = {"username": user.username, "password": BENCH_PASSWORD}
+
+        def task(i):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+            response = client.post(reverse("login"), body, content_type="application/json")
+            statuses.append(response.status_code)
+            return response.status_code == 200, None
+
+        latencies, errors, _, elapsed = run_load(task, options["logins"], options["concurrency"])
+        stored = User.objects.get(pk=user.pk).password
+        if stored != user.password:
+            raise CommandError(f"{user.username}'s password was rehashed during the run; check the policy's costs.")
+        return {**latency_summary(latencies, elapsed, errors), "busy": statuses.count(503)}
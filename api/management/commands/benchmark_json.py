@@ -0,0 +1,115 @@
+import io
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import latency_summary, report_meta, write_report
+from api.management.commands.benchmark_serializers import cases as serializer_cases
+from api.management.commands.seed_benchmark_data import USERNAME_PREFIX
+from api.parsers import FastJSONParser, orjson
+from api.renderers import FastJSONRenderer
+from api.rows import RowSerializer
+
+User = get_user_model()
+
+
+def page_bodies(user, page_size):
+    """The data each response renders: list pages as the list views return them,
+    plus a page of raw ``.values()`` rows (dates and datetimes, not strings)."""
+    bodies = {}
+    for name, (queryset, serializer) in serializer_cases(user).items():
+        rows = RowSerializer(serializer)
+        results = rows.represent(rows.values(queryset)[:page_size])
+        bodies[name] = {"next": f"http://testserver/api/{name}/?cursor=cD0yMDI0", "previous": None, "results": results}
+    patients, _ = serializer_cases(user)["patients"]
+    bodies["patients-native"] = {"next": None, "previous": None, "results": list(patients.values()[:page_size])}
+    return bodies
+
+
+def bulk_payload(user, size):
+    """A ``POST /api/patients/bulk/`` body: ``size`` patients as a client would send them."""
+    patients, _ = serializer_cases(user)["patients"]
+    fields = ("first_name", "last_name", "email", "date_of_birth", "phone")
+    items = [
+        {**row, "email": f"bulk{i}.{row['email']}", "date_of_birth": row["date_of_birth"].isoformat()}
+        for i, row in enumerate(patients.values(*fields)[:size])
+    ]
+    return json.dumps(items, ensure_ascii=False).encode()
+
+
+def parse(parser, body):
+    return parser.parse(io.BytesIO(body), "application/json", {"encoding": "utf-8"})
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's stdlib JSONRenderer/JSONParser against api.renderers.FastJSONRenderer and "
+        "api.parsers.FastJSONParser (orjson) on patient and mapping list pages and a bulk-create body, "
+        "and check both give the same bytes and the same data. Seed data first with seed_benchmark_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--bulk-size", type=int, default=1000, help="Patients in the parsed bulk-create body.")
+        parser.add_argument("--iterations", type=int, default=200, help="Timed runs per backend and case.")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson isn't installed; FastJSONRenderer and FastJSONParser would use the stdlib.")
+        user = User.objects.filter(username=f"{USERNAME_PREFIX}0").first()
+        if user is None:
+            raise CommandError("No benchmark data; run `manage.py seed_benchmark_data` first.")
+
+        iterations = options["iterations"]
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        render, parse_ = {}, {}
+        for name, data in page_bodies(user, options["page_size"]).items():
+            self.stderr.write(f"render {name} ...")
+            body = stdlib.render(data)
+            if fast.render(data) != body:
+                raise CommandError(f"{name}: FastJSONRenderer doesn't render the same bytes as JSONRenderer.")
+            render[name] = {"bytes": len(body), **self.compare(lambda: stdlib.render(data), lambda: fast.render(data), iterations)}
+            # Parsing the page back, as a client of the API would
+            parse_[name] = {"bytes": len(body), **self.parse_case(body, iterations)}
+
+        self.stderr.write("parse bulk ...")
+        body = bulk_payload(user, options["bulk_size"])
+        parse_["patients-bulk"] = {"bytes": len(body), **self.parse_case(body, iterations)}
+
+        report = {
+            "meta": report_meta(
+                page_size=options["page_size"], bulk_size=options["bulk_size"], iterations=iterations,
+                orjson=orjson.__version__, json_backend=settings.API_JSON_BACKEND,
+            ),
+            "render": render,
+            "parse": parse_,
+        }
+        write_report(report, options["output"], self.stdout)
+
+    def parse_case(self, body, iterations):
+        stdlib, fast = JSONParser(), FastJSONParser()
+        if parse(fast, body) != parse(stdlib, body):
+            raise CommandError("FastJSONParser doesn't parse the same data as JSONParser.")
+        return self.compare(lambda: parse(stdlib, body), lambda: parse(fast, body), iterations)
+
+    @staticmethod
+    def compare(stdlib, fast, iterations):
+        timings = {"stdlib": [], "orjson": []}
+        # Interleaved, so drift hits both alike
+        for _ in range(iterations):
+            for label, run in (("stdlib", stdlib), ("orjson", fast)):
+                started = time.perf_counter()
+                run()
+                timings[label].append(time.perf_counter() - started)
+        summary = {
+            label: {**latency_summary(latencies, sum(latencies)), "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1)}
+            for label, latencies in timings.items()
+        }
+        summary["speedup"] = round(summary["stdlib"]["mean_us"] / summary["orjson"]["mean_us"], 2)
+        return summary
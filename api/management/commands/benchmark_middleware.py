@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.benchmarking import latency_summary, report_meta, write_report
+from api.models import Patient
+from api.management.commands.seed_benchmark_data import USERNAME_PREFIX
+
+User = get_user_model()
+
+# LEAN_MIDDLEWARE_PATHS per profile: "full" runs every middleware on /api/ as before
+PROFILES = {
+    "full": [],
+    "lean": ["/api/"],
+}
+
+# Requests per profile before switching to the other, so drift hits both alike
+BLOCK_SIZE = 100
+
+
+def request_paths(patient):
+    return {
+        # Cheapest route: the middleware is most of its cost
+        "api-root": reverse("api-root"),
+        "patients-detail": reverse("patients-detail", args=[patient]),
+        "doctors-list": reverse("doctors-list") + "?page_size=20",
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of the middleware the API skips (LEAN_MIDDLEWARE_PATHS) "
+        "by timing the same in-process requests with and without it, under the WSGI and ASGI handlers. "
+        "Seed data first with seed_benchmark_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Timed requests per route and profile.")
+        parser.add_argument("--warmup", type=int, default=50, help="Untimed requests per route and profile.")
+        parser.add_argument("--interface", action="append", choices=["wsgi", "asgi"],
+                            help="Only run these handlers (repeatable).")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=f"{USERNAME_PREFIX}0").first()
+        if user is None:
+            raise CommandError("No benchmark data; run `manage.py seed_benchmark_data` first.")
+        patient = Patient.objects.filter(created_by_id=user.id).values_list("id", flat=True).first()
+        if patient is None:
+            raise CommandError("Benchmark user has no patients; re-run seed_benchmark_data.")
+        headers = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+        paths = request_paths(patient)
+
+        results = {}
+        # Only the middleware differs between profiles: no throttling, redirects or timing
+        with override_settings(
+            RATE_LIMIT={"BACKEND": "api.ratelimit.DummyRateLimitBackend"},
+            ALLOWED_HOSTS=["*"], SECURE_SSL_REDIRECT=False, API_QUERY_BUDGET_MODE="off",
+            REQUEST_TIMING={"HEADER_SAMPLE_RATE": 0.0, "LOG_SAMPLE_RATE": 0.0, "SLOW_REQUEST_MS": None},
+        ):
+            for interface in options["interface"] or ["wsgi", "asgi"]:
+                results[interface] = {}
+                for route, path in paths.items():
+                    self.stderr.write(f"{interface}: {route} ...")
+                    if interface == "wsgi":
+                        timings = self.time_wsgi(Client(headers=headers), path, options)
+                    else:
+                        timings = asyncio.run(self.time_asgi(AsyncClient(), path, headers, options))
+                    results[interface][route] = self.summarize(timings)
+
+        report = {
+            "meta": report_meta(requests=options["requests"], warmup=options["warmup"]),
+            "results": results,
+        }
+        write_report(report, options["output"], self.stdout)
+
+    @staticmethod
+    def blocks(options):
+        """``(profile, count, timed)`` in alternating blocks: the warmup, then the timed requests."""
+        for total, timed in ((options["warmup"], False), (options["requests"], True)):
+            done = 0
+            while done < total:
+                count = min(BLOCK_SIZE, total - done)
+                for profile in PROFILES:
+                    yield profile, count, timed
+                done += count
+
+    def time_wsgi(self, client, path, options):
+        timings = {profile: [] for profile in PROFILES}
+        for profile, count, timed in self.blocks(options):
+            with override_settings(LEAN_MIDDLEWARE_PATHS=PROFILES[profile]):
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    elapsed = time.perf_counter() - started
+                    self.expect_ok(response, path)
+                    if timed:
+                        timings[profile].append(elapsed)
+        return timings
+
+    async def time_asgi(self, client, path, headers, options):
+        timings = {profile: [] for profile in PROFILES}
+        for profile, count, timed in self.blocks(options):
+            with override_settings(LEAN_MIDDLEWARE_PATHS=PROFILES[profile]):
+                for _ in range(count):
+                    started = time.perf_counter()
+                    # AsyncClient(headers=...) doesn't apply them on Django 4.2
+                    response = await client.get(path, headers=headers)
+                    elapsed = time.perf_counter() - started
+                    self.expect_ok(response, path)
+                    if timed:
+                        timings[profile].append(elapsed)
+        return timings
+
+    @staticmethod
+    def expect_ok(response, path):
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} answered {response.status_code}.")
+
+    @staticmethod
+    def summarize(timings):
+        summary = {
+            profile: {**latency_summary(latencies, sum(latencies)), "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1)}
+            for profile, latencies in timings.items()
+        }
+        full, lean = summary["full"], summary["lean"]
+        summary["saving"] = {
+            "mean_us": round(full["mean_us"] - lean["mean_us"], 1),
+            "p50_us": round((full["p50_ms"] - lean["p50_ms"]) * 1000, 1),
+            "percent": round((1 - lean["mean_us"] / full["mean_us"]) * 100, 1),
+        }
+        return summary
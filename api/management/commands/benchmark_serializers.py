@@ -0,0 +1,106 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import latency_summary, report_meta, write_report
+from api.management.commands.seed_benchmark_data import USERNAME_PREFIX
+from api.queries import MAPPING_EXPANSIONS, doctor_queryset, mapping_queryset, patient_queryset
+from api.rows import RowSerializer
+from api.serializers import DoctorSerializer, MappingListSerializer, PatientSerializer
+
+User = get_user_model()
+
+
+def cases(user):
+    """``(queryset, serializer)`` of each list page, as the list views build them."""
+    return {
+        "patients": (patient_queryset(user), PatientSerializer(context={})),
+        "doctors": (doctor_queryset(), DoctorSerializer(context={})),
+        "mappings": (mapping_queryset(user, expand=()), MappingListSerializer(context={"expand": set()})),
+        "mappings-expanded": (
+            mapping_queryset(user),
+            MappingListSerializer(context={"expand": set(MAPPING_EXPANSIONS)}),
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one list page rendered by the DRF serializers against the same page rendered from "
+        ".values() rows (api.rows.RowSerializer, the list views' default), and check both give the "
+        "same bytes. Seed data first with seed_benchmark_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--iterations", type=int, default=200, help="Timed pages per serializer and case.")
+        parser.add_argument("--case", action="append", help="Only run these cases (repeatable).")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=f"{USERNAME_PREFIX}0").first()
+        if user is None:
+            raise CommandError("No benchmark data; run `manage.py seed_benchmark_data` first.")
+        available = cases(user)
+        selected = options["case"] or list(available)
+        unknown = set(selected) - set(available)
+        if unknown:
+            raise CommandError(f"Unknown case(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(available)}")
+
+        page_size, iterations = options["page_size"], options["iterations"]
+        results = {}
+        for name in selected:
+            queryset, serializer = available[name]
+            rows = RowSerializer(serializer)
+            page, row_page_queryset = queryset[:page_size], rows.values(queryset)[:page_size]
+            self.stderr.write(f"{name} ...")
+
+            # .all() so every call runs the query instead of reading the result cache
+            def drf_page():
+                instances = list(page.all())
+                return instances, type(serializer)(instances, many=True, context=serializer.context).data
+
+            def row_page():
+                values = list(row_page_queryset.all())
+                return values, rows.represent(values)
+
+            instances, expected = drf_page()
+            values, actual = row_page()
+            if JSONRenderer().render(expected) != JSONRenderer().render(actual):
+                raise CommandError(f"{name}: .values() rows don't render the same bytes as {type(serializer).__name__}.")
+
+            results[name] = {
+                "rows": len(values),
+                # Representation alone, from rows already in memory
+                "serialize": self.compare(
+                    lambda: type(serializer)(instances, many=True, context=serializer.context).data,
+                    lambda: rows.represent(values),
+                    iterations,
+                ),
+                # The query and the representation, as a list view runs them
+                "fetch_and_serialize": self.compare(drf_page, row_page, iterations),
+            }
+
+        report = {
+            "meta": report_meta(page_size=page_size, iterations=iterations),
+            "cases": results,
+        }
+        write_report(report, options["output"], self.stdout)
+
+    @staticmethod
+    def compare(drf, rows, iterations):
+        timings = {"drf": [], "rows": []}
+        # Interleaved, so drift hits both alike
+        for _ in range(iterations):
+            for label, run in (("drf", drf), ("rows", rows)):
+                started = time.perf_counter()
+                run()
+                timings[label].append(time.perf_counter() - started)
+        summary = {
+            label: {**latency_summary(latencies, sum(latencies)), "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1)}
+            for label, latencies in timings.items()
+        }
+        summary["speedup"] = round(summary["drf"]["mean_us"] / summary["rows"]["mean_us"], 2)
+        return summary
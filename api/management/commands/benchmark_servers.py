@@ -0,0 +1,228 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.benchmarking import latency_summary, report_meta, write_report
+from api.models import Patient
+from api.management.commands.seed_benchmark_data import USERNAME_PREFIX
+
+User = get_user_model()
+
+# How each profile is served. {python}, {port}, {workers} and {threads} are filled in.
+SERVER_COMMANDS = {
+    "wsgi": [
+        "{python}", "-m", "gunicorn", "care_backend.wsgi:application", "--bind", "127.0.0.1:{port}",
+        "--workers", "{workers}", "--worker-class", "gthread", "--threads", "{threads}",
+        "--keep-alive", "30", "--log-level", "warning",
+    ],
+    "asgi": [
+        "{python}", "-m", "uvicorn", "care_backend.asgi:application", "--host", "127.0.0.1", "--port", "{port}",
+        "--workers", "{workers}", "--timeout-keep-alive", "30", "--log-level", "warning", "--no-access-log",
+    ],
+}
+
+# Spawned servers run without throttling or per-request instrumentation
+SERVER_ENV = {
+    "RATE_LIMIT_BACKEND": "off",
+    "SERVER_TIMING_SAMPLE_RATE": "0",
+    "REQUEST_LOG_SAMPLE_RATE": "0",
+    "API_QUERY_BUDGET_MODE": "off",
+}
+
+
+def read_paths(patients):
+    """The read routes served asynchronously under ASGI, cycled through by every connection."""
+    def paths(i):
+        patient = patients[i % len(patients)]
+        return (
+            reverse("patients-list") + "?page_size=20",
+            reverse("patients-detail", args=[patient]),
+            reverse("doctors-list") + "?page_size=20",
+            reverse("mappings-list") + "?page_size=20",
+            reverse("mappings-by-patient", args=[patient]),
+        )[i % 5]
+    return paths
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns ``(status, keep_alive)``."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def hold_connection(host, port, paths, token, offset, deadline, think, timeout, stats):
+    """Send requests back to back over one keep-alive connection until ``deadline``."""
+    writer = None
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            request = (
+                f"GET {paths(i)} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                f"Authorization: Bearer {token}\r\nAccept: application/json\r\n\r\n"
+            ).encode()
+            started = time.perf_counter()
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            except asyncio.TimeoutError:
+                stats["timeouts"] += 1
+                writer.close()
+                writer = None
+                continue
+            if status == 200:
+                stats["latencies"].append(time.perf_counter() - started)
+            else:
+                stats["errors"] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+            i += 1
+            if think:
+                await asyncio.sleep(think)
+    except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        stats["errors"] += 1
+        stats["dropped"] += 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run_level(host, port, paths, token, connections, duration, think, timeout):
+    stats = {"latencies": [], "errors": 0, "timeouts": 0, "dropped": 0}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        hold_connection(host, port, paths, token, n, deadline, think, timeout, stats) for n in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        "connections": connections,
+        **latency_summary(stats["latencies"], elapsed, stats["errors"] + stats["timeouts"]),
+        "timeouts": stats["timeouts"],
+        "dropped_connections": stats["dropped"],
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise CommandError(f"Server exited with code {process.returncode} before accepting requests.")
+        try:
+            urllib.request.urlopen(url, timeout=2).close()
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"{url} did not answer within {timeout}s.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent keep-alive connections the WSGI (gunicorn, threaded) and "
+        "ASGI (uvicorn, async read views) profiles sustain on the read endpoints. "
+        "Seed data first with seed_benchmark_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--levels", default="16,64,256", help="Comma-separated numbers of concurrent connections.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level.")
+        parser.add_argument("--think-ms", type=float, default=0.0,
+                            help="Pause between a response and the next request on each connection.")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Seconds before a request counts as timed out.")
+        parser.add_argument("--workers", type=int, default=2, help="Processes per spawned server.")
+        parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker (WSGI).")
+        parser.add_argument("--profile", action="append", choices=sorted(SERVER_COMMANDS),
+                            help="Only run these profiles (repeatable).")
+        parser.add_argument("--wsgi-url", help="Benchmark a running WSGI server instead of spawning gunicorn.")
+        parser.add_argument("--asgi-url", help="Benchmark a running ASGI server instead of spawning uvicorn.")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=f"{USERNAME_PREFIX}0").first()
+        if user is None:
+            raise CommandError("No benchmark data; run `manage.py seed_benchmark_data` first.")
+        patients = list(Patient.objects.filter(created_by_id=user.id).order_by("-id").values_list("id", flat=True)[:1000])
+        if not patients:
+            raise CommandError("Benchmark user has no patients; re-run seed_benchmark_data.")
+        token = str(RefreshToken.for_user(user).access_token)
+        paths = read_paths(patients)
+        levels = [int(level) for level in options["levels"].split(",")]
+
+        results = {}
+        for profile in options["profile"] or sorted(SERVER_COMMANDS):
+            url = options[f"{profile}_url"]
+            process = None
+            if url is None:
+                port = free_port()
+                url = f"http://127.0.0.1:{port}"
+                process = self.spawn(profile, port, options)
+            try:
+                wait_until_ready(url + reverse("api-root"), process)
+                host, port = url.split("//", 1)[1].rstrip("/").split(":")
+                results[profile] = {}
+                for level in levels:
+                    self.stderr.write(f"{profile}: {level} connections ...")
+                    results[profile][str(level)] = asyncio.run(run_level(
+                        host, int(port), paths, token, level, options["duration"],
+                        options["think_ms"] / 1000, options["timeout"],
+                    ))
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+        report = {
+            "meta": report_meta(
+                duration_s=options["duration"], think_ms=options["think_ms"],
+                workers=options["workers"], threads=options["threads"],
+            ),
+            "profiles": results,
+        }
+        write_report(report, options["output"], self.stdout)
+
+    def spawn(self, profile, port, options):
+        command = [
+            part.format(python=sys.executable, port=port, workers=options["workers"], threads=options["threads"])
+            for part in SERVER_COMMANDS[profile]
+        ]
+        return subprocess.Popen(command, cwd=settings.BASE_DIR, env={**os.environ, **SERVER_ENV})
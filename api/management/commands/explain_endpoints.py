@@ -0,0 +1,172 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from api.filters import filter_doctors, filter_patients
+from api.pagination import KeysetPagination
+from api.search import search
+from api.queries import (
+    MAPPING_EXPANSIONS, doctor_queryset, mapping_queryset, patient_queryset,
+    patient_doctors_queryset, doctor_patients_queryset, doctor_patients_batch,
+)
+
+User = get_user_model()
+
+# Plan fragments that mean a whole table is read. A line naming the index
+# it scans (or the FTS5 table's own index) reads only part of it.
+FULL_SCAN_MARKERS = {
+    "sqlite": ("SCAN api_", "SCAN auth_user"),
+    "postgresql": ("Seq Scan on",),
+}
+PARTIAL_SCAN_MARKERS = ("USING", "VIRTUAL TABLE")
+
+# Plan fragments of a sort the index order didn't spare
+SORT_MARKERS = {
+    "sqlite": ("USE TEMP B-TREE FOR ORDER BY",),
+}
+
+# Endpoints that sort only the rows an index lookup found: one patient's
+# doctors, one doctor's patients, filter and search matches. For these a
+# sort is expected and only a full scan fails --check.
+SORTED_SUBSETS = {
+    "patients-by-phone", "patients-by-name", "patients-by-birth-date", "patients-search",
+    "doctors-by-name", "doctors-search",
+    "mappings-by-patient", "doctors-patients", "doctors-patients-batch",
+}
+
+
+class Command(BaseCommand):
+    help = "Print the EXPLAIN plan of the queryset behind each API endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username (or id) whose data the querysets are scoped to. Defaults to the user with the most patients.")
+        parser.add_argument("--endpoint", action="append", help="Only explain these endpoints (repeatable).")
+        parser.add_argument("--page-size", type=int, default=KeysetPagination.page_size)
+        parser.add_argument("--analyze", action="store_true", help="Run EXPLAIN ANALYZE (PostgreSQL only).")
+        parser.add_argument("--sql", action="store_true", help="Also print the SQL statement.")
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Exit with an error if any plan reads a whole table, or sorts a whole list the index "
+                 "should have ordered. Only meaningful on realistic data volumes.",
+        )
+        parser.add_argument(
+            "--ignore", action="append", default=[],
+            help="Endpoint exempt from --check (repeatable), e.g. while its index is being built.",
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        endpoints = self.get_endpoints(user, options["page_size"])
+        selected = options["endpoint"] or list(endpoints)
+        unknown = set(selected) - set(endpoints)
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(endpoints)}")
+
+        explain_options = {}
+        if options["analyze"]:
+            if connection.vendor != "postgresql":
+                raise CommandError("--analyze is only supported on PostgreSQL.")
+            explain_options = {"analyze": True, "buffers": True}
+
+        offenders = []
+        for name in selected:
+            queryset = endpoints[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+            if options["sql"]:
+                self.stdout.write(str(queryset.query))
+            plan = self.explain(queryset, explain_options)
+            self.stdout.write(plan)
+            self.stdout.write("")
+            if name not in options["ignore"] and self.problems(name, plan):
+                offenders.append(name)
+
+        if options["check"] and offenders:
+            raise CommandError(f"Full table scans or unindexed sorts in: {', '.join(offenders)}")
+
+    @staticmethod
+    def problems(name, plan):
+        """Plan lines that read a whole table, or sort rows the endpoint's index should have ordered."""
+        scans = FULL_SCAN_MARKERS.get(connection.vendor, ())
+        sorts = () if name in SORTED_SUBSETS else SORT_MARKERS.get(connection.vendor, ())
+        return [
+            line for line in plan.splitlines()
+            if any(marker in line for marker in scans) and not any(marker in line for marker in PARTIAL_SCAN_MARKERS)
+            or any(marker in line for marker in sorts)
+        ]
+
+    @staticmethod
+    def explain(queryset, options):
+        if not any(getattr(expr, "contains_over_clause", False) for expr in queryset.query.annotations.values()):
+            return queryset.explain(**options)
+        # QuerySet.explain() puts EXPLAIN inside the subquery that filters on a
+        # window function, so prefix the compiled statement instead
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        prefix = connection.ops.explain_query_prefix(**options)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+        if connection.vendor == "sqlite":
+            return "\n".join(" ".join(str(value) for value in row) for row in rows)
+        return "\n".join(str(row[0]) for row in rows)
+
+    def get_user(self, ident):
+        if ident is None:
+            user = (
+                User.objects.annotate(patient_count=Count("patients"))
+                .order_by("-patient_count", "id").first()
+            )
+            if user is None:
+                raise CommandError("No users in the database; pass --user or seed some data first.")
+            return user
+        lookup = {"pk": ident} if ident.isdigit() else {"username": ident}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f"User {ident!r} does not exist.")
+
+    def get_endpoints(self, user, page_size):
+        """Querysets each endpoint runs, in the shape the views execute them."""
+        patients = patient_queryset(user)
+        mappings = mapping_queryset(user, expand=())
+        sample_patient = patients.first()
+        sample_mapping = mappings.first()
+        sample_doctor = doctor_queryset().first()
+        patient_id = sample_patient.pk if sample_patient else 0
+        mapped_doctors = list(dict.fromkeys(mappings.values_list("doctor_id", flat=True)[:200]))[:50]
+
+        paginator = KeysetPagination()
+
+        def next_page(queryset, row):
+            # Second cursor page: filtered on the (created_at, id) key of ``row``
+            if row is None:
+                return queryset[:page_size]
+            position = paginator.get_position(row)
+            return queryset.filter(paginator.position_filter(position))[:page_size]
+
+        return {
+            "patients-list": patients[:page_size],
+            "patients-list-cursor": next_page(patients, sample_patient),
+            "patients-detail": patients.filter(pk=patient_id),
+            "patients-by-email": filter_patients(patients, {"email": sample_patient.email if sample_patient else ""}),
+            "patients-by-phone": filter_patients(patients, {"phone": "+15550100"})[:page_size],
+            "patients-by-name": filter_patients(patients, {"name": "sa"})[:page_size],
+            "patients-by-birth-date": filter_patients(
+                patients, {"date_of_birth_after": "1980-01-01", "date_of_birth_before": "1980-12-31"},
+            )[:page_size],
+            "patients-search": search(patients, "sam smith")[:page_size],
+            "patients-by-doctor-count": patients.order_by("-doctor_count", "-id")[:page_size],
+            "doctors-list": doctor_queryset()[:page_size],
+            "doctors-by-specialization": filter_doctors(doctor_queryset(), {"specialization": "cardiology"})[:page_size],
+            "doctors-by-name": filter_doctors(doctor_queryset(), {"name": "sa"})[:page_size],
+            "doctors-search": search(doctor_queryset(), "cardio")[:page_size],
+            "doctors-by-caseload": doctor_queryset().order_by("-patient_count", "-id")[:page_size],
+            "doctors-list-cursor": next_page(doctor_queryset(), sample_doctor),
+            "doctors-detail": doctor_queryset().filter(pk=sample_doctor.pk if sample_doctor else 0),
+            "mappings-list": mappings[:page_size],
+            "mappings-list-expanded": mapping_queryset(user, expand=MAPPING_EXPANSIONS)[:page_size],
+            "mappings-list-cursor": next_page(mappings, sample_mapping),
+            "mappings-by-patient": patient_doctors_queryset(patient_id)[:page_size],
+            "doctors-patients": doctor_patients_queryset(user, mapped_doctors[0] if mapped_doctors else 0)[:page_size],
+            "doctors-patients-batch": doctor_patients_batch(user, mapped_doctors or [0], 10),
+        }
@@ -0,0 +1,80 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import FORMATS, IMPORT_BATCH_SIZE, IMPORTERS, ImportFormatError, detect_format, read_records
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream patients, doctors or mappings from a CSV or NDJSON file into the database, "
+        "validating and inserting in batches. Rejected rows are reported with their line number."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension.")
+        parser.add_argument("--user", help="Username that owns imported patients / mappings.")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--rejects", help="Write rejected rows with their errors to this NDJSON file.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing.")
+
+    def handle(self, *args, **options):
+        kind, path = options["kind"], options["path"]
+        fmt = options["format"] or detect_format(name=path)
+        if fmt is None:
+            raise CommandError("Can't tell the format from the file name; pass --format.")
+
+        user = None
+        if kind in ("patients", "mappings"):
+            if not options["user"]:
+                raise CommandError(f"--user is required to import {kind}.")
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user {options['user']!r}.")
+
+        rejects_file = open(options["rejects"], "w") if options["rejects"] else None
+
+        def on_reject(line, record, errors):
+            if rejects_file:
+                rejects_file.write(json.dumps({"line": line, "record": record, "errors": errors}, default=str) + "\n")
+
+        def on_batch(result):
+            rate = result.read / result.elapsed if result.elapsed else 0
+            self.stdout.write(
+                f"{result.read} read, {result.created} created, {result.rejected} rejected ({rate:,.0f} rows/s)",
+                ending="\r",
+            )
+
+        importer = IMPORTERS[kind](
+            user=user, batch_size=options["batch_size"], dry_run=options["dry_run"],
+            max_rejects=20, on_reject=on_reject, on_batch=on_batch,
+        )
+        source = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        try:
+            result = importer.run(read_records(source, fmt))
+        except ImportFormatError as error:
+            raise CommandError(str(error))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write("")
+        for reject in result.rejects:
+            self.stdout.write(self.style.WARNING(f"line {reject['line']}: {reject['errors']}"))
+        if result.rejected > len(result.rejects):
+            self.stdout.write(self.style.WARNING(f"... and {result.rejected - len(result.rejects)} more rejects"))
+        summary = result.as_dict()
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['created']} of {summary['read']} {kind} in {summary['elapsed_s']}s "
+            f"({summary['rows_per_s']:,.0f} rows/s), {summary['rejected']} rejected"
+        ))
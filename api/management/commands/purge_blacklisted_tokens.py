@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete blacklisted refresh tokens that have expired; they fail verification on their own. "
+        "Run it periodically (e.g. hourly from cron) to keep the blacklist to unexpired tokens."
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = tokens.purge(now)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} blacklisted tokens expired before {now:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete delta-sync change-log entries older than the retention period. "
+        "Clients whose cursor predates the purge get 410 and resync from a snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SYNC_RETENTION_DAYS,
+                            help="Keep entries from the last N days (default: SYNC_RETENTION_DAYS).")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        deleted = sync.purge(before)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change-log entries older than {before:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Patient.doctor_count and Doctor.patient_count from the mapping table. "
+        "API writes keep them current; run this after writing mappings outside the API."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            corrected = counts.recount()
+        self.stdout.write(self.style.SUCCESS(f"Corrected {corrected} relationship counts"))
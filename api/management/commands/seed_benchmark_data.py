@@ -0,0 +1,117 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_version
+from api.counts import recount
+from api.models import Patient, Doctor, PatientDoctorMap
+
+User = get_user_model()
+
+# Every seeded row is recognisable by these prefixes so --reset can remove it
+USERNAME_PREFIX = "bench-user-"
+EMAIL_DOMAIN = "bench.example.com"
+BENCH_PASSWORD = "bench-password-123"
+
+SPECIALIZATIONS = (
+    "Cardiology", "Dermatology", "Endocrinology", "Gastroenterology", "General Practice",
+    "Neurology", "Oncology", "Orthopedics", "Pediatrics", "Psychiatry", "Radiology", "Urology",
+)
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Alex", "Ananya", "Arjun", "Chen", "Diego", "Fatima", "Hana", "Ishaan",
+    "Jordan", "Kavya", "Leila", "Maria", "Noah", "Olivia", "Priya", "Rohan", "Sara", "Yusuf",
+)
+LAST_NAMES = (
+    "Ahmed", "Bose", "Chatterjee", "Garcia", "Gupta", "Iyer", "Khan", "Kim", "Menon", "Nair",
+    "Patel", "Rao", "Reddy", "Sharma", "Singh", "Smith", "Tanaka", "Verma", "Wang", "Zhou",
+)
+
+
+def bench_user_ids():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX).values_list("id", flat=True)
+
+
+class Command(BaseCommand):
+    help = "Seed a deterministic, realistically sized dataset for the benchmark commands."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--patients", type=int, default=100_000, help="Total, spread evenly over the users.")
+        parser.add_argument("--doctors", type=int, default=1_000)
+        parser.add_argument("--mappings-per-patient", type=int, default=2)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same dataset.")
+        parser.add_argument("--reset", action="store_true", help="Delete previously seeded benchmark data first.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        started = time.perf_counter()
+
+        if options["reset"]:
+            # Patients and mappings cascade from their users
+            User.objects.filter(id__in=list(bench_user_ids())).delete()
+            Doctor.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+
+        password = make_password(BENCH_PASSWORD)
+        User.objects.bulk_create(
+            [
+                User(username=f"{USERNAME_PREFIX}{i}", email=f"user{i}@{EMAIL_DOMAIN}",
+                     first_name=rng.choice(FIRST_NAMES), password=password)
+                for i in range(options["users"])
+            ],
+            ignore_conflicts=True,
+        )
+        users = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("id"))
+        self.stdout.write(f"users: {len(users)} (password {BENCH_PASSWORD!r})")
+
+        Doctor.objects.bulk_create(
+            [
+                Doctor(first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                       email=f"doctor{i}@{EMAIL_DOMAIN}", specialization=rng.choice(SPECIALIZATIONS))
+                for i in range(options["doctors"])
+            ],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        # bulk_create sends no post_save, so invalidate cached directory pages here
+        bump_version("doctors")
+        doctor_ids = list(Doctor.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").values_list("id", flat=True))
+        self.stdout.write(f"doctors: {len(doctor_ids)}")
+
+        per_patient = min(options["mappings_per_patient"], len(doctor_ids))
+        total = options["patients"]
+        created = mapped = 0
+        for start in range(0, total, batch_size):
+            patients = []
+            for i in range(start, min(start + batch_size, total)):
+                patients.append(Patient(
+                    created_by_id=users[i % len(users)].id,
+                    first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                    email=f"patient{i}@{EMAIL_DOMAIN}",
+                    date_of_birth=date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 80)),
+                    phone=f"+91{rng.randrange(10**9, 10**10)}",
+                ))
+            with transaction.atomic():
+                patients = Patient.objects.bulk_create(patients, ignore_conflicts=True)
+                # ignore_conflicts doesn't return primary keys; re-read them
+                ids = Patient.objects.filter(
+                    email__in=[p.email for p in patients]
+                ).order_by("id").values_list("id", "created_by_id")
+                mappings = [
+                    PatientDoctorMap(patient_id=patient_id, doctor_id=doctor_id, owner_id=owner_id)
+                    for patient_id, owner_id in ids
+                    for doctor_id in rng.sample(doctor_ids, per_patient)
+                ]
+                PatientDoctorMap.objects.bulk_create(mappings, batch_size=batch_size, ignore_conflicts=True)
+            created += len(patients)
+            mapped += len(mappings)
+            self.stdout.write(f"patients: {created}/{total}, mappings: {mapped}", ending="\r")
+        self.stdout.write("")
+        # bulk_create skips the counters that API writes maintain
+        self.stdout.write(f"relationship counts corrected: {recount()}")
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s"))
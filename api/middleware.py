@@ -0,0 +1,237 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+from . import instrumentation
+
+logger = logging.getLogger("api.timing")
+
+DEFAULT_REQUEST_TIMING = {
+    # Fraction of requests that get a Server-Timing header
+    "HEADER_SAMPLE_RATE": 0.0,
+    # Fraction of requests logged as a structured line (with their slowest queries)
+    "LOG_SAMPLE_RATE": 0.01,
+    # Requests slower than this are always logged (unsampled ones with their total time only)
+    "SLOW_REQUEST_MS": 1000,
+    # Number of slowest statements kept and logged per request
+    "SLOW_QUERY_SAMPLES": 3,
+}
+
+
+@lru_cache(maxsize=None)
+def get_config():
+    return {**DEFAULT_REQUEST_TIMING, **getattr(settings, "REQUEST_TIMING", {})}
+
+
+@lru_cache(maxsize=None)
+def lean_path_prefixes():
+    return tuple(getattr(settings, "LEAN_MIDDLEWARE_PATHS", ()))
+
+
+def is_lean_path(path):
+    return path.startswith(lean_path_prefixes())
+
+
+@receiver(setting_changed)
+def _reset_config(setting, **kwargs):
+    if setting == "REQUEST_TIMING":
+        get_config.cache_clear()
+    elif setting == "LEAN_MIDDLEWARE_PATHS":
+        lean_path_prefixes.cache_clear()
+
+
+class RequestTimingMiddleware:
+    """Measure DB queries, DB time, serializer time, view and render time per request.
+
+    Emits them as a ``Server-Timing`` header and/or a JSON log line on the
+    ``api.timing`` logger. A request that is sampled for neither runs with no
+    instrumentation: it is only timed by the wall clock, and logged with that
+    total if it is slow. Configure with ``settings.REQUEST_TIMING`` (see
+    ``DEFAULT_REQUEST_TIMING``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        header = random.random() < config["HEADER_SAMPLE_RATE"]
+        log = random.random() < config["LOG_SAMPLE_RATE"]
+        if not (header or log):
+            if config["SLOW_REQUEST_MS"] is None:
+                return self.get_response(request)
+            started = time.perf_counter()
+            return self.report_slow(request, self.get_response(request), started, config)
+
+        metrics = instrumentation.RequestMetrics(config["SLOW_QUERY_SAMPLES"])
+        request._timing = metrics
+        token = instrumentation.activate(metrics)
+        try:
+            with ExitStack() as stack:
+                self.record_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+        return self.report(request, response, metrics, config, header, log)
+
+    async def __acall__(self, request):
+        config = get_config()
+        header = random.random() < config["HEADER_SAMPLE_RATE"]
+        log = random.random() < config["LOG_SAMPLE_RATE"]
+        if not (header or log):
+            if config["SLOW_REQUEST_MS"] is None:
+                return await self.get_response(request)
+            started = time.perf_counter()
+            return self.report_slow(request, await self.get_response(request), started, config)
+
+        metrics = instrumentation.RequestMetrics(config["SLOW_QUERY_SAMPLES"])
+        request._timing = metrics
+        token = instrumentation.activate(metrics)
+        stack = ExitStack()
+        try:
+            # Connections are per thread: install the wrappers on the thread
+            # that runs this request's sync_to_async calls (async ORM included)
+            await sync_to_async(self.record_queries)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            instrumentation.deactivate(token)
+        return self.report(request, response, metrics, config, header, log)
+
+    @staticmethod
+    def record_queries(stack, metrics):
+        recorder = instrumentation.query_recorder(metrics)
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    def report(self, request, response, metrics, config, header, log):
+        total = time.perf_counter() - metrics.started
+        slow = self.is_slow(total, config)
+        if header:
+            response["Server-Timing"] = self.server_timing(metrics, total)
+        if log or slow:
+            self.log(request, response, metrics, total, slow)
+        return response
+
+    def report_slow(self, request, response, started, config):
+        total = time.perf_counter() - started
+        if self.is_slow(total, config):
+            self.log(request, response, None, total, slow=True)
+        return response
+
+    @staticmethod
+    def is_slow(total, config):
+        return config["SLOW_REQUEST_MS"] is not None and total * 1000 >= config["SLOW_REQUEST_MS"]
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, "_timing", None)
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so it marks the end of the view
+        metrics = getattr(request, "_timing", None)
+        if metrics is not None and hasattr(metrics, "view_started"):
+            metrics.add("view", time.perf_counter() - metrics.view_started)
+            metrics.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda r: self._rendered(metrics))
+        return response
+
+    @staticmethod
+    def _rendered(metrics):
+        metrics.add("render", time.perf_counter() - metrics.render_started)
+
+    @staticmethod
+    def server_timing(metrics, total):
+        parts = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+        for name, duration in metrics.spans.items():
+            parts.append(f"{name};dur={duration * 1000:.2f}")
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+    @staticmethod
+    def log(request, response, metrics, total, slow):
+        """Log one JSON line; ``metrics`` is None for an unsampled request, which only has its total."""
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+        }
+        if metrics is not None:
+            record.update({
+                "queries": metrics.queries,
+                "db_ms": round(metrics.db_time * 1000, 2),
+                **{f"{name}_ms": round(duration * 1000, 2) for name, duration in metrics.spans.items()},
+                "slowest_queries": [
+                    {"ms": round(duration * 1000, 2), "sql": sql[:500]}
+                    for duration, sql in metrics.slowest_queries()
+                ],
+            })
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record), extra={"timing": record})
+
+
+class PathScopedMixin:
+    """Skip the middleware for paths under ``settings.LEAN_MIDDLEWARE_PATHS``.
+
+    Sessions, CSRF, ``request.user``, messages and ``X-Frame-Options`` only
+    serve the admin's HTML pages: the API authenticates with JWT bearer tokens
+    and renders JSON. Skipping them there saves their hooks on every API
+    request, and under ASGI the thread hop each sync hook costs. They stay
+    subclasses of the stock middleware so the admin's system checks still
+    find them in ``MIDDLEWARE``.
+    """
+
+    def __call__(self, request):
+        if is_lean_path(request.path_info):
+            # Under ASGI this is the next middleware's coroutine, awaited by the caller
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class ScopedSessionMiddleware(PathScopedMixin, SessionMiddleware):
+    pass
+
+
+class ScopedCsrfViewMiddleware(PathScopedMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # No CSRF cookie was read for this request, and bearer tokens aren't
+        # sent by the browser on their own, so there is nothing to check
+        if is_lean_path(request.path_info):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class ScopedAuthenticationMiddleware(PathScopedMixin, AuthenticationMiddleware):
+    pass
+
+
+class ScopedMessageMiddleware(PathScopedMixin, MessageMiddleware):
+    pass
+
+
+class ScopedXFrameOptionsMiddleware(PathScopedMixin, XFrameOptionsMiddleware):
+    pass
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['-created_at', '-id'], name='doctor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='patient_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctormap',
+            index=models.Index(fields=['-created_at', '-id'], name='mapping_created_idx'),
+        ),
+    ]
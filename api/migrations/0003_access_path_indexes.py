@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0002_default_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientdoctormap',
+            index=models.Index(fields=['patient', '-created_at', '-id'], name='mapping_patient_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='patients', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='patientdoctormap',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='doctor_mappings', to='api.patient'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', 'updated_at'], name='patient_owner_updated_idx'),
+        ),
+    ]
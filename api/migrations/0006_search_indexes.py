@@ -0,0 +1,133 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:41
+
+import sqlite3
+from contextlib import closing
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# The search index SQL as of this migration, copied here so later changes to
+# api.search can't change what this migration does.
+POSTGRESQL_CREATE = [
+    "CREATE INDEX IF NOT EXISTS api_patient_search_idx ON api_patient USING GIN "
+    "(to_tsvector('simple'::regconfig, first_name || ' ' || last_name || ' ' || email || ' ' || phone))",
+    "CREATE INDEX IF NOT EXISTS api_doctor_search_idx ON api_doctor USING GIN "
+    "(to_tsvector('simple'::regconfig, first_name || ' ' || last_name || ' ' || specialization))",
+]
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS api_patient_search_idx",
+    "DROP INDEX IF EXISTS api_doctor_search_idx",
+]
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_patient_fts USING fts5("
+    "first_name, last_name, email, phone, content='api_patient', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS api_patient_fts_insert AFTER INSERT ON api_patient BEGIN "
+    "INSERT INTO api_patient_fts(rowid, first_name, last_name, email, phone) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS api_patient_fts_delete AFTER DELETE ON api_patient BEGIN "
+    "INSERT INTO api_patient_fts(api_patient_fts, rowid, first_name, last_name, email, phone) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS api_patient_fts_update AFTER UPDATE OF first_name, last_name, email, phone "
+    "ON api_patient BEGIN "
+    "INSERT INTO api_patient_fts(api_patient_fts, rowid, first_name, last_name, email, phone) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone); "
+    "INSERT INTO api_patient_fts(rowid, first_name, last_name, email, phone) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.phone); END",
+    # Index the rows that already exist
+    "INSERT INTO api_patient_fts(api_patient_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_doctor_fts USING fts5("
+    "first_name, last_name, specialization, content='api_doctor', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS api_doctor_fts_insert AFTER INSERT ON api_doctor BEGIN "
+    "INSERT INTO api_doctor_fts(rowid, first_name, last_name, specialization) "
+    "VALUES (new.id, new.first_name, new.last_name, new.specialization); END",
+    "CREATE TRIGGER IF NOT EXISTS api_doctor_fts_delete AFTER DELETE ON api_doctor BEGIN "
+    "INSERT INTO api_doctor_fts(api_doctor_fts, rowid, first_name, last_name, specialization) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.specialization); END",
+    "CREATE TRIGGER IF NOT EXISTS api_doctor_fts_update AFTER UPDATE OF first_name, last_name, specialization "
+    "ON api_doctor BEGIN "
+    "INSERT INTO api_doctor_fts(api_doctor_fts, rowid, first_name, last_name, specialization) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.specialization); "
+    "INSERT INTO api_doctor_fts(rowid, first_name, last_name, specialization) "
+    "VALUES (new.id, new.first_name, new.last_name, new.specialization); END",
+    "INSERT INTO api_doctor_fts(api_doctor_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS api_patient_fts_insert",
+    "DROP TRIGGER IF EXISTS api_patient_fts_delete",
+    "DROP TRIGGER IF EXISTS api_patient_fts_update",
+    "DROP TABLE IF EXISTS api_patient_fts",
+    "DROP TRIGGER IF EXISTS api_doctor_fts_insert",
+    "DROP TRIGGER IF EXISTS api_doctor_fts_delete",
+    "DROP TRIGGER IF EXISTS api_doctor_fts_update",
+    "DROP TABLE IF EXISTS api_doctor_fts",
+]
+
+
+def sqlite_has_fts5():
+    with closing(sqlite3.connect(":memory:")) as probe:
+        try:
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+
+def run(schema_editor, postgresql, sqlite):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = postgresql
+    elif vendor == "sqlite" and sqlite_has_fts5():
+        statements = sqlite
+    else:
+        # Searches fall back to LIKE
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_indexes(apps, schema_editor):
+    run(schema_editor, POSTGRESQL_CREATE, SQLITE_CREATE)
+
+
+def drop_search_indexes(apps, schema_editor):
+    run(schema_editor, POSTGRESQL_DROP, SQLITE_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(django.db.models.functions.text.Lower('specialization'), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), name='doctor_specialization_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='doctor_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), name='doctor_last_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', 'phone'], name='patient_owner_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', 'date_of_birth'], name='patient_owner_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(models.F('created_by'), django.db.models.functions.text.Lower('first_name'), name='patient_owner_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(models.F('created_by'), django.db.models.functions.text.Lower('last_name'), name='patient_owner_last_name_idx'),
+        ),
+        # tsvector GIN index on PostgreSQL, FTS5 tables and triggers on SQLite
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
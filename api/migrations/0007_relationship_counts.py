@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:04
+
+import sqlite3
+from contextlib import closing
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# The FTS5 triggers as 0006_search_indexes created them, copied here so later
+# changes to api.search can't change what this migration does
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS api_patient_fts_insert AFTER INSERT ON api_patient BEGIN "
+    "INSERT INTO api_patient_fts(rowid, first_name, last_name, email, phone) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS api_patient_fts_delete AFTER DELETE ON api_patient BEGIN "
+    "INSERT INTO api_patient_fts(api_patient_fts, rowid, first_name, last_name, email, phone) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS api_patient_fts_update AFTER UPDATE OF first_name, last_name, email, phone "
+    "ON api_patient BEGIN "
+    "INSERT INTO api_patient_fts(api_patient_fts, rowid, first_name, last_name, email, phone) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone); "
+    "INSERT INTO api_patient_fts(rowid, first_name, last_name, email, phone) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS api_doctor_fts_insert AFTER INSERT ON api_doctor BEGIN "
+    "INSERT INTO api_doctor_fts(rowid, first_name, last_name, specialization) "
+    "VALUES (new.id, new.first_name, new.last_name, new.specialization); END",
+    "CREATE TRIGGER IF NOT EXISTS api_doctor_fts_delete AFTER DELETE ON api_doctor BEGIN "
+    "INSERT INTO api_doctor_fts(api_doctor_fts, rowid, first_name, last_name, specialization) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.specialization); END",
+    "CREATE TRIGGER IF NOT EXISTS api_doctor_fts_update AFTER UPDATE OF first_name, last_name, specialization "
+    "ON api_doctor BEGIN "
+    "INSERT INTO api_doctor_fts(api_doctor_fts, rowid, first_name, last_name, specialization) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.specialization); "
+    "INSERT INTO api_doctor_fts(rowid, first_name, last_name, specialization) "
+    "VALUES (new.id, new.first_name, new.last_name, new.specialization); END",
+]
+
+
+def count_mappings(apps, schema_editor):
+    PatientDoctorMap = apps.get_model('api', 'PatientDoctorMap')
+    for model_name, field, column in (('Patient', 'doctor_count', 'patient'), ('Doctor', 'patient_count', 'doctor')):
+        actual = Subquery(
+            PatientDoctorMap.objects.filter(**{column: OuterRef('pk')})
+            .order_by().values(column).annotate(total=Count('*')).values('total')
+        )
+        apps.get_model('api', model_name).objects.update(**{field: Coalesce(actual, 0)})
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite adds and drops these columns by rebuilding the tables, which drops
+    # the FTS triggers. The rows keep their ids, so the FTS tables stay valid.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with closing(sqlite3.connect(":memory:")) as probe:
+        try:
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        except sqlite3.OperationalError:
+            # No FTS5 tables were created (see 0006_search_indexes)
+            return
+    for statement in SQLITE_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_search_indexes'),
+    ]
+
+    operations = [
+        # Runs last when migrating backwards, after the fields are dropped
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='doctor',
+            name='patient_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='doctor_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_mappings, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['-patient_count', '-id'], name='doctor_patient_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', '-doctor_count', '-id'], name='patient_owner_doctor_count_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_relationship_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patientdoctormap',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='patient_mappings', to='api.doctor'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctormap',
+            index=models.Index(fields=['doctor', 'patient'], name='mapping_doctor_patient_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_patient_owner(apps, schema_editor):
+    Patient = apps.get_model('api', 'Patient')
+    PatientDoctorMap = apps.get_model('api', 'PatientDoctorMap')
+    PatientDoctorMap.objects.update(
+        owner_id=Subquery(Patient.objects.filter(pk=OuterRef('patient_id')).values('created_by_id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0009_refresh_token_blacklist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientdoctormap',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_patient_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patientdoctormap',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveIndex(
+            model_name='patientdoctormap',
+            name='mapping_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctormap',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='mapping_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,335 @@
+import logging
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.http import Http404
+from django.utils.http import parse_http_date
+from rest_framework.response import Response
+
+from . import conditional
+from .cache import anamespace_version, namespace_version, response_cache, response_cache_key
+from .queries import DEFAULT_ORDERING, QUERY_BUDGETS
+from .rows import compile_rows
+
+logger = logging.getLogger(__name__)
+
+
+# Transaction control isn't counted: whether it is sent as SQL depends on the
+# backend, and inside a test case every transaction is a savepoint
+TRANSACTION_STATEMENTS = ("BEGIN", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetMixin:
+    """Log a warning when the handler issues more SQL statements than ``QUERY_BUDGETS`` allows.
+
+    The budget key is ``<basename>-<action>``, with the action's underscores
+    turned into dashes like its route name. Queries issued while
+    authenticating, checking permissions and throttling are not counted, nor
+    is transaction control. ``settings.API_QUERY_BUDGET_MODE`` is ``off`` or ``warn``;
+    the budgets themselves are asserted by ``api.tests.test_query_budgets``.
+    """
+    query_budget_key = None
+
+    def get_query_budget_key(self):
+        if self.query_budget_key:
+            return self.query_budget_key
+        action = (getattr(self, "action", None) or "").replace("_", "-")
+        return f"{getattr(self, 'basename', '')}-{action}"
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(settings, "API_QUERY_BUDGET_MODE", "off") == "off":
+            return super().dispatch(request, *args, **kwargs)
+
+        # None until initial() is done, so auth and throttling aren't counted
+        self._budget_queries = None
+        with connection.execute_wrapper(self._count_query):
+            response = super().dispatch(request, *args, **kwargs)
+
+        budget = QUERY_BUDGETS.get(self.get_query_budget_key())
+        queries = self._budget_queries or []
+        if budget is not None and response.status_code < 400 and len(queries) > budget:
+            logger.warning(
+                "%s ran %d queries (budget %d): %s",
+                self.get_query_budget_key(), len(queries), budget, "; ".join(queries),
+            )
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if hasattr(self, "_budget_queries"):
+            self._budget_queries = []
+
+    def _count_query(self, execute, sql, params, many, context):
+        if self._budget_queries is not None and not sql.startswith(TRANSACTION_STATEMENTS):
+            self._budget_queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+class AsyncReadMixin:
+    """Serve the read actions in ``async_actions`` with async handlers under ASGI.
+
+    With ``settings.API_ASYNC_READS`` on, ``as_view()`` returns a coroutine
+    view. Requests routed to an async action run ``a<action>`` (``alist``,
+    ``aretrieve``, or ``aget`` on a plain ``APIView``) on the event loop and
+    read through the async ORM; authentication, permissions and throttling
+    run in one ``sync_to_async`` call. Every other method goes to the regular
+    synchronous view in a worker thread. ``QueryBudgetMixin`` does not see
+    async reads: their queries run on other threads.
+
+    List mixins place this class after themselves so their ``alist`` and
+    ``aretrieve`` wrap the ones here, like ``list`` wraps ``ListModelMixin``.
+    """
+    async_actions = ("list", "retrieve")
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        if actions is None:
+            view = super().as_view(**initkwargs)
+        else:
+            view = super().as_view(actions, **initkwargs)
+        if not settings.API_ASYNC_READS:
+            return view
+
+        read_methods = cls.async_read_methods(actions)
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method.lower() not in read_methods:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            if actions is not None:
+                self.action_map = {"head": actions.get("get"), **actions}
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Keeps cls, initkwargs, actions and csrf_exempt for the router and middleware
+        return update_wrapper(async_view, view)
+
+    @classmethod
+    def async_read_methods(cls, actions):
+        # A plain APIView's handlers are named after the methods they serve
+        actions = actions or {method: method for method in cls.http_method_names}
+        methods = {method for method, action in actions.items() if action in cls.async_actions}
+        if "get" in methods:
+            methods.add("head")
+        return methods
+
+    async def adispatch(self, request, *args, **kwargs):
+        """``APIView.dispatch`` for an async handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            action = getattr(self, "action", None) or ("get" if request.method == "HEAD" else request.method.lower())
+            response = await getattr(self, f"a{action}")(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        """``get_object`` with the async ORM."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class RowListMixin:
+    """Render ``list`` pages from ``.values()`` rows (``api.rows.RowSerializer``).
+
+    The page is read as dicts and built with the fields of
+    ``get_serializer()`` compiled once, skipping model instances and DRF's
+    per-field machinery; the body is identical. ``settings.API_ROW_LISTS``
+    turns it off, and a serializer whose fields don't compile keeps the
+    regular path (see ``api.rows.compile_rows``). Mixins that wrap ``list``
+    go before this class, and ``AsyncReadMixin`` after it, since ``alist``
+    here replaces the one there.
+    """
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_row_serializer()
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        return self.row_response(rows, self.paginate_queryset(self.row_queryset(rows)))
+
+    async def alist(self, request, *args, **kwargs):
+        rows = self.get_row_serializer()
+        if rows is None:
+            return await super().alist(request, *args, **kwargs)
+        return self.row_response(rows, await self.paginator.apaginate_queryset(
+            self.row_queryset(rows), request, view=self,
+        ))
+
+    def get_row_serializer(self):
+        """The compiled serializer for this request, or None to render with DRF."""
+        if not settings.API_ROW_LISTS:
+            return None
+        return compile_rows(self.get_serializer())
+
+    def row_queryset(self, rows):
+        # Cursor pages read their sort key from the rows
+        sort_keys = [field.lstrip("-") for field in (*DEFAULT_ORDERING, *getattr(self, "ordering_fields", ()))]
+        return rows.values(self.filter_queryset(self.get_queryset()), *sort_keys)
+
+    def row_response(self, rows, page):
+        return self.get_paginated_response(rows.represent(page))
+
+
+class CachedReadMixin:
+    """Serve ``list`` and ``retrieve`` from the versioned response cache.
+
+    Only for data that is the same for every user. The response data is stored
+    under the current version of ``response_cache_namespace``, so a cache hit
+    skips both the queries and serialization; bumping the version (on every
+    write, see ``api.signals``) invalidates all cached pages at once. Data
+    that changes without a bump expires through ``get_response_cache_timeout``.
+
+    Put it before ``ConditionalGetMixin``: the ETag and Last-Modified of a
+    miss are stored with its data, and a hit answers the request's
+    preconditions from them, so it runs no query at all.
+    """
+    response_cache_namespace = None
+
+    def get_response_cache_timeout(self):
+        """Seconds a page stays cached; the cache's own ``TIMEOUT`` by default."""
+        return DEFAULT_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        cache = response_cache()
+        version = await anamespace_version(self.response_cache_namespace)
+        key = response_cache_key(self.response_cache_namespace, request)
+        entry = await cache.aget(key, version=version)
+        if entry is not None:
+            return self.cache_hit(request, *entry)
+
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(
+                key, self.cache_entry(response), timeout=self.get_response_cache_timeout(), version=version,
+            )
+            response["X-Cache"] = "MISS"
+        return response
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = response_cache()
+        version = namespace_version(self.response_cache_namespace)
+        key = response_cache_key(self.response_cache_namespace, request)
+        entry = cache.get(key, version=version)
+        if entry is not None:
+            return self.cache_hit(request, *entry)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, self.cache_entry(response), timeout=self.get_response_cache_timeout(), version=version)
+            response["X-Cache"] = "MISS"
+        return response
+
+    @staticmethod
+    def cache_entry(response):
+        """``(data, etag, last_modified)`` of a rendered-to-be 200 response."""
+        last_modified = response.get("Last-Modified")
+        return response.data, response.get("ETag"), parse_http_date(last_modified) if last_modified else None
+
+    @staticmethod
+    def cache_hit(request, data, etag, last_modified):
+        response = conditional.not_modified(request, etag, last_modified) if etag else None
+        if response is None:
+            response = Response(data)
+        if etag:
+            conditional.add_validators(response, etag, last_modified)
+        response["X-Cache"] = "HIT"
+        return response
+
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified on ``list`` and ``retrieve``, with 304 for matching preconditions.
+
+    List validators come from one aggregate over the filtered queryset
+    (see ``api.conditional``); its count is handed to the paginator, so a
+    full page still costs no extra query. ``conditional_fields`` lists the
+    timestamps the representation depends on, including related objects
+    that are rendered inline.
+    """
+    conditional_fields = ("updated_at",)
+
+    def list(self, request, *args, **kwargs):
+        state = conditional.collection_state(self.filter_queryset(self.get_queryset()), self.conditional_fields)
+        self.collection_count = state.count
+        return self.conditional_response(request, state, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        state = conditional.object_state(self.get_object(), self.conditional_fields)
+        return self.conditional_response(request, state, super().retrieve, *args, **kwargs)
+
+    def get_object(self):
+        # retrieve() loads the object for its validators before the handler does
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
+
+    def conditional_response(self, request, state, handler, *args, **kwargs):
+        etag, last_modified = conditional.validators(request, state)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            conditional.add_validators(response, etag, last_modified)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        state = await conditional.acollection_state(queryset, self.conditional_fields)
+        self.collection_count = state.count
+        return await self.aconditional_response(request, state, super().alist, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        state = conditional.object_state(await self.aget_object(), self.conditional_fields)
+        return await self.aconditional_response(request, state, super().aretrieve, *args, **kwargs)
+
+    async def aget_object(self):
+        if not hasattr(self, "_object"):
+            self._object = await super().aget_object()
+        return self._object
+
+    async def aconditional_response(self, request, state, handler, *args, **kwargs):
+        etag, last_modified = conditional.validators(request, state)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            conditional.add_validators(response, etag, last_modified)
+        return response
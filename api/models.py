@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
 
 User = settings.AUTH_USER_MODEL
 
@@ -11,12 +13,30 @@ class TimestampedModel(models.Model):
         abstract = True
 
 class Patient(TimestampedModel):
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="patients")
+    # Indexed as the prefix of patient_owner_created_idx
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="patients", db_index=False)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100, blank=True)
     email = models.EmailField(unique=True)
     date_of_birth = models.DateField(null=True, blank=True)
     phone = models.CharField(max_length=20, blank=True)
+    # Number of mappings, maintained by api.counts
+    doctor_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Owner-scoped list in the default (-created_at, -id) order
+            models.Index(fields=["created_by", "-created_at", "-id"], name="patient_owner_created_idx"),
+            # Covers the COUNT(*)/MAX(updated_at) behind the list's ETag as an index-only scan
+            models.Index(fields=["created_by", "updated_at"], name="patient_owner_updated_idx"),
+            # List filters (api.filters); email is covered by its unique index
+            models.Index(fields=["created_by", "phone"], name="patient_owner_phone_idx"),
+            models.Index(fields=["created_by", "date_of_birth"], name="patient_owner_dob_idx"),
+            models.Index(F("created_by"), Lower("first_name"), name="patient_owner_first_name_idx"),
+            models.Index(F("created_by"), Lower("last_name"), name="patient_owner_last_name_idx"),
+            # ?ordering=(-)doctor_count, read forwards or backwards
+            models.Index(fields=["created_by", "-doctor_count", "-id"], name="patient_owner_doctor_count_idx"),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -26,18 +46,96 @@ class Doctor(TimestampedModel):
     last_name = models.CharField(max_length=100, blank=True)
     email = models.EmailField(unique=True)
     specialization = models.CharField(max_length=120)
+    # Number of mappings, maintained by api.counts
+    patient_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="doctor_created_idx"),
+            # ?specialization= in the default order, without a sort
+            models.Index(Lower("specialization"), F("created_at").desc(), F("id").desc(),
+                         name="doctor_specialization_idx"),
+            # ?name= prefix ranges (api.filters.name_prefix)
+            models.Index(Lower("first_name"), name="doctor_first_name_idx"),
+            models.Index(Lower("last_name"), name="doctor_last_name_idx"),
+            # ?ordering=(-)patient_count: doctors by caseload
+            models.Index(fields=["-patient_count", "-id"], name="doctor_patient_count_idx"),
+        ]
 
     def __str__(self):
         return f"Dr. {self.first_name} {self.last_name} — {self.specialization}".strip()
 
 class PatientDoctorMap(TimestampedModel):
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="doctor_mappings")
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="patient_mappings")
+    # Indexed as the prefix of unique_patient_doctor and mapping_patient_created_idx
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="doctor_mappings", db_index=False)
+    # Indexed as the prefix of mapping_doctor_patient_idx
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="patient_mappings", db_index=False)
+    # The patient's owner, copied here so owner-scoped lists read one index in
+    # order. A mapping only ever moves between patients of the same owner.
+    # Indexed as the prefix of mapping_owner_created_idx
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False, editable=False)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["patient", "doctor"], name="unique_patient_doctor")
         ]
+        indexes = [
+            # Owner-scoped list in the default (-created_at, -id) order
+            models.Index(fields=["owner", "-created_at", "-id"], name="mapping_owner_created_idx"),
+            # Mappings of one patient in the default order (mappings-by-patient)
+            models.Index(fields=["patient", "-created_at", "-id"], name="mapping_patient_created_idx"),
+            # Patients of one doctor (doctors-patients), and the doctor side of cascades and counts
+            models.Index(fields=["doctor", "patient"], name="mapping_doctor_patient_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.patient} ↔ {self.doctor}"
+
+
+class ChangeLog(models.Model):
+    """Append-only record of patient and mapping writes, read by the delta-sync endpoint.
+
+    The autoincrement id is the sync cursor. Deletes are kept as tombstones
+    (``deleted=True``) so clients can drop rows they hold.
+    """
+    PATIENT = "patient"
+    MAPPING = "mapping"
+    KIND_CHOICES = [(PATIENT, "Patient"), (MAPPING, "Patient-doctor mapping")]
+
+    # Indexed as the prefix of changelog_owner_id_idx
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # One owner's changes after a cursor, in cursor order
+            models.Index(fields=["owner", "id"], name="changelog_owner_id_idx"),
+        ]
+
+    def __str__(self):
+        action = "deleted" if self.deleted else "upserted"
+        return f"#{self.pk} {self.kind} {self.object_id} {action}"
+
+
+class BlacklistedToken(models.Model):
+    """A refresh token that may not be used again, kept until it expires.
+
+    Written by ``api.tokens.RefreshToken.blacklist`` when a refresh rotates the
+    token. An expired token fails verification on its own, so rows past
+    ``expires_at`` are dead weight; ``manage.py purge_blacklisted_tokens``
+    deletes them.
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # The purge's range delete of expired rows
+            models.Index(fields=["expires_at"], name="blacklist_expires_idx"),
+        ]
 
     def __str__(self):
-        return f"{self.patient} ↔ {self.doctor}"
\ No newline at end of file
+        return f"{self.jti} (until {self.expires_at:%Y-%m-%d %H:%M})"
@@ -1,5 +1,273 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import date, datetime
+from functools import partial
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .queries import DEFAULT_ORDERING
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a unique, composite sort key.
+
+    The cursor encodes the sort-key values of the last row served, and the
+    next page is fetched with ``WHERE (created_at, id) < (:t, :id)`` instead
+    of an OFFSET, so deep pages cost the same as the first one. No COUNT(*)
+    is run.
+    """
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = DEFAULT_ORDERING
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, page_size=None):
+        if page_size is not None:
+            self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self.page_window(queryset, request, view)
+        return self.set_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, fetching the page with the async ORM."""
+        window = self.page_window(queryset, request, view)
+        return self.set_page([row async for row in window])
+
+    def page_window(self, queryset, request, view=None):
+        """The unevaluated slice holding the page plus one row to detect more pages."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            position = self.clean_position(position, queryset.model)
+        self._page_size, self._position, self._reverse = page_size, position, reverse
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, ordering))
+        return queryset[:page_size + 1]
+
+    def set_page(self, rows):
+        page_size, position, reverse = self._page_size, self._position, self._reverse
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Moving backwards we know there is a newer page (we came from it)
+        # and only learn whether an older one exists from the extra row.
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_ordering(self, request, queryset, view):
+        """The order chosen with the view's ``OrderingFilter``, else ``self.ordering``."""
+        for backend in getattr(view, "filter_backends", ()):
+            if hasattr(backend, "get_ordering"):
+                return tuple(backend().get_ordering(request, queryset, view))
+        return self.ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        payload = {"p": self.get_position(obj), "r": int(reverse)}
+        if self.ordering != type(self).ordering:
+            payload["o"] = ",".join(self.ordering)
+        payload = json.dumps(payload, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position = payload["p"]
+            # A cursor only continues the ordering it was issued for
+            issued_for = payload.get("o", ",".join(type(self).ordering))
+            if not isinstance(position, list) or len(position) != len(self.ordering) \
+                    or issued_for != ",".join(self.ordering):
+                raise ValueError
+            return position, bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def clean_position(self, position, model):
+        """``position`` converted to the sort fields' types, so a forged value is a 400 rather than a failed query."""
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            try:
+                if value is None:
+                    raise ValueError
+                value = model._meta.get_field(field.lstrip("-")).to_python(value)
+            except FieldDoesNotExist:
+                pass
+            except (TypeError, ValueError, DjangoValidationError):
+                raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+            cleaned.append(value)
+        return cleaned
+
+    def get_position(self, obj):
+        """Sort-key values of ``obj`` (an instance or a ``.values()`` row) in a JSON-safe form."""
+        if isinstance(obj, dict):
+            return [self._dump(obj[field.lstrip("-")]) for field in self.ordering]
+        return [self._dump(getattr(obj, field.lstrip("-"))) for field in self.ordering]
+
+    def position_filter(self, position, ordering=None):
+        # Lexicographic "strictly after" for a composite key:
+        # (a > x) OR (a = x AND b > y) OR ...
+        ordering = ordering or self.ordering
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            term = Q(**{f"{name}__{lookup}": position[index]})
+            for prev_field, prev_value in zip(ordering[:index], position[:index]):
+                term &= Q(**{prev_field.lstrip("-"): prev_value})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+
+class CountedPaginator(DjangoPaginator):
+    """Django paginator whose row count is already known."""
+
+    def __init__(self, *args, count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count = count
+
 
 class DefaultPagination(PageNumberPagination):
+    """Page-number pagination, or keyset pagination when the client asks for it.
+
+    Clients opt into cursor mode per request with ``?pagination=cursor`` (or by
+    following a ``cursor`` link). Cursor pages skip the COUNT(*) and OFFSET scan.
+    """
     page_size_query_param = "page_size"
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+    mode_query_param = "pagination"
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.wants_cursor(request):
+            self.keyset = self.keyset_class(page_size=self.page_size)
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        # A view that already counted the rows (ConditionalGetMixin) saves the COUNT(*)
+        count = getattr(view, "collection_count", None)
+        if count is not None:
+            self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: the same pages, read with the async ORM."""
+        self.keyset = None
+        if self.wants_cursor(request):
+            self.keyset = self.keyset_class(page_size=self.page_size)
+            self.keyset.max_page_size = self.max_page_size
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        count = getattr(view, "collection_count", None)
+        if count is None:
+            count = await queryset.acount()
+        paginator = CountedPaginator(queryset, page_size, count=count)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        self.page = paginator._get_page(rows, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return rows
+
+    def wants_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
@@ -0,0 +1,142 @@
+"""Queryset planning for the API endpoints.
+
+Every endpoint builds its queryset here so the joins it needs are decided in
+one place, and the number of SQL statements a request issues stays fixed no
+matter how many rows are on the page.
+"""
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+
+from .models import Patient, Doctor, PatientDoctorMap
+
+# Stable default sort for every list endpoint. Each model has an index that
+# matches it, and it is the key used by cursor pagination.
+DEFAULT_ORDERING = ("-created_at", "-id")
+
+# Related objects a mapping response may inline via ``?expand=``
+MAPPING_EXPANSIONS = ("patient", "doctor")
+
+# Timestamps a mapping's representation depends on (ETag / Last-Modified)
+MAPPING_CONDITIONAL_FIELDS = ("updated_at", "patient__updated_at", "doctor__updated_at")
+
+# Maximum number of SQL statements each action may run once authentication,
+# permissions and throttling are done, transaction control aside. Asserted by
+# ``api.tests.test_query_budgets``; ``QueryBudgetMixin`` logs overruns.
+QUERY_BUDGETS = {
+    "mappings-list": 2,          # COUNT(*)/MAX(updated_at) aggregate + one joined page
+    "mappings-retrieve": 1,
+    "mappings-by-patient": 3,    # the owned patient + COUNT(*) of its mappings + one page of doctors
+    "doctors-patients": 2,       # COUNT(*)/MAX(updated_at) aggregate + one joined page
+    "doctors-patients-batch": 1,
+    # owned patients, doctors and existing pairs + the mappings and their sync
+    # entries + patient counts and their sync entries + doctor counts
+    "mappings-bulk-post": 8,
+    # locking UPDATE + the owned mappings + their tombstones, patient counts
+    # and their sync entries, doctor counts + the DELETE
+    "mappings-bulk-delete": 7,
+    "sync": 4,                   # oldest entry + one page of entries + changed patients + changed mappings
+}
+
+
+def parse_expand(request, allowed):
+    """Return the set of relations requested with ``?expand=a,b``."""
+    raw = request.query_params.get("expand", "") if request else ""
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise serializers.ValidationError(
+            {"expand": f"Unknown expansion(s): {', '.join(sorted(unknown))}. "
+                       f"Allowed: {', '.join(allowed)}."}
+        )
+    return requested
+
+
+def patient_queryset(user):
+    """Patients owned by ``user`` in the default order."""
+    return Patient.objects.filter(created_by_id=user.id).order_by(*DEFAULT_ORDERING)
+
+
+def doctor_queryset():
+    """The global doctor directory in the default order."""
+    return Doctor.objects.order_by(*DEFAULT_ORDERING)
+
+
+def mapping_queryset(user, expand=MAPPING_EXPANSIONS):
+    """Mappings owned by ``user``, joined to the relations that will be rendered."""
+    queryset = (
+        PatientDoctorMap.objects
+        .filter(owner_id=user.id)
+        .order_by(*DEFAULT_ORDERING)
+    )
+    related = [name for name in MAPPING_EXPANSIONS if name in expand]
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset
+
+
+def patient_doctors_queryset(patient_id):
+    """Doctors assigned to ``patient_id`` in the default order, with their mapping's id and timestamps.
+
+    Ownership of the patient is checked by the caller; the mapping side is
+    read through ``unique_patient_doctor``.
+    """
+    return (
+        Doctor.objects
+        .filter(patient_mappings__patient_id=patient_id)
+        .annotate(
+            mapping_id=F("patient_mappings__id"),
+            assigned_at=F("patient_mappings__created_at"),
+            mapping_updated_at=F("patient_mappings__updated_at"),
+        )
+        .order_by(*DEFAULT_ORDERING)
+    )
+
+
+def patient_mappings(patient_id):
+    """Mappings of ``patient_id``, counted for the by-patient page total.
+
+    Counted rather than read from ``doctor_count``, so a counter that drifted
+    (mappings written outside the API) can't misstate the total; the count
+    reads only the ``unique_patient_doctor`` entries of the patient.
+    """
+    return PatientDoctorMap.objects.filter(patient_id=patient_id)
+
+
+def doctor_patients_queryset(user, doctor_id):
+    """``user``'s patients assigned to ``doctor_id``, in the default order.
+
+    One join, planned from the table statistics. Without them, SQLite walks
+    the user's patients in order through ``patient_owner_created_idx`` and
+    probes ``unique_patient_doctor`` for each, stopping once the page is full.
+    After ``ANALYZE`` it reads the doctor's mappings through
+    ``mapping_doctor_patient_idx``, fetches each patient by id and sorts the
+    user's ones in a temporary B-tree, so the cost follows the doctor's whole
+    caseload rather than the page size.
+    """
+    return (
+        Patient.objects
+        .filter(created_by_id=user.id, doctor_mappings__doctor_id=doctor_id)
+        .order_by(*DEFAULT_ORDERING)
+    )
+
+
+def doctor_patients_batch(user, doctor_ids, limit):
+    """The first ``limit`` of ``user``'s patients for each of ``doctor_ids``, in one query.
+
+    Rows carry ``mapped_doctor_id``, and ``doctor_total`` (all of the user's
+    patients for that doctor), and are ordered by doctor, then by the default order.
+    """
+    doctor = F("doctor_mappings__doctor_id")
+    order = [F(field.lstrip("-")).desc() if field.startswith("-") else F(field).asc() for field in DEFAULT_ORDERING]
+    return (
+        Patient.objects
+        .filter(created_by_id=user.id, doctor_mappings__doctor_id__in=doctor_ids)
+        .annotate(
+            mapped_doctor_id=doctor,
+            doctor_position=Window(RowNumber(), partition_by=doctor, order_by=order),
+            doctor_total=Window(Count("id"), partition_by=doctor),
+        )
+        .filter(doctor_position__lte=limit)
+        .order_by("mapped_doctor_id", *DEFAULT_ORDERING)
+    )
@@ -0,0 +1,226 @@
+"""Shared, atomic rate-limit counters.
+
+Counters live outside the worker process, either in a SQLite file or in
+Redis, so a limit holds across every gunicorn worker. Each hit is a single
+atomic increment, and limits use a sliding-window counter: the current
+fixed window plus the previous one, weighted by how much of it still
+overlaps the sliding window.
+
+Select a backend with ``settings.RATE_LIMIT = {"BACKEND": ..., "OPTIONS": {...}}``.
+"""
+import random
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    # Requests counted in the sliding window, including this one if allowed
+    count: float
+    # Seconds until the next request would be allowed (0 when allowed)
+    retry_after: float
+
+
+class BaseRateLimitBackend:
+    """Sliding-window limiter on top of an atomic per-bucket counter.
+
+    Subclasses implement ``increment`` (atomically add ``amount`` to the
+    current bucket and return it together with the previous bucket),
+    and ``reset`` (forget every hit of ``key`` in ``window``).
+    """
+
+    def hit(self, key, limit, window, now=None):
+        """Count one request for ``key``; refused requests are not counted."""
+        now = time.time() if now is None else now
+        bucket, elapsed = divmod(now, window)
+        bucket = int(bucket)
+        current, previous = self.increment(key, bucket, window)
+        weight = 1 - elapsed / window
+        count = previous * weight + current
+        if count <= limit:
+            return RateLimitResult(True, count, 0)
+
+        self.increment(key, bucket, window, amount=-1)
+        count -= 1
+        if current > limit or previous == 0:
+            # Only the next fixed window can bring the count back under
+            retry_after = window - elapsed
+        else:
+            # Wait until the previous bucket's weight has decayed enough
+            needed_weight = (limit - current) / previous
+            retry_after = (weight - needed_weight) * window
+        return RateLimitResult(False, count, max(retry_after, 0))
+
+    def release(self, key, window, now=None):
+        """Give back one hit counted for ``key`` in the current window."""
+        now = time.time() if now is None else now
+        self.increment(key, int(now // window), window, amount=-1)
+
+    def increment(self, key, bucket, window, amount=1):
+        raise NotImplementedError
+
+    def reset(self, key, window):
+        raise NotImplementedError
+
+
+class DummyRateLimitBackend(BaseRateLimitBackend):
+    """Allows everything. For load tests that must not be throttled."""
+
+    def increment(self, key, bucket, window, amount=1):
+        return 0, 0
+
+    def reset(self, key, window):
+        pass
+
+
+class LocMemRateLimitBackend(BaseRateLimitBackend):
+    """Per-process counters. Only suitable for development and tests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def increment(self, key, bucket, window, amount=1):
+        with self._lock:
+            counts = self._buckets.setdefault(key, {})
+            for stale in [b for b in counts if b < bucket - 1]:
+                del counts[stale]
+            counts[bucket] = max(counts.get(bucket, 0) + amount, 0)
+            return counts[bucket], counts.get(bucket - 1, 0)
+
+    def reset(self, key, window):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class SQLiteRateLimitBackend(BaseRateLimitBackend):
+    """Counters in a SQLite file shared by every worker on the host.
+
+    Each increment is an upsert inside ``BEGIN IMMEDIATE``, so concurrent
+    workers serialize on the write lock and never lose an update.
+    """
+    # Purge expired buckets on roughly one write in this many
+    purge_every = 1000
+
+    def __init__(self, path, timeout=5.0):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit ("
+                " key TEXT NOT NULL, bucket INTEGER NOT NULL,"
+                " count INTEGER NOT NULL, expires REAL NOT NULL,"
+                " PRIMARY KEY (key, bucket)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ratelimit_expires ON ratelimit (expires)")
+            self._local.connection = conn
+        return conn
+
+    def increment(self, key, bucket, window, amount=1):
+        conn = self.connection
+        expires = (bucket + 2) * window
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO ratelimit (key, bucket, count, expires) VALUES (?, ?, max(?, 0), ?) "
+                "ON CONFLICT (key, bucket) DO UPDATE SET count = max(ratelimit.count + ?, 0)",
+                (key, bucket, amount, expires, amount),
+            )
+            rows = dict(conn.execute(
+                "SELECT bucket, count FROM ratelimit WHERE key = ? AND bucket IN (?, ?)",
+                (key, bucket, bucket - 1),
+            ).fetchall())
+            if random.randrange(self.purge_every) == 0:
+                conn.execute("DELETE FROM ratelimit WHERE expires < ?", (time.time(),))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return rows.get(bucket, 0), rows.get(bucket - 1, 0)
+
+    def reset(self, key, window):
+        self.connection.execute("DELETE FROM ratelimit WHERE key = ?", (key,))
+
+
+class RedisRateLimitBackend(BaseRateLimitBackend):
+    """Counters in Redis (or anything speaking its INCRBY/EXPIRE/GET and WATCH/MULTI protocol).
+
+    Pass a ready ``client`` (e.g. a fake in tests) or a ``url`` to connect
+    with the optional ``redis`` package. Hits are one pipelined INCRBY;
+    decrements are rarer and run as a WATCH transaction so a counter never
+    goes below zero, e.g. when a hit is released after ``reset()``.
+    """
+
+    def __init__(self, url=None, client=None, prefix="ratelimit"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise ImportError("RedisRateLimitBackend needs the 'redis' package.") from exc
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key, bucket):
+        return f"{self.prefix}:{key}:{bucket}"
+
+    def increment(self, key, bucket, window, amount=1):
+        if amount < 0:
+            return self.decrement(key, bucket, -amount)
+        pipe = self.client.pipeline()
+        pipe.incrby(self._key(key, bucket), amount)
+        pipe.expire(self._key(key, bucket), int(window * 2))
+        pipe.get(self._key(key, bucket - 1))
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+    def decrement(self, key, bucket, amount):
+        current_key, previous_key = self._key(key, bucket), self._key(key, bucket - 1)
+        counts = []
+
+        def guarded(pipe):
+            # Retried by the client if the counter changes before EXEC
+            current = int(pipe.get(current_key) or 0)
+            previous = int(pipe.get(previous_key) or 0)
+            counts[:] = max(current - amount, 0), previous
+            pipe.multi()
+            if current > 0:
+                # A missing counter (reset, or expired) stays missing
+                pipe.decrby(current_key, min(amount, current))
+
+        self.client.transaction(guarded, current_key)
+        return tuple(counts)
+
+    def reset(self, key, window):
+        bucket = int(time.time() // window)
+        self.client.delete(self._key(key, bucket), self._key(key, bucket - 1))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """The configured rate-limit backend (one instance per process)."""
+    config = getattr(settings, "RATE_LIMIT", {"BACKEND": "api.ratelimit.LocMemRateLimitBackend"})
+    backend_class = import_string(config["BACKEND"])
+    return backend_class(**config.get("OPTIONS", {}))
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    if setting == "RATE_LIMIT":
+        get_backend.cache_clear()
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: FastJSONRenderer then renders with the stdlib
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+# U+2028/U+2029 in UTF-8, escaped by JSONRenderer to keep JSON a JavaScript subset
+LINE_SEPARATORS = (b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer``'s compact UTF-8 output, written by orjson when it is installed.
+
+    Dates, datetimes (UTC as "Z"), UUIDs and tuples are encoded natively;
+    anything else (``Decimal``, lazy strings) goes through DRF's encoder.
+    Indented (``; indent=``), ASCII-only or non-compact output, and values
+    orjson rejects (integers beyond 64 bits), are rendered by the stdlib as
+    before. Floats use orjson's shortest form (``1e16`` rather than ``1e+16``),
+    and ``NaN`` and infinities render as ``null`` where ``JSONRenderer`` raises.
+    """
+    _default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if LINE_SEPARATORS[0] in ret or LINE_SEPARATORS[1] in ret:
+            ret = ret.replace(LINE_SEPARATORS[0], b"\\u2028").replace(LINE_SEPARATORS[1], b"\\u2029")
+        return ret
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON. Export bodies are streamed directly; this renders
+    the regular responses (errors) a streaming view may still return."""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV with a header row, for the same non-streamed responses as ``NDJSONRenderer``."""
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return buffer.getvalue().encode()
@@ -0,0 +1,142 @@
+"""Read-only rendering of ``.values()`` rows with a ModelSerializer's output.
+
+``RowSerializer`` compiles a serializer's readable fields once per request
+into ``(name, path, converter)`` steps, nested serializers included, and
+builds each item straight from a ``.values()`` dict: no model instances, no
+``get_attribute`` per field and no ``OrderedDict`` per row. Items have the
+serializer's keys in the serializer's order and the same values, so the
+rendered bytes are identical (``manage.py benchmark_serializers`` checks
+this while timing both).
+
+Only plain column fields compile. Method fields, ``source="*"``, many=True
+relations and custom field classes raise ``TypeError``; ``compile_rows``
+remembers such serializer classes, and list views of them keep the regular
+serializer.
+"""
+import logging
+from datetime import date
+
+from rest_framework import fields, relations, serializers
+from rest_framework.settings import api_settings
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Serializer classes that failed to compile, so they aren't retried per request
+_uncompilable = set()
+
+
+def _iso_format(field, default):
+    output_format = getattr(field, "format", default)
+    return isinstance(output_format, str) and output_format.lower() == fields.ISO_8601
+
+
+def _datetime(field):
+    if not _iso_format(field, api_settings.DATETIME_FORMAT):
+        return field.to_representation
+    # Resolved once per request, like the field does on every call
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return convert
+
+
+def _date(field):
+    if not _iso_format(field, api_settings.DATE_FORMAT):
+        return field.to_representation
+    return date.isoformat
+
+
+# Exact field classes only: a subclass may override to_representation
+CONVERTERS = {
+    fields.IntegerField: lambda field: int,
+    fields.CharField: lambda field: str,
+    fields.EmailField: lambda field: str,
+    fields.DateTimeField: _datetime,
+    fields.DateField: _date,
+    # .values() already holds the raw value
+    fields.ReadOnlyField: lambda field: None,
+}
+
+
+def _converter(field):
+    if type(field) is relations.PrimaryKeyRelatedField and field.pk_field is None:
+        return None
+    make = CONVERTERS.get(type(field))
+    if make is None:
+        raise TypeError(f"{type(field).__name__} {field.field_name!r} can't be rendered from .values() rows")
+    return make(field)
+
+
+def _compile(serializer, prefix):
+    steps, paths = [], []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == "*" or getattr(field, "many", False) or isinstance(field, serializers.ListSerializer):
+            raise TypeError(f"{field.field_name!r} can't be rendered from .values() rows")
+        path = prefix + "__".join(field.source_attrs)
+        if isinstance(field, serializers.BaseSerializer):
+            # A nested object is None when its primary key is
+            nested_steps, nested_paths = _compile(field, f"{path}__")
+            pk_path = f"{path}__{field.Meta.model._meta.pk.name}"
+            steps.append((field.field_name, pk_path, None, nested_steps))
+            paths.extend([pk_path, *nested_paths])
+        else:
+            steps.append((field.field_name, path, _converter(field), None))
+            paths.append(path)
+    return steps, paths
+
+
+def _build(steps, row):
+    item = {}
+    for name, path, convert, nested in steps:
+        value = row[path]
+        if value is None:
+            item[name] = None
+        elif nested is not None:
+            item[name] = _build(nested, row)
+        else:
+            item[name] = value if convert is None else convert(value)
+    return item
+
+
+class RowSerializer:
+    """The output of ``serializer`` (a configured ModelSerializer instance) for ``.values()`` rows."""
+
+    def __init__(self, serializer):
+        self.steps, paths = _compile(serializer, "")
+        self.paths = tuple(dict.fromkeys(paths))
+
+    def values(self, queryset, *extra):
+        """``queryset`` as the dict rows ``represent`` takes, plus ``extra`` columns."""
+        return queryset.values(*dict.fromkeys((*self.paths, *extra)))
+
+    def represent(self, rows):
+        with instrumentation.span("serialize"):
+            steps = self.steps
+            return [_build(steps, row) for row in rows]
+
+
+def compile_rows(serializer):
+    """``RowSerializer(serializer)``, or None if its class doesn't compile.
+
+    The decision is kept per serializer class: once one configuration of a
+    class (e.g. one ``expand`` variant) fails, all of its lists use DRF.
+    """
+    serializer_class = type(serializer)
+    if serializer_class in _uncompilable:
+        return None
+    try:
+        return RowSerializer(serializer)
+    except TypeError as error:
+        _uncompilable.add(serializer_class)
+        logger.info("%s lists are rendered by DRF: %s", serializer_class.__name__, error)
+        return None
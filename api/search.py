@@ -0,0 +1,151 @@
+"""Full-text search over the patient and doctor text columns.
+
+PostgreSQL gets a GIN index on a ``to_tsvector('simple', ...)`` expression;
+SQLite gets an FTS5 external-content table that triggers keep in step with
+the base table. Either way a search is applied as ``id IN (<index lookup>)``,
+so the owner scope, ordering and pagination of the queryset are unchanged.
+Words in the search text are matched as prefixes and must all be present.
+
+With ``API_SEARCH_MODE = "basic"``, or where the index is missing (another
+database, or an SQLite build without FTS5), the same words are matched with
+case-insensitive ``LIKE`` over the columns instead (anywhere in a value,
+not only at word starts), which reads every row in scope.
+"""
+import re
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Columns searched per table, as indexed by 0006_search_indexes. Changing
+# these needs a migration that drops and recreates the indexes with the new
+# columns, in literal SQL like 0006's.
+SEARCH_COLUMNS = {
+    "api_patient": ("first_name", "last_name", "email", "phone"),
+    "api_doctor": ("first_name", "last_name", "specialization"),
+}
+
+# Words beyond this are ignored rather than growing the query without bound
+MAX_SEARCH_TERMS = 8
+
+_WORD = re.compile(r"[^\W_]+")
+
+# The migration that creates the search indexes
+SEARCH_MIGRATION = "0006_search_indexes"
+
+
+def _tsvector(columns):
+    # Must match the indexed expression exactly for the planner to use the index
+    return "to_tsvector('simple'::regconfig, {})".format(" || ' ' || ".join(columns))
+
+
+def _fts_table(table):
+    return f"{table}_fts"
+
+
+def _expected_objects(vendor):
+    """Names of the search index objects the migrations create on ``vendor``."""
+    if vendor == "postgresql":
+        return {f"{table}_search_idx" for table in SEARCH_COLUMNS}
+    return {
+        name for table in SEARCH_COLUMNS
+        for name in (_fts_table(table), *(f"{_fts_table(table)}_{event}" for event in ("insert", "delete", "update")))
+    }
+
+
+def check_fulltext_indexes(app_configs=None, databases=None, **kwargs):
+    """System check: the search index objects exist wherever searches would use them.
+
+    A missing FTS5 trigger leaves the index silently out of step with its
+    table. Runs with ``manage.py check --database default``, and only once
+    the migration that creates the indexes is applied.
+    """
+    errors = []
+    if getattr(settings, "API_SEARCH_MODE", "fulltext") != "fulltext":
+        return errors
+    for alias in databases or ():
+        connection = connections[alias]
+        if not has_fulltext_index(connection.vendor):
+            continue
+        if ("api", SEARCH_MIGRATION) not in MigrationRecorder(connection).applied_migrations():
+            continue
+        expected = _expected_objects(connection.vendor)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)", [sorted(expected)])
+            else:
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN ({})".format(
+                        ", ".join(["%s"] * len(expected))),
+                    sorted(expected),
+                )
+            missing = expected - {name for name, in cursor.fetchall()}
+        if missing:
+            errors.append(checks.Error(
+                f"Full-text search objects missing from database {alias!r}: {', '.join(sorted(missing))}.",
+                hint=(
+                    "A migration that rebuilds api_patient or api_doctor on SQLite drops the FTS triggers and "
+                    "has to recreate them, as 0007_relationship_counts does."
+                ),
+                id="api.E001",
+            ))
+    return errors
+
+
+@lru_cache(maxsize=None)
+def sqlite_has_fts5():
+    """Whether the sqlite3 library has the FTS5 module, probed without touching the database."""
+    with closing(sqlite3.connect(":memory:")) as probe:
+        try:
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+
+def has_fulltext_index(vendor):
+    # Decided without a query, so it is safe to call from async views
+    return vendor == "postgresql" or (vendor == "sqlite" and sqlite_has_fts5())
+
+
+def search_terms(text):
+    """Lower-cased words of ``text``; punctuation only separates them."""
+    return _WORD.findall(text.lower())[:MAX_SEARCH_TERMS]
+
+
+def search(queryset, text):
+    """Rows of ``queryset`` containing every word of ``text`` as a word prefix."""
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    columns = SEARCH_COLUMNS[table]
+    vendor = connections[queryset.db].vendor
+    use_index = getattr(settings, "API_SEARCH_MODE", "fulltext") == "fulltext" and has_fulltext_index(vendor)
+
+    if use_index and vendor == "postgresql":
+        lookup = RawSQL(
+            f"SELECT id FROM {table} WHERE {_tsvector(columns)} @@ to_tsquery('simple'::regconfig, %s)",
+            [" & ".join(f"{term}:*" for term in terms)],
+        )
+        return queryset.filter(id__in=lookup)
+    if use_index and vendor == "sqlite":
+        fts = _fts_table(table)
+        lookup = RawSQL(
+            f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s",
+            [" ".join(f'"{term}"*' for term in terms)],
+        )
+        return queryset.filter(id__in=lookup)
+
+    for term in terms:
+        matches = Q()
+        for column in columns:
+            matches |= Q(**{f"{column}__icontains": term})
+        queryset = queryset.filter(matches)
+    return queryset
@@ -2,10 +2,26 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.utils.html import strip_tags
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from . import instrumentation
 from .models import Patient, Doctor, PatientDoctorMap
+from .tokens import RefreshToken
 
 User = get_user_model()
 
+class TimedRepresentationMixin:
+    """Count ``to_representation`` time towards the request's ``serialize`` timing.
+
+    Runs once per row, so a request that isn't being measured skips the span
+    altogether rather than entering it.
+    """
+
+    def to_representation(self, instance):
+        if instrumentation.current() is None:
+            return super().to_representation(instance)
+        with instrumentation.span("serialize"):
+            return super().to_representation(instance)
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True)
@@ -28,15 +44,29 @@ class RegisterSerializer(serializers.ModelSerializer):
         validated_data.pop('password_confirm')
         return User.objects.create_user(**validated_data)
 
-class PatientSerializer(serializers.ModelSerializer):
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    # Blacklists the refresh token it rotates away (see api.tokens)
+    token_class = RefreshToken
+
+class PatientSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = ("id", "first_name", "last_name", "email", "date_of_birth", "phone", "created_at", "updated_at")
-        read_only_fields = ("created_at", "updated_at")
+        fields = (
+            "id", "first_name", "last_name", "email", "date_of_birth", "phone", "doctor_count",
+            "created_at", "updated_at",
+        )
+        read_only_fields = ("doctor_count", "created_at", "updated_at")
 
     def validate_email(self, value):
-        # Check for email uniqueness
-        if Patient.objects.filter(email=value).exists():
+        # Check for email uniqueness. Bulk writes pre-load the taken emails
+        # (email -> patient id) with one IN query and pass them in the context.
+        taken = self.context.get("taken_emails")
+        if taken is not None:
+            owner = taken.get(value)
+            exists = owner is not None and (self.instance is None or owner != self.instance.pk)
+        else:
+            exists = Patient.objects.filter(email=value).exists()
+        if exists:
             raise serializers.ValidationError("A patient with this email already exists.")
         return value
 
@@ -54,11 +84,20 @@ class PatientSerializer(serializers.ModelSerializer):
         # XSS protection - strip HTML tags
         return strip_tags(value).strip()
 
-class DoctorSerializer(serializers.ModelSerializer):
+class BulkPatientSerializer(PatientSerializer):
+    """PatientSerializer for batch writes.
+
+    Drops the per-row ``UniqueValidator`` query on ``email``; uniqueness is
+    checked by ``validate_email`` against the pre-loaded ``taken_emails``.
+    """
+    class Meta(PatientSerializer.Meta):
+        extra_kwargs = {"email": {"validators": []}}
+
+class DoctorSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Doctor
-        fields = ("id", "first_name", "last_name", "email", "specialization", "created_at", "updated_at")
-        read_only_fields = ("created_at", "updated_at")
+        fields = ("id", "first_name", "last_name", "email", "specialization", "patient_count", "created_at", "updated_at")
+        read_only_fields = ("patient_count", "created_at", "updated_at")
 
     def validate_email(self, value):
         # Check for email uniqueness
@@ -80,7 +119,19 @@ class DoctorSerializer(serializers.ModelSerializer):
         # XSS protection - strip HTML tags
         return strip_tags(value).strip()
 
-class MappingSerializer(serializers.ModelSerializer):
+class AssignedDoctorSerializer(DoctorSerializer):
+    """A doctor of one patient, with the id and creation time of the mapping that assigns them.
+
+    Rows come from ``patient_doctors_queryset``, which annotates the mapping columns.
+    """
+    mapping = serializers.IntegerField(source="mapping_id", read_only=True)
+    assigned_at = serializers.DateTimeField(read_only=True)
+
+    class Meta(DoctorSerializer.Meta):
+        fields = DoctorSerializer.Meta.fields + ("mapping", "assigned_at")
+        read_only_fields = fields
+
+class MappingSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     patient_detail = PatientSerializer(source="patient", read_only=True)
     doctor_detail = DoctorSerializer(source="doctor", read_only=True)
 
@@ -96,4 +147,45 @@ class MappingSerializer(serializers.ModelSerializer):
             patient = attrs.get("patient")
             if patient and patient.created_by_id != request.user.id:
                 raise serializers.ValidationError("You can only map doctors to your own patients.")
-        return attrs
\ No newline at end of file
+        return attrs
+
+class MappingListSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """Compact mapping representation for list responses.
+
+    ``patient_detail``/``doctor_detail`` are only rendered when named in the
+    ``expand`` set passed through the serializer context (``?expand=patient,doctor``).
+    """
+    patient_detail = PatientSerializer(source="patient", read_only=True)
+    doctor_detail = DoctorSerializer(source="doctor", read_only=True)
+
+    class Meta:
+        model = PatientDoctorMap
+        fields = ("id", "patient", "doctor", "patient_detail", "doctor_detail", "created_at")
+        read_only_fields = fields
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get("expand", set())
+        for name in ("patient", "doctor"):
+            if name not in expand:
+                self.fields.pop(f"{name}_detail")
+
+
+class BulkMappingItemSerializer(serializers.Serializer):
+    """One item of a bulk mapping create, validated against pre-loaded id sets.
+
+    The context carries ``owned_patients``, ``doctors`` and ``existing_pairs``
+    so that a whole batch is checked without a query per item.
+    """
+    patient = serializers.IntegerField()
+    doctor = serializers.IntegerField()
+
+    def validate(self, attrs):
+        patient, doctor = attrs["patient"], attrs["doctor"]
+        if patient not in self.context["owned_patients"]:
+            raise serializers.ValidationError({"patient": "You can only map doctors to your own patients."})
+        if doctor not in self.context["doctors"]:
+            raise serializers.ValidationError({"doctor": f'Invalid pk "{doctor}" - object does not exist.'})
+        if (patient, doctor) in self.context["existing_pairs"]:
+            raise serializers.ValidationError("This doctor is already assigned to this patient.")
+        return attrs
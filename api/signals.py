@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache_key
+from .cache import bump_version
+from .models import Doctor
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_doctor_responses(sender, instance, **kwargs):
+    # After commit, so a concurrent read can't cache the old rows under the new version
+    transaction.on_commit(lambda: bump_version("doctors"))
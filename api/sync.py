@@ -0,0 +1,154 @@
+"""Delta sync over patients and mappings.
+
+Every write that goes through the API appends a ``ChangeLog`` row for the
+owning user, in the same transaction as the write; deletes become tombstones.
+A client keeps the id of the last entry it has seen as its cursor and asks
+for the entries after it, which are collapsed to the latest state per row.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import ChangeLog, Doctor, Patient, PatientDoctorMap
+from .serializers import PatientSerializer, MappingListSerializer
+
+
+class CursorExpired(Exception):
+    """The entries after the client's cursor were purged; it has to resync from scratch."""
+
+
+def record(owner_id, kind, object_ids, deleted=False):
+    """Append one entry per id. Call inside the transaction that makes the change."""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(owner_id=owner_id, kind=kind, object_id=pk, deleted=deleted) for pk in object_ids
+    ])
+
+
+def record_patients_deleted(owner_id, patient_ids):
+    """Tombstones for patients about to be deleted and for the mappings that cascade with them.
+
+    Returns the cascading mappings' ``(patient_id, doctor_id)`` pairs for
+    ``counts.patients_deleting``, so they are read once.
+    """
+    # Written before the read below: on SQLite this takes the write lock first,
+    # so the transaction never has to upgrade a read lock
+    record(owner_id, ChangeLog.PATIENT, patient_ids, deleted=True)
+    mappings = list(
+        PatientDoctorMap.objects.filter(patient_id__in=patient_ids).values_list("id", "patient_id", "doctor_id")
+    )
+    record(owner_id, ChangeLog.MAPPING, [pk for pk, _, _ in mappings], deleted=True)
+    return [(patient_id, doctor_id) for _, patient_id, doctor_id in mappings]
+
+
+def record_doctor_deleted(doctor_id):
+    """Tombstones, for every owner, of the mappings that cascade with a doctor.
+
+    Returns the ``(owner_id, patient_id)`` of each cascading mapping for
+    ``counts.doctor_deleting``.
+    """
+    # Nothing is known to write before the read, so touch the doctor row to
+    # take SQLite's write lock first (see record_patients_deleted)
+    Doctor.objects.filter(pk=doctor_id).update(updated_at=timezone.now())
+    mappings = list(
+        PatientDoctorMap.objects.filter(doctor_id=doctor_id).values_list("id", "patient_id", "owner_id")
+    )
+    ChangeLog.objects.bulk_create([
+        ChangeLog(owner_id=owner_id, kind=ChangeLog.MAPPING, object_id=pk, deleted=True)
+        for pk, _, owner_id in mappings
+    ])
+    return [(owner_id, patient_id) for _, patient_id, owner_id in mappings]
+
+
+def _horizon():
+    # On databases with concurrent writers, ids are allocated before commit, so
+    # a young entry may still have an uncommitted, lower-numbered neighbour.
+    # Entries younger than the settle window are left for the next sync. This
+    # narrows the gap rather than closing it: an entry whose transaction
+    # commits more than the window after writing it is still skipped.
+    settle = getattr(settings, "SYNC_SETTLE_SECONDS", 0)
+    return timezone.now() - timedelta(seconds=settle) if settle else None
+
+
+def head_cursor():
+    """Cursor to start syncing from after taking a full snapshot."""
+    entries = ChangeLog.objects.order_by("-id")
+    horizon = _horizon()
+    if horizon is not None:
+        entries = entries.filter(created_at__lt=horizon)
+    return entries.values_list("id", flat=True).first() or 0
+
+
+def parse_params(query_params):
+    def integer(name, default, minimum, maximum=None):
+        raw = query_params.get(name)
+        if raw is None:
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise serializers.ValidationError({name: "Expected an integer."})
+        if value < minimum:
+            raise serializers.ValidationError({name: f"Must be at least {minimum}."})
+        return min(value, maximum) if maximum else value
+
+    since = integer("since", None, 0)
+    limit = integer("limit", settings.SYNC_PAGE_SIZE, 1, settings.SYNC_MAX_PAGE_SIZE)
+    return since, limit
+
+
+def changes_since(user, since, limit, context):
+    """Upserted and deleted rows after ``since``, at most ``limit`` log entries' worth."""
+    if since:
+        first = ChangeLog.objects.aggregate(first=Min("id"))["first"]
+        if first is not None and since < first - 1:
+            raise CursorExpired()
+
+    entries = ChangeLog.objects.filter(owner_id=user.id, id__gt=since).order_by("id")
+    horizon = _horizon()
+    if horizon is not None:
+        entries = entries.filter(created_at__lt=horizon)
+    page = list(entries.values_list("id", "kind", "object_id", "deleted")[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # Later entries for the same row win
+    latest = {(kind, object_id): deleted for _, kind, object_id, deleted in page}
+    changed = {kind: [pk for (k, pk), deleted in latest.items() if k == kind and not deleted]
+               for kind in (ChangeLog.PATIENT, ChangeLog.MAPPING)}
+    deleted = {kind: [pk for (k, pk), gone in latest.items() if k == kind and gone]
+               for kind in (ChangeLog.PATIENT, ChangeLog.MAPPING)}
+
+    # Rows deleted after this page are skipped here; their tombstones follow.
+    # An empty id__in runs no query.
+    patients = Patient.objects.filter(created_by_id=user.id, id__in=changed[ChangeLog.PATIENT])
+    mappings = PatientDoctorMap.objects.filter(
+        owner_id=user.id, id__in=changed[ChangeLog.MAPPING],
+    )
+    return {
+        "cursor": page[-1][0] if page else since,
+        "has_more": has_more,
+        "patients": {
+            "changed": PatientSerializer(patients, many=True, context=context).data,
+            "deleted": deleted[ChangeLog.PATIENT],
+        },
+        "mappings": {
+            "changed": MappingListSerializer(mappings, many=True, context={**context, "expand": set()}).data,
+            "deleted": deleted[ChangeLog.MAPPING],
+        },
+    }
+
+
+def purge(before):
+    """Delete entries created before ``before``; returns the number removed.
+
+    The newest entry is always kept, so cursors older than the purge can still
+    be told apart from up-to-date ones (see ``CursorExpired``).
+    """
+    newest = ChangeLog.objects.order_by("-id").values_list("id", flat=True).first()
+    if newest is None:
+        return 0
+    deleted, _ = ChangeLog.objects.filter(created_at__lt=before, id__lt=newest).delete()
+    return deleted
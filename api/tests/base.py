@@ -0,0 +1,73 @@
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.models import Doctor, Patient, PatientDoctorMap
+from api.ratelimit import get_backend
+
+User = get_user_model()
+
+_serial = count(1)
+
+# Plain HTTP, no shared rate-limit or response-cache store, cheap hashes, and no budget or timing logs
+TEST_SETTINGS = {
+    "CACHES": {**settings.CACHES, "responses": settings.RESPONSE_CACHE_BACKENDS["locmem"]},
+    "SECURE_SSL_REDIRECT": False,
+    "REQUEST_TIMING": {"LOG_SAMPLE_RATE": 0.0, "SLOW_REQUEST_MS": None},
+    "RATE_LIMIT": {"BACKEND": "api.ratelimit.DummyRateLimitBackend"},
+    "PASSWORD_PBKDF2_ITERATIONS": 1000,
+    "API_QUERY_BUDGET_MODE": "off",
+}
+
+
+class FixturesMixin:
+    """Users, patients, doctors and mappings for API tests, and a client logged in as ``self.user``."""
+
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+        # A fresh instance, so per-process counters don't carry over between tests
+        get_backend.cache_clear()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def make_user(**fields):
+        n = next(_serial)
+        return User.objects.create_user(
+            username=f"user{n}", email=f"user{n}@example.com", password="s3cret-pass", **fields,
+        )
+
+    def make_patient(self, user=None, **fields):
+        n = next(_serial)
+        return Patient.objects.create(**{
+            "created_by": user or self.user, "first_name": f"Patient{n}", "last_name": "Test",
+            "email": f"patient{n}@example.com", **fields,
+        })
+
+    @staticmethod
+    def make_doctor(**fields):
+        n = next(_serial)
+        return Doctor.objects.create(**{
+            "first_name": f"Doctor{n}", "last_name": "Test", "email": f"doctor{n}@example.com",
+            "specialization": "Cardiology", **fields,
+        })
+
+    @staticmethod
+    def make_mapping(patient, doctor):
+        # Through the model, so the counts below are set by hand
+        Patient.objects.filter(pk=patient.pk).update(doctor_count=patient.doctor_count + 1)
+        Doctor.objects.filter(pk=doctor.pk).update(patient_count=doctor.patient_count + 1)
+        patient.doctor_count += 1
+        doctor.patient_count += 1
+        return PatientDoctorMap.objects.create(patient=patient, doctor=doctor, owner_id=patient.created_by_id)
+
+
+@override_settings(**TEST_SETTINGS)
+class APITest(FixturesMixin, APITestCase):
+    pass
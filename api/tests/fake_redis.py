@@ -0,0 +1,107 @@
+"""An in-memory stand-in for the ``redis.Redis`` commands the rate limiter sends.
+
+Supports GET, INCRBY, DECRBY, EXPIRE and DELETE, pipelines, and
+``transaction()`` with WATCH/MULTI/EXEC semantics: a watched key written by
+another client before EXEC makes the transaction retry. Expiry is recorded
+but never applied.
+"""
+import threading
+
+
+class WatchError(Exception):
+    pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data = {}
+        self.ttl = {}
+        # Bumped on every write to a key, for WATCH
+        self.versions = {}
+
+    def _write(self, key, value):
+        if value is None:
+            self.data.pop(key, None)
+            self.ttl.pop(key, None)
+        else:
+            self.data[key] = value
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            return None if value is None else str(value).encode()
+
+    def incrby(self, key, amount):
+        with self.lock:
+            value = int(self.data.get(key, 0)) + amount
+            self._write(key, value)
+            return value
+
+    def decrby(self, key, amount):
+        return self.incrby(key, -amount)
+
+    def expire(self, key, seconds):
+        with self.lock:
+            if key not in self.data:
+                return False
+            self.ttl[key] = seconds
+            return True
+
+    def delete(self, *keys):
+        with self.lock:
+            found = [key for key in keys if key in self.data]
+            for key in found:
+                self._write(key, None)
+            return len(found)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def transaction(self, func, *watches):
+        while True:
+            pipe = FakePipeline(self)
+            pipe.watch(*watches)
+            try:
+                func(pipe)
+                return pipe.execute()
+            except WatchError:
+                continue
+
+
+class FakePipeline:
+    """Queues commands until ``execute()``; while watching, runs them immediately until ``multi()``."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+        self.watched = {}
+        self.immediate = False
+
+    def watch(self, *keys):
+        self.immediate = True
+        with self.client.lock:
+            self.watched = {key: self.client.versions.get(key, 0) for key in keys}
+
+    def multi(self):
+        self.immediate = False
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+
+        def call(*args):
+            if self.immediate:
+                return command(*args)
+            self.commands.append((command, args))
+            return self
+        return call
+
+    def execute(self):
+        with self.client.lock:
+            if any(self.client.versions.get(key, 0) != version for key, version in self.watched.items()):
+                raise WatchError()
+            try:
+                return [command(*args) for command, args in self.commands]
+            finally:
+                self.commands, self.watched = [], {}
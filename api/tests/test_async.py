@@ -0,0 +1,120 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, override_settings
+from django.urls import include, path, resolve, reverse
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import export, urls as api_urls
+from api.views import DoctorPatientsView
+
+from .base import APITest
+
+# api.urls built its views when it was imported; these are the same routes as async views
+with override_settings(API_ASYNC_READS=True):
+    router = DefaultRouter()
+    for prefix, viewset, basename in api_urls.router.registry:
+        router.register(prefix, viewset, basename=basename)
+    urlpatterns = [
+        path("api/doctors/<int:doctor_id>/patients/", DoctorPatientsView.as_view(), name="doctors-patients"),
+        path("api/", include(router.urls)),
+    ]
+
+
+@override_settings(ROOT_URLCONF=__name__, API_ASYNC_READS=True)
+class AsyncTest(APITest):
+    def setUp(self):
+        super().setUp()
+        # Django 4.2's AsyncClient drops client-wide headers, so each request sends the token
+        self.client = AsyncClient()
+        self.token = AccessToken.for_user(self.user)
+        self.patients = [self.make_patient() for _ in range(3)]
+        self.newest_first = [patient.pk for patient in reversed(self.patients)]
+        self.doctor = self.make_doctor()
+        self.other = self.make_patient(user=self.make_user())
+
+    async def get(self, url, status=200, headers=None, **extra):
+        headers = {"Authorization": f"Bearer {self.token}", **(headers or {})}
+        response = await self.client.get(url, headers=headers, **extra)
+        self.assertEqual(response.status_code, status)
+        return response
+
+
+class AsyncReadTests(AsyncTest):
+    def test_reads_resolve_to_async_views(self):
+        for url in (reverse("patients-list"), reverse("patients-detail", args=[self.patients[0].pk])):
+            with self.subTest(url=url):
+                self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    async def test_list(self):
+        data = json.loads((await self.get(reverse("patients-list"))).content)
+        self.assertEqual(data["count"], 3)
+        self.assertEqual([row["id"] for row in data["results"]], self.newest_first)
+
+    async def test_retrieve(self):
+        patient = self.patients[0]
+        response = await self.get(reverse("patients-detail", args=[patient.pk]))
+        self.assertEqual(json.loads(response.content)["email"], patient.email)
+        await self.get(reverse("patients-detail", args=[0]), status=404)
+        await self.get(reverse("patients-detail", args=["x"]), status=404)
+
+    async def test_other_owners_patient_is_not_found(self):
+        await self.get(reverse("patients-detail", args=[self.other.pk]), status=404)
+
+    async def test_conditional_reads_are_304(self):
+        for url in (reverse("patients-list"), reverse("patients-detail", args=[self.patients[0].pk])):
+            with self.subTest(url=url):
+                etag = (await self.get(url))["ETag"]
+                response = await self.get(url, status=304, headers={"If-None-Match": etag})
+                self.assertEqual(response["ETag"], etag)
+                self.assertEqual(response.content, b"")
+
+    async def test_page_number_pagination(self):
+        url = reverse("patients-list")
+        data = json.loads((await self.get(url, data={"page_size": 2, "page": 2})).content)
+        self.assertEqual((data["count"], [row["id"] for row in data["results"]]), (3, self.newest_first[2:]))
+        self.assertIsNone(data["next"])
+        self.assertIn("page_size=2", data["previous"])
+        await self.get(url, status=404, data={"page_size": 2, "page": 3})
+
+    async def test_cursor_pagination(self):
+        url, ids, params = reverse("patients-list"), [], {"pagination": "cursor", "page_size": 2}
+        while url:
+            data = json.loads((await self.get(url, data=params)).content)
+            self.assertNotIn("count", data)
+            ids += [row["id"] for row in data["results"]]
+            url, params = data["next"], None
+        self.assertEqual(ids, self.newest_first)
+        await self.get(reverse("patients-list"), status=400, data={"cursor": "not-a-cursor"})
+
+    async def test_view_without_actions(self):
+        response = await self.get(reverse("doctors-patients", args=[self.doctor.pk]))
+        self.assertEqual(json.loads(response.content)["count"], 0)
+
+
+class ExportTransportTests(AsyncTest):
+    async def export(self):
+        with mock.patch.object(export, "EXPORT_BATCH_SIZE", 2):
+            response = await self.get(reverse("patients-export"))
+            if response.is_async:
+                chunks = [chunk async for chunk in response.streaming_content]
+            else:
+                # What Django's ASGI handler does with a sync iterator: read it all, then send it
+                chunks = await sync_to_async(list)(response.streaming_content)
+        rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+        self.assertEqual([row["id"] for row in rows], self.newest_first)
+        return response, chunks
+
+    @override_settings(SERVER_INTERFACE="asgi")
+    async def test_asgi_export_streams_an_async_iterator(self):
+        response, chunks = await self.export()
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(chunks), 2)
+
+    async def test_wsgi_export_streams_a_sync_iterator(self):
+        response, chunks = await self.export()
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(chunks), 2)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.views import PatientViewSet
+
+from .base import APITest
+
+
+class ClaimsAuthenticationTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.url = reverse("patients-list")
+
+    def create_patient(self):
+        return self.client.post(self.url, {"first_name": "Claims", "email": "claims@example.com"}, format="json")
+
+    def user_queries(self, method, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = method(*args, **kwargs)
+        return response, [query["sql"] for query in queries if '"auth_user"' in query["sql"]]
+
+    def test_reads_trust_the_claims(self):
+        self.make_patient()
+        response, user_queries = self.user_queries(self.client.get, self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(user_queries, [])
+
+    def test_writes_check_the_user_through_the_cache(self):
+        response, user_queries = self.user_queries(self.create_patient)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(user_queries), 1)
+        response, user_queries = self.user_queries(
+            self.client.post, self.url, {"first_name": "Again", "email": "again@example.com"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(user_queries, [])
+
+    def test_deleted_user_cannot_write(self):
+        self.create_patient()
+        self.user.delete()
+        response = self.create_patient()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"].code, "user_not_found")
+        # Reads still trust the unexpired token, and find nothing
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response.data["count"]), (200, 0))
+
+    def test_deactivated_user_cannot_write(self):
+        self.create_patient()
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+        response = self.create_patient()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"].code, "user_inactive")
+
+
+@mock.patch.object(PatientViewSet, "authentication_classes", [JWTAuthentication])
+class DatabaseAuthenticationTests(ClaimsAuthenticationTests):
+    """``JWT_AUTH_MODE=database``: every request loads the user."""
+
+    def test_reads_trust_the_claims(self):
+        response, user_queries = self.user_queries(self.client.get, self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+
+    def test_writes_check_the_user_through_the_cache(self):
+        for n in range(2):
+            response, user_queries = self.user_queries(
+                self.client.post, self.url, {"first_name": "Db", "email": f"db{n}@example.com"}, format="json",
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(user_queries), 1)
+
+    def test_deleted_user_cannot_write(self):
+        self.user.delete()
+        self.assertEqual(self.create_patient().status_code, 401)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivated_user_cannot_write(self):
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+        self.assertEqual(self.create_patient().status_code, 401)
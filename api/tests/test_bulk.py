@@ -0,0 +1,59 @@
+from django.urls import reverse
+
+from api.models import ChangeLog, Doctor, Patient, PatientDoctorMap
+
+from .base import APITest
+
+
+class BulkValidationTests(APITest):
+
+    def test_boolean_ids_are_rejected(self):
+        for url, data in (
+            (reverse("patients-bulk"), {"ids": [True]}),
+            (reverse("mappings-bulk"), [False, 1]),
+        ):
+            response = self.client.delete(url, data, format="json")
+            self.assertEqual(response.status_code, 400, url)
+        response = self.client.patch(reverse("patients-bulk"), [{"id": True, "first_name": "X"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"detail": "Every item needs an integer 'id'."})
+
+
+class BulkDeleteTests(APITest):
+
+    def setUp(self):
+        super().setUp()
+        self.doctor = self.make_doctor()
+        self.patients = [self.make_patient() for _ in range(2)]
+        self.mappings = [self.make_mapping(patient, self.doctor) for patient in self.patients]
+
+    def delete_mappings(self, ids):
+        return self.client.delete(reverse("mappings-bulk"), {"ids": ids}, format="json")
+
+    def test_mappings_are_uncounted_once(self):
+        ids = [mapping.pk for mapping in self.mappings]
+        response = self.delete_mappings(ids)
+        self.assertEqual(response.data["succeeded"], 2)
+        # A second delete of the same ids (e.g. a client retry racing the first) finds nothing
+        response = self.delete_mappings(ids)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result["status"] for result in response.data["results"]], [404, 404])
+        self.assertEqual(Doctor.objects.get().patient_count, 0)
+        self.assertEqual(set(Patient.objects.values_list("doctor_count", flat=True)), {0})
+        self.assertEqual(ChangeLog.objects.filter(kind=ChangeLog.MAPPING, deleted=True).count(), 2)
+
+    def test_other_owners_rows_are_not_found(self):
+        other = self.make_patient(user=self.make_user())
+        mapping = self.make_mapping(other, self.doctor)
+        response = self.delete_mappings([mapping.pk, self.mappings[0].pk])
+        self.assertEqual(response.status_code, 207)
+        self.assertTrue(PatientDoctorMap.objects.filter(pk=mapping.pk).exists())
+        self.assertEqual(Doctor.objects.get().patient_count, 2)
+
+    def test_patients_uncount_their_doctors(self):
+        response = self.client.delete(
+            reverse("patients-bulk"), {"ids": [patient.pk for patient in self.patients]}, format="json",
+        )
+        self.assertEqual(response.data["succeeded"], 2)
+        self.assertFalse(PatientDoctorMap.objects.exists())
+        self.assertEqual(Doctor.objects.get().patient_count, 0)
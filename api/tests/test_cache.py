@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from api.cache import namespace_version
+
+from .base import APITest
+
+
+class DoctorCacheTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.doctor = self.make_doctor()
+        self.patient = self.make_patient()
+        self.url = reverse("doctors-detail", args=[self.doctor.pk])
+
+    def test_second_read_is_a_hit(self):
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+
+    def test_hits_run_no_queries(self):
+        for url in (self.url, reverse("doctors-list")):
+            with self.subTest(url=url):
+                miss = self.client.get(url)
+                with self.assertNumQueries(0):
+                    hit = self.client.get(url)
+                self.assertEqual(hit["X-Cache"], "HIT")
+                self.assertEqual(hit.content, miss.content)
+                self.assertEqual(hit["ETag"], miss["ETag"])
+                self.assertEqual(hit["Last-Modified"], miss["Last-Modified"])
+
+    def test_conditional_hits_answer_304_without_queries(self):
+        for url in (self.url, reverse("doctors-list")):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+
+    def test_doctor_update_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {"specialization": "Neurology"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["specialization"], "Neurology")
+
+    def test_mapping_writes_keep_the_version(self):
+        version = namespace_version("doctors")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("mappings-list"), {"patient": self.patient.pk, "doctor": self.doctor.pk}, format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(namespace_version("doctors"), version)
+
+    @override_settings(RESPONSE_CACHE_COUNT_TIMEOUT=7)
+    def test_doctor_pages_expire_after_the_count_timeout(self):
+        with mock.patch("django.core.cache.backends.locmem.LocMemCache.set", autospec=True) as cache_set:
+            self.client.get(self.url)
+        self.assertEqual(cache_set.call_args.kwargs["timeout"], 7)
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from api import export
+from api.models import Patient
+
+from .base import APITest
+
+
+class ExportTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.patients = [self.make_patient() for _ in range(5)]
+        self.doctor = self.make_doctor()
+        self.mappings = [self.make_mapping(patient, self.doctor) for patient in self.patients[:2]]
+        # Another owner's rows
+        other = self.make_patient(user=self.make_user())
+        self.make_mapping(other, self.doctor)
+
+    def export(self, basename, **extra):
+        response = self.client.get(reverse(f"{basename}-export"), **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def ndjson(self, basename, **extra):
+        response, body = self.export(basename, **extra)
+        self.assertEqual(response["Content-Type"], export.CONTENT_TYPES["ndjson"])
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_ndjson_rows_match_the_api(self):
+        rows = self.ndjson("patients")
+        self.assertEqual([row["id"] for row in rows], [patient.pk for patient in reversed(self.patients)])
+        self.assertEqual(list(rows[0]), list(export.PATIENT_COLUMNS))
+        detail = self.client.get(reverse("patients-detail", args=[rows[0]["id"]])).data
+        for field in ("first_name", "email", "created_at", "updated_at"):
+            self.assertEqual(rows[0][field], detail[field])
+
+    def test_csv_by_format_or_accept(self):
+        for extra in ({"data": {"format": "csv"}}, {"HTTP_ACCEPT": "text/csv"}):
+            with self.subTest(extra=extra):
+                response, body = self.export("patients", **extra)
+                self.assertEqual(response["Content-Type"], export.CONTENT_TYPES["csv"])
+                self.assertRegex(response["Content-Disposition"], r'attachment; filename="patients-\d{8}\.csv"')
+                rows = list(csv.DictReader(io.StringIO(body)))
+                self.assertEqual([int(row["id"]) for row in rows], [patient.pk for patient in reversed(self.patients)])
+                self.assertEqual(rows[0]["email"], self.patients[-1].email)
+
+    def test_empty_csv_is_the_header(self):
+        Patient.objects.filter(created_by=self.user).delete()
+        _, body = self.export("patients", data={"format": "csv"})
+        self.assertEqual(body, ",".join(export.PATIENT_COLUMNS) + "\r\n")
+
+    def test_rows_cross_batch_boundaries(self):
+        # Equal timestamps, so batches continue on the id alone
+        Patient.objects.filter(created_by=self.user).update(created_at=timezone.now())
+        for size, batches in ((2, 3), (5, 2), (6, 1)):
+            with self.subTest(batch_size=size), mock.patch.object(export, "EXPORT_BATCH_SIZE", size):
+                with self.assertNumQueries(batches):
+                    rows = self.ndjson("patients")
+                self.assertEqual(
+                    [row["id"] for row in rows], sorted((patient.pk for patient in self.patients), reverse=True),
+                )
+
+    def test_mappings_are_the_owners_joined_rows(self):
+        rows = self.ndjson("mappings")
+        self.assertEqual([row["id"] for row in rows], [mapping.pk for mapping in reversed(self.mappings)])
+        self.assertEqual(rows[0]["patient_email"], self.patients[1].email)
+        self.assertEqual(rows[0]["doctor_specialization"], self.doctor.specialization)
+
+    def test_other_owners_rows_are_not_exported(self):
+        self.client.force_authenticate(self.make_user())
+        self.assertEqual(self.ndjson("patients"), [])
+        self.assertEqual(self.ndjson("mappings"), [])
+
+    def test_unknown_format_is_refused(self):
+        url = reverse("patients-export")
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT="application/xml").status_code, 406)
+
+    def test_anonymous_export_is_refused(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse("patients-export")).status_code, 401)
@@ -0,0 +1,84 @@
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api import hashers
+from api.hashers import HashingBusy, get_pool, refuse_when_busy
+
+from .base import TEST_SETTINGS, APITest
+
+
+def full(pool):
+    """Take every slot of ``pool`` until the returned callable gives them back."""
+    taken = 0
+    while pool.slots.acquire(blocking=False):
+        taken += 1
+    return lambda: [pool.slots.release() for _ in range(taken)]
+
+
+class LoginHashingTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+
+    def login(self):
+        return self.client.post(
+            reverse("login"), {"username": self.user.username, "password": "s3cret-pass"}, format="json",
+        )
+
+    def test_login_rehashes_with_the_current_cost(self):
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=500):
+            self.user.set_password("s3cret-pass")
+        self.user.save(update_fields=["password"])
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"), self.user.password)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    def test_full_pool_is_a_503(self):
+        self.addCleanup(full(get_pool()))
+        with mock.patch("api.views.get_rate_limiter") as limiter:
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        # Not a rejected password: the attempt is given back
+        limiter.return_value.release.assert_called_once()
+
+
+@override_settings(**TEST_SETTINGS, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+class HashPoolTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.encoded = make_password("s3cret-pass")
+        self.pool = get_pool()
+
+    def test_full_pool_hashes_inline_outside_the_api(self):
+        self.addCleanup(full(self.pool))
+        with mock.patch.object(self.pool.executor, "submit") as submit:
+            self.assertTrue(check_password("s3cret-pass", self.encoded))
+            self.assertTrue(check_password("s3cret-pass", make_password("s3cret-pass")))
+        submit.assert_not_called()
+
+    def test_full_pool_refuses_inside_the_api(self):
+        self.addCleanup(full(self.pool))
+        with refuse_when_busy(), self.assertRaises(HashingBusy):
+            check_password("s3cret-pass", self.encoded)
+
+    def test_broken_pool_is_replaced(self):
+        with mock.patch.object(self.pool.executor, "submit", side_effect=BrokenProcessPool()) as submit:
+            with refuse_when_busy():
+                self.assertTrue(check_password("s3cret-pass", self.encoded))
+                self.assertFalse(check_password("wrong", self.encoded))
+        # Only the first hash saw the broken pool; the second got a fresh one
+        self.assertEqual(submit.call_count, 1)
+        self.assertIsNot(get_pool(), self.pool)
+        self.assertEqual(self.pool.slots._value, 1)
+
+    def test_workers_hash_inline(self):
+        with mock.patch.object(hashers, "_in_worker", True), \
+                mock.patch.object(self.pool.executor, "submit") as submit:
+            self.assertTrue(check_password("s3cret-pass", self.encoded))
+        submit.assert_not_called()
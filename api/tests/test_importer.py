@@ -0,0 +1,75 @@
+from unittest import mock
+
+from api import importer
+from api.models import Doctor, PatientDoctorMap
+
+from .base import APITest
+
+
+class DoctorImporterTests(APITest):
+    def test_created_counts_only_new_rows(self):
+        taken = self.make_doctor()
+        objects = [
+            Doctor(first_name="New", email="new@example.com", specialization="Cardiology"),
+            # Claimed by another writer after validation
+            Doctor(first_name="Late", email=taken.email, specialization="Cardiology"),
+        ]
+        self.assertEqual(importer.DoctorImporter().write(objects), 1)
+        self.assertEqual(Doctor.objects.count(), 2)
+
+    def test_run_reports_rejects_and_creates(self):
+        taken = self.make_doctor()
+        records = [
+            (1, {"first_name": "A", "email": "a@example.com", "specialization": "Cardiology"}),
+            (2, {"first_name": "B", "email": taken.email, "specialization": "Cardiology"}),
+            (3, {"first_name": "C", "email": "a@example.com", "specialization": "Cardiology"}),
+        ]
+        result = importer.DoctorImporter().run(records)
+        self.assertEqual((result.read, result.created, result.rejected), (3, 1, 2))
+
+
+class MappingImporterTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.patient = self.make_patient()
+        self.doctors = [self.make_doctor() for _ in range(3)]
+
+    def test_mapped_reads_only_the_given_pairs(self):
+        first = self.make_mapping(self.patient, self.doctors[0])
+        self.make_mapping(self.patient, self.doctors[1])
+        pairs = [(self.patient.pk, self.doctors[0].pk), (self.patient.pk, self.doctors[2].pk), (None, 1)]
+        self.assertEqual(importer._mapped(pairs), [(first.pk, self.patient.pk, self.doctors[0].pk)])
+
+    def test_mapped_chunks_patients(self):
+        patients = [self.patient, self.make_patient(), self.make_patient()]
+        mappings = [self.make_mapping(patient, self.doctors[0]) for patient in patients]
+        with mock.patch.object(importer, "MAPPED_CHUNK_SIZE", 2), self.assertNumQueries(2):
+            rows = importer._mapped([(patient.pk, self.doctors[0].pk) for patient in patients])
+        self.assertEqual(sorted(pk for pk, _, _ in rows), [mapping.pk for mapping in mappings])
+
+    def test_existing_and_repeated_pairs_are_rejected(self):
+        self.make_mapping(self.patient, self.doctors[0])
+        records = [
+            (1, {"patient": self.patient.pk, "doctor": self.doctors[0].pk}),
+            (2, {"patient": self.patient.pk, "doctor": self.doctors[1].pk}),
+            (3, {"patient_email": self.patient.email, "doctor_email": self.doctors[1].email}),
+        ]
+        result = importer.MappingImporter(user=self.user).run(records)
+        self.assertEqual((result.created, result.rejected), (1, 2))
+        self.assertEqual([reject["line"] for reject in result.rejects], [1, 3])
+        self.assertEqual(PatientDoctorMap.objects.filter(patient=self.patient).count(), 2)
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.doctor_count, 2)
+
+    def test_boolean_ids_are_rejected(self):
+        records = [
+            (1, {"patient": True, "doctor": self.doctors[0].pk}),
+            (2, {"patient": self.patient.pk, "doctor": False}),
+        ]
+        result = importer.MappingImporter(user=self.user).run(records)
+        self.assertEqual((result.created, result.rejected), (0, 2))
+        self.assertEqual(
+            [reject["errors"] for reject in result.rejects],
+            [{"patient": "A valid integer is required."}, {"doctor": "A valid integer is required."}],
+        )
+        self.assertFalse(PatientDoctorMap.objects.exists())
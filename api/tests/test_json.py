@@ -0,0 +1,159 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+from .base import APITest
+
+VALUES = {
+    "int": 7,
+    "int64": -2 ** 63,
+    "uint64": 2 ** 64 - 1,
+    "big": 2 ** 70,
+    "negative_big": -2 ** 70,
+    "float": 0.1,
+    "negative_zero": -0.0,
+    "text": "é ☃ \U0001f600",
+    "separators": "a b c",
+    "escapes": 'quote " backslash \\ tab \t nul \x00',
+    "datetime": datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc),
+    "offset": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))),
+    "naive": datetime(2024, 1, 2, 3, 4, 5),
+    "date": date(2024, 1, 2),
+    "time": time(3, 4, 5, 120000),
+    "timedelta": timedelta(seconds=90),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "decimal": Decimal("1.10"),
+    "lazy": gettext_lazy("Not found."),
+    "tuple": (1, "two"),
+    "int_keys": {1: "a"},
+    "nested": [{"a": None, "b": True}, []],
+}
+
+
+def parse(parser, body):
+    return parser.parse(io.BytesIO(body), parser_context={})
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertSameRender(self, data, media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type),
+        )
+
+    def test_values_render_like_drf(self):
+        for name, value in VALUES.items():
+            with self.subTest(name):
+                self.assertSameRender({name: value})
+        self.assertSameRender(VALUES)
+
+    def test_fallbacks_render_like_drf(self):
+        cases = {
+            # orjson refuses integers beyond 64 bits
+            "big": {"n": 2 ** 64},
+            # Escaped to keep JSON a JavaScript subset
+            "separators": [" ", " "],
+            "indented": {"a": [1, 2]},
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertSameRender(data, "application/json; indent=4" if name == "indented" else None)
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(cases["separators"]))
+        self.assertEqual(FastJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_ascii_renderer_falls_back(self):
+        class ASCIIRenderer(FastJSONRenderer):
+            ensure_ascii = True
+
+        with mock.patch.object(renderers.orjson, "dumps") as dumps:
+            self.assertEqual(ASCIIRenderer().render({"a": "é"}), b'{"a":"\\u00e9"}')
+        dumps.assert_not_called()
+
+    def test_documented_differences(self):
+        self.assertEqual(FastJSONRenderer().render([1e16]), b"[1e16]")
+        self.assertEqual(JSONRenderer().render([1e16]), b"[1e+16]")
+        self.assertEqual(FastJSONRenderer().render([float("nan")]), b"[null]")
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float("nan")])
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertSameRender(VALUES)
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def assertSameParse(self, body):
+        expected = parse(JSONParser(), body)
+        parsed = parse(FastJSONParser(), body)
+        self.assertEqual(parsed, expected)
+        self.assertEqual(repr(parsed), repr(expected))
+
+    def test_bodies_parse_like_drf(self):
+        bodies = [
+            b'{"a": 1, "b": [true, null, 1.5, "\\u00e9"]}',
+            "[\"é\", \" \"]".encode(),
+            b'{"int64": -9223372036854775808, "uint64": 18446744073709551615}',
+            b'"\\ud800"',
+            b' {"a": 1}\n',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertSameParse(body)
+
+    def test_big_integers_stay_integers(self):
+        for number in (2 ** 64, -2 ** 63 - 1, 10 ** 29, -10 ** 29):
+            with self.subTest(number=number):
+                body = f'{{"n": {number}}}'.encode()
+                self.assertSameParse(body)
+                self.assertEqual(parse(FastJSONParser(), body), {"n": number})
+
+    def test_only_long_digit_runs_fall_back(self):
+        with mock.patch.object(parsers.JSONParser, "parse", autospec=True, side_effect=JSONParser.parse) as drf:
+            parse(FastJSONParser(), b'{"n": 9223372036854775807, "phone": "555-0100"}')
+            drf.assert_not_called()
+            parse(FastJSONParser(), b'{"n": 18446744073709551616}')
+            drf.assert_called_once()
+
+    def test_nan_follows_strict_json(self):
+        # JSONParser reads STRICT_JSON when it is imported
+        with mock.patch.object(JSONParser, "strict", False):
+            self.assertEqual(repr(parse(FastJSONParser(), b'[NaN]')), repr(parse(JSONParser(), b'[NaN]')))
+
+    def test_malformed_bodies_raise_the_same_error(self):
+        for body in (b'{"a":', b"", b"\xff", b'{"a": NaN}', b"{'a': 1}", b'{"a": 1} x'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as raised:
+                    parse(FastJSONParser(), body)
+                self.assertEqual(str(raised.exception.detail), str(expected.exception.detail))
+
+    def test_without_orjson(self):
+        with mock.patch.object(parsers, "orjson", None):
+            self.assertSameParse(b'{"n": 18446744073709551616, "a": [1.5]}')
+
+
+class JSONBodyTests(APITest):
+    def test_malformed_body_is_a_400(self):
+        for body in (b'{"first_name":', b"\xff", b'{"first_name": NaN}'):
+            with self.subTest(body=body):
+                response = self.client.post(reverse("patients-list"), body, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
+
+    def test_responses_render_like_drf(self):
+        self.make_patient(first_name="Zoë ")
+        response = self.client.get(reverse("patients-list"))
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
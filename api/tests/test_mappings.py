@@ -0,0 +1,38 @@
+from django.urls import reverse
+
+from api.models import Patient
+
+from .base import APITest
+
+
+class MappingsByPatientTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.patient = self.make_patient()
+        self.mappings = [self.make_mapping(self.patient, self.make_doctor()) for _ in range(3)]
+        self.url = reverse("mappings-by-patient", args=[self.patient.pk])
+
+    def test_total_is_counted_not_read_from_doctor_count(self):
+        Patient.objects.filter(pk=self.patient.pk).update(doctor_count=99)
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_cursor_pages_skip_the_count(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"pagination": "cursor"})
+        self.assertNotIn("count", response.data)
+        self.assertEqual(
+            {row["mapping"] for row in response.data["results"]}, {mapping.pk for mapping in self.mappings},
+        )
+
+    def test_other_users_patient_is_not_found(self):
+        other = self.make_patient(user=self.make_user())
+        self.assertEqual(self.client.get(reverse("mappings-by-patient", args=[other.pk])).status_code, 404)
+
+    def test_numeric_mapping_path_is_the_mapping_detail(self):
+        # Before the by-patient action moved, mappings/<n>/ listed patient n's mappings
+        response = self.client.get(reverse("mappings-detail", args=[self.mappings[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], self.mappings[0].pk)
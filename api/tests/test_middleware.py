@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import instrumentation
+from api.middleware import RequestTimingMiddleware
+
+from .base import APITest
+
+
+def timing(**config):
+    return override_settings(REQUEST_TIMING={
+        "HEADER_SAMPLE_RATE": 0.0, "LOG_SAMPLE_RATE": 0.0, "SLOW_REQUEST_MS": None, **config,
+    })
+
+
+class RequestTimingTests(APITest):
+
+    def setUp(self):
+        super().setUp()
+        self.make_patient()
+        self.url = reverse("patients-list") + "?format=json"
+
+    def test_sampled_request_is_instrumented(self):
+        with timing(HEADER_SAMPLE_RATE=1.0), override_settings(API_ROW_LISTS=False):
+            response = self.client.get(self.url)
+        header = response["Server-Timing"]
+        self.assertIn('desc="2 queries"', header)
+        for name in ("serialize", "view", "render", "total"):
+            self.assertIn(f"{name};dur=", header)
+
+    def test_unsampled_request_is_not_instrumented(self):
+        with timing(SLOW_REQUEST_MS=1000), override_settings(API_ROW_LISTS=False), \
+                mock.patch.object(RequestTimingMiddleware, "record_queries") as record_queries, \
+                mock.patch.object(instrumentation, "span") as span:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+        record_queries.assert_not_called()
+        span.assert_not_called()
+
+    def test_slow_unsampled_request_is_logged_with_its_total(self):
+        with timing(SLOW_REQUEST_MS=0), self.assertLogs("api.timing", "WARNING") as logs:
+            self.client.get(self.url)
+        record = logs.records[0].timing
+        self.assertEqual(set(record), {"method", "path", "status", "total_ms"})
+
+    def test_sampled_log_line_has_queries(self):
+        with timing(LOG_SAMPLE_RATE=1.0), self.assertLogs("api.timing", "INFO") as logs:
+            self.client.get(self.url)
+        record = logs.records[0].timing
+        self.assertEqual(record["queries"], 2)
+        self.assertEqual(len(record["slowest_queries"]), 2)
+
+
+class PathScopedMiddlewareTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.hooks = {}
+        for middleware, name in (
+            (SessionMiddleware, "process_request"),
+            (AuthenticationMiddleware, "process_request"),
+            (CsrfViewMiddleware, "process_view"),
+        ):
+            patcher = mock.patch.object(middleware, name, autospec=True, side_effect=getattr(middleware, name))
+            self.hooks[middleware.__name__] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def called(self):
+        return {name for name, hook in self.hooks.items() if hook.called}
+
+    def test_api_requests_skip_the_admin_middleware(self):
+        response = self.client.get(reverse("patients-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.called(), set())
+        self.assertNotIn("X-Frame-Options", response)
+        self.assertNotIn("sessionid", response.cookies)
+
+    def test_api_writes_need_no_csrf_token(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_authenticate(self.user)
+        response = client.post(
+            reverse("patients-list"), {"first_name": "Lean", "email": "lean@example.com"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.called(), set())
+
+    def test_admin_keeps_the_full_chain(self):
+        response = self.client.get("/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.called(), set(self.hooks))
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertIn("csrftoken", response.cookies)
+
+    def test_admin_enforces_csrf(self):
+        client = APIClient(enforce_csrf_checks=True)
+        login = {"username": self.user.username, "password": "s3cret-pass"}
+        self.assertEqual(client.post("/admin/login/", login).status_code, 403)
+
+        token = client.get("/admin/login/").cookies["csrftoken"].value
+        response = client.post("/admin/login/", {**login, "csrfmiddlewaretoken": token})
+        # Not staff: the form is shown again, past the CSRF check
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(LEAN_MIDDLEWARE_PATHS=[])
+    def test_full_chain_everywhere_when_turned_off(self):
+        response = self.client.get(reverse("patients-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.called(), set(self.hooks))
+        self.assertEqual(response["X-Frame-Options"], "DENY")
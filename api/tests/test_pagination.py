@@ -0,0 +1,88 @@
+import base64
+import json
+
+from django.urls import reverse
+
+from .base import APITest
+
+
+class KeysetPaginationTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("patients-list")
+        self.patients = [self.make_patient(doctor_count=n % 2) for n in range(5)]
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def walk(self, url, params, link):
+        """Ids of every page from ``url``, following ``link`` ("next" or "previous"), and the last page."""
+        pages, data = [], self.get(url, params)
+        while True:
+            pages.append([row["id"] for row in data["results"]])
+            if not data[link]:
+                return pages, data
+            data = self.get(data[link])
+
+    def test_forward_then_back(self):
+        newest_first = [patient.pk for patient in reversed(self.patients)]
+        forward, last = self.walk(self.url, {"pagination": "cursor", "page_size": 2}, "next")
+        self.assertEqual(forward, [newest_first[0:2], newest_first[2:4], newest_first[4:]])
+        self.assertNotIn("count", last)
+
+        back, first = self.walk(last["previous"], None, "previous")
+        self.assertEqual(back, [newest_first[2:4], newest_first[0:2]])
+        self.assertIsNone(first["previous"])
+        self.assertIsNotNone(first["next"])
+
+    def test_first_page_has_no_previous(self):
+        data = self.get(self.url, {"pagination": "cursor", "page_size": 2})
+        self.assertIsNone(data["previous"])
+        self.assertIn("cursor=", data["next"])
+
+    def test_single_page_has_no_links(self):
+        data = self.get(self.url, {"pagination": "cursor"})
+        self.assertEqual((data["next"], data["previous"]), (None, None))
+        self.assertEqual(len(data["results"]), 5)
+
+    def test_cursor_keeps_the_ordering_it_was_issued_for(self):
+        params = {"pagination": "cursor", "page_size": 2, "ordering": "doctor_count"}
+        pages, _ = self.walk(self.url, params, "next")
+        ids = [pk for page in pages for pk in page]
+        counts = {patient.pk: patient.doctor_count for patient in self.patients}
+        self.assertEqual(sorted(ids), sorted(counts))
+        self.assertEqual([counts[pk] for pk in ids], sorted(counts.values()))
+
+    def test_cursor_reused_under_another_ordering_is_a_400(self):
+        data = self.get(self.url, {"pagination": "cursor", "page_size": 2, "ordering": "doctor_count"})
+        cursor = data["next"].split("cursor=")[1].split("&")[0]
+        for ordering in (None, "-doctor_count"):
+            with self.subTest(ordering=ordering):
+                params = {"cursor": cursor, **({"ordering": ordering} if ordering else {})}
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("cursor", response.data)
+
+    def test_malformed_cursors_are_a_400(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+        cursors = [
+            "not-a-cursor!",
+            "%%%",
+            base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+            encode([1, 2]),
+            encode({"r": 1}),
+            encode({"p": "ab"}),
+            encode({"p": [1, 2, 3]}),
+            encode({"p": ["yesterday", 1]}),
+            encode({"p": ["2024-01-01T00:00:00+00:00", "one"]}),
+            encode({"p": [None, 1]}),
+            encode({"p": [{"a": 1}, 1]}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
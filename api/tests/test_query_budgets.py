@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from api.models import ChangeLog, PatientDoctorMap
+from api.queries import QUERY_BUDGETS
+
+from .base import APITest
+
+
+class QueryBudgetTests(APITest):
+    """Each ``QUERY_BUDGETS`` entry, on pages of several rows.
+
+    The client is force-authenticated, so authentication runs no query.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.doctors = [self.make_doctor() for _ in range(3)]
+        self.patients = [self.make_patient() for _ in range(3)]
+        self.mappings = [self.make_mapping(patient, doctor) for patient in self.patients for doctor in self.doctors]
+
+    def assertWithinBudget(self, key, method, url, data=None, status=200, transactions=0):
+        # Inside the test case's transaction, each transaction.atomic() adds a SAVEPOINT and its RELEASE
+        with self.assertNumQueries(QUERY_BUDGETS[key] + 2 * transactions):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def test_overrun_is_logged_not_raised(self):
+        with override_settings(API_QUERY_BUDGET_MODE="warn"), \
+                mock.patch.dict(QUERY_BUDGETS, {"mappings-list": 1}), \
+                self.assertLogs("api.mixins", "WARNING") as logs:
+            response = self.client.get(reverse("mappings-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("mappings-list ran 2 queries (budget 1)", logs.output[0])
+
+    def test_every_budget_is_covered(self):
+        covered = {name[len("test_"):].replace("_", "-") for name in dir(self) if name.startswith("test_")}
+        self.assertLessEqual(set(QUERY_BUDGETS), covered)
+
+    def test_mappings_list(self):
+        response = self.assertWithinBudget("mappings-list", "get", reverse("mappings-list"))
+        self.assertEqual(len(response.data["results"]), 9)
+
+    def test_mappings_list_expanded(self):
+        self.assertWithinBudget("mappings-list", "get", reverse("mappings-list") + "?expand=patient,doctor")
+
+    def test_mappings_retrieve(self):
+        self.assertWithinBudget("mappings-retrieve", "get", reverse("mappings-detail", args=[self.mappings[0].pk]))
+
+    def test_mappings_by_patient(self):
+        response = self.assertWithinBudget(
+            "mappings-by-patient", "get", reverse("mappings-by-patient", args=[self.patients[0].pk]),
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_doctors_patients(self):
+        response = self.assertWithinBudget(
+            "doctors-patients", "get", reverse("doctors-patients", args=[self.doctors[0].pk]),
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_doctors_patients_batch(self):
+        ids = ",".join(str(doctor.pk) for doctor in self.doctors)
+        response = self.assertWithinBudget(
+            "doctors-patients-batch", "get", reverse("doctors-patients-batch") + f"?ids={ids}",
+        )
+        self.assertEqual([len(group["patients"]) for group in response.data["results"]], [3, 3, 3])
+
+    def test_mappings_bulk_post(self):
+        PatientDoctorMap.objects.all().delete()
+        items = [{"patient": patient.pk, "doctor": doctor.pk} for patient in self.patients for doctor in self.doctors]
+        response = self.assertWithinBudget("mappings-bulk-post", "post", reverse("mappings-bulk"), items, status=201, transactions=1)
+        self.assertEqual(response.data["succeeded"], 9)
+
+    def test_mappings_bulk_delete(self):
+        ids = [mapping.pk for mapping in self.mappings]
+        response = self.assertWithinBudget("mappings-bulk-delete", "delete", reverse("mappings-bulk"), {"ids": ids}, transactions=1)
+        self.assertEqual(response.data["succeeded"], 9)
+
+    def test_sync(self):
+        since = ChangeLog.objects.create(owner=self.user, kind=ChangeLog.PATIENT, object_id=0).pk
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(owner=self.user, kind=ChangeLog.PATIENT, object_id=patient.pk) for patient in self.patients]
+            + [ChangeLog(owner=self.user, kind=ChangeLog.MAPPING, object_id=mapping.pk) for mapping in self.mappings]
+        )
+        response = self.assertWithinBudget("sync", "get", reverse("sync") + f"?since={since}")
+        self.assertEqual(len(response.data["patients"]["changed"]), 3)
+        self.assertEqual(len(response.data["mappings"]["changed"]), 9)
@@ -0,0 +1,135 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api.ratelimit import LocMemRateLimitBackend, RedisRateLimitBackend, SQLiteRateLimitBackend, get_backend
+
+from .base import APITest
+from .fake_redis import FakeRedis
+
+WINDOW = 60
+# The start of a recent fixed window, so "now" arithmetic below is exact and
+# the SQLite backend's purge of expired buckets (by wall clock) keeps them
+T0 = float(time.time() // WINDOW * WINDOW)
+
+
+class BackendContract:
+    """Behaviour every rate-limit backend shares; subclasses provide ``make_backend``."""
+
+    def setUp(self):
+        super().setUp()
+        self.backend = self.make_backend()
+
+    def test_allows_up_to_the_limit(self):
+        results = [self.backend.hit("k", 3, WINDOW, now=T0) for _ in range(4)]
+        self.assertEqual([result.allowed for result in results], [True, True, True, False])
+        self.assertEqual(results[-1].retry_after, WINDOW)
+
+    def test_refused_hits_are_not_counted(self):
+        for _ in range(5):
+            self.backend.hit("k", 2, WINDOW, now=T0)
+        self.assertEqual(self.backend.increment("k", int(T0 // WINDOW), WINDOW, amount=0)[0], 2)
+
+    def test_previous_window_is_weighted(self):
+        for _ in range(4):
+            self.backend.hit("k", 4, WINDOW, now=T0)
+        # Half way through the next window, half of the previous one still counts
+        result = self.backend.hit("k", 4, WINDOW, now=T0 + WINDOW * 1.5)
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.count, 3)
+
+    def test_keys_are_independent(self):
+        self.backend.hit("a", 1, WINDOW, now=T0)
+        self.assertTrue(self.backend.hit("b", 1, WINDOW, now=T0).allowed)
+
+    def test_release_gives_back_a_hit(self):
+        self.backend.hit("k", 1, WINDOW, now=T0)
+        self.backend.release("k", WINDOW, now=T0)
+        self.assertTrue(self.backend.hit("k", 1, WINDOW, now=T0).allowed)
+
+    def test_release_after_reset_does_not_go_below_zero(self):
+        self.backend.hit("k", 2, WINDOW, now=T0)
+        self.backend.reset("k", WINDOW)
+        self.backend.release("k", WINDOW, now=T0)
+        self.backend.release("k", WINDOW, now=T0)
+        results = [self.backend.hit("k", 2, WINDOW, now=T0) for _ in range(3)]
+        self.assertEqual([result.allowed for result in results], [True, True, False])
+
+
+class LocMemBackendTests(BackendContract, SimpleTestCase):
+    def make_backend(self):
+        return LocMemRateLimitBackend()
+
+
+class SQLiteBackendTests(BackendContract, SimpleTestCase):
+    def make_backend(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SQLiteRateLimitBackend(Path(directory.name) / "ratelimit.sqlite3")
+
+    def test_counters_are_shared_between_instances(self):
+        other = SQLiteRateLimitBackend(self.backend.path)
+        self.backend.hit("k", 1, WINDOW, now=T0)
+        self.assertFalse(other.hit("k", 1, WINDOW, now=T0).allowed)
+
+
+class RedisBackendTests(BackendContract, SimpleTestCase):
+    def make_backend(self):
+        self.client = FakeRedis()
+        return RedisRateLimitBackend(client=self.client)
+
+    def test_counters_expire_after_two_windows(self):
+        self.backend.hit("k", 1, WINDOW, now=T0)
+        self.assertEqual(self.client.ttl, {f"ratelimit:k:{int(T0 // WINDOW)}": WINDOW * 2})
+
+    def test_release_of_a_missing_counter_writes_nothing(self):
+        self.backend.release("k", WINDOW, now=T0)
+        self.assertEqual(self.client.data, {})
+
+    def test_decrement_retries_when_the_counter_changes(self):
+        self.backend.hit("k", 5, WINDOW, now=T0)
+        key = f"ratelimit:k:{int(T0 // WINDOW)}"
+        get = self.client.get
+        calls = []
+
+        def racing_get(name):
+            # Another worker counts a hit between this transaction's WATCH and EXEC, once
+            if name == key and not calls:
+                calls.append(name)
+                self.client.incrby(key, 1)
+            return get(name)
+
+        self.client.get = racing_get
+        self.backend.release("k", WINDOW, now=T0)
+        self.assertEqual(self.client.data[key], 1)
+
+
+@override_settings(RATE_LIMIT={"BACKEND": "api.ratelimit.LocMemRateLimitBackend"})
+class LoginLimitTests(APITest):
+    """Only rejected credentials count towards the login limit, and a successful login resets it."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.url = reverse("login")
+
+    def login(self, password):
+        return self.client.post(self.url, {"username": self.user.username, "password": password}, format="json")
+
+    def test_wrong_passwords_are_limited(self):
+        statuses = [self.login("wrong").status_code for _ in range(11)]
+        self.assertEqual(statuses, [401] * 10 + [429])
+
+    def test_malformed_requests_are_not_counted(self):
+        for _ in range(10):
+            self.assertEqual(self.client.post(self.url, {}, format="json").status_code, 400)
+        self.assertEqual(self.login("wrong").status_code, 401)
+
+    def test_success_resets_the_count(self):
+        for _ in range(9):
+            self.login("wrong")
+        self.assertEqual(self.login("s3cret-pass").status_code, 200)
+        self.assertEqual(get_backend().hit("login_attempts_127.0.0.1", 10, 3600).count, 1)
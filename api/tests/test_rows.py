@@ -0,0 +1,99 @@
+from datetime import date, datetime, timezone
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import serializers
+
+from api import rows
+from api.cache import response_cache
+from api.models import PatientDoctorMap
+from api.serializers import MappingListSerializer, PatientSerializer
+from api.views import PatientViewSet
+
+from .base import APITest
+
+
+class RowListTests(APITest):
+    """Every row-rendered list gives the same bytes as the DRF serializers."""
+
+    def setUp(self):
+        super().setUp()
+        doctors = [self.make_doctor(), self.make_doctor(last_name="")]
+        patients = [
+            self.make_patient(date_of_birth=date(1980, 2, 29), phone="5550001111"),
+            # Null and blank columns, rendered inline below too
+            self.make_patient(last_name="", date_of_birth=None),
+        ]
+        for patient in patients:
+            for doctor in doctors:
+                self.make_mapping(patient, doctor)
+
+    def assertSameBytes(self, url, params=None):
+        # Cleared so neither request is a doctor-cache hit of the other
+        response_cache().clear()
+        with override_settings(API_ROW_LISTS=True):
+            from_rows = self.client.get(url, params)
+        response_cache().clear()
+        with override_settings(API_ROW_LISTS=False):
+            from_drf = self.client.get(url, params)
+        self.assertNotEqual(from_drf.get("X-Cache"), "HIT")
+        self.assertEqual(from_rows.status_code, 200, from_rows.content)
+        self.assertEqual(from_rows.content, from_drf.content)
+        return from_rows
+
+    def test_lists(self):
+        for name in ("patients-list", "doctors-list", "mappings-list"):
+            for params in ({}, {"pagination": "cursor"}, {"page_size": 1, "page": 2}):
+                with self.subTest(name=name, params=params):
+                    response = self.assertSameBytes(reverse(name), params)
+                    self.assertTrue(response.data["results"])
+
+    def test_mapping_expansions(self):
+        for expand in ("patient", "doctor", "patient,doctor", "doctor,patient"):
+            with self.subTest(expand=expand):
+                response = self.assertSameBytes(reverse("mappings-list"), {"expand": expand})
+                self.assertIn(f"{expand.split(',')[0]}_detail", response.data["results"][0])
+
+    def test_null_relations_render_as_none(self):
+        # No relation in this schema is nullable; build the row and instance by hand
+        serializer = MappingListSerializer(context={"expand": {"patient", "doctor"}})
+        compiled = rows.RowSerializer(serializer)
+        created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        row = {**dict.fromkeys(compiled.paths), "id": 1, "created_at": created_at}
+        instance = PatientDoctorMap(id=1, created_at=created_at)
+        expected = MappingListSerializer(instance, context={"expand": {"patient", "doctor"}}).data
+        self.assertEqual(compiled.represent([row]), [dict(expected)])
+        self.assertIsNone(expected["patient_detail"])
+
+
+class MethodFieldSerializer(PatientSerializer):
+    initials = serializers.SerializerMethodField()
+
+    class Meta(PatientSerializer.Meta):
+        fields = PatientSerializer.Meta.fields + ("initials",)
+
+    def get_initials(self, patient):
+        return f"{patient.first_name[:1]}{patient.last_name[:1]}"
+
+
+class FallbackTests(APITest):
+    def setUp(self):
+        super().setUp()
+        rows._uncompilable.discard(MethodFieldSerializer)
+        self.addCleanup(rows._uncompilable.discard, MethodFieldSerializer)
+
+    def test_uncompilable_serializer_lists_through_drf(self):
+        self.make_patient(first_name="Ada", last_name="Lovelace")
+        with mock.patch.object(PatientViewSet, "serializer_class", MethodFieldSerializer):
+            response = self.client.get(reverse("patients-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["initials"], "AL")
+
+    def test_failure_is_remembered_per_class(self):
+        serializer = MethodFieldSerializer()
+        self.assertIsNone(rows.compile_rows(serializer))
+        with mock.patch.object(rows, "RowSerializer") as row_serializer:
+            self.assertIsNone(rows.compile_rows(serializer))
+        row_serializer.assert_not_called()
+        self.assertIsNotNone(rows.compile_rows(PatientSerializer()))
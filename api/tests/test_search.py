@@ -0,0 +1,42 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import search
+
+from .base import APITest
+
+
+@skipUnless(search.has_fulltext_index(connection.vendor), "no full-text index on this database")
+class FulltextIndexCheckTests(TestCase):
+    def test_migrated_database_passes(self):
+        self.assertEqual(search.check_fulltext_indexes(databases=["default"]), [])
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite triggers")
+    def test_missing_trigger_is_an_error(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER api_patient_fts_update")
+        errors = search.check_fulltext_indexes(databases=["default"])
+        self.assertEqual([error.id for error in errors], ["api.E001"])
+        self.assertIn("api_patient_fts_update", errors[0].msg)
+
+    @override_settings(API_SEARCH_MODE="basic")
+    def test_skipped_without_fulltext_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS api_doctor_fts")
+        self.assertEqual(search.check_fulltext_indexes(databases=["default"]), [])
+
+
+class SearchTests(APITest):
+    def test_triggers_keep_the_index_in_step(self):
+        patient = self.make_patient(first_name="Alexandra")
+        url = reverse("patients-list")
+        self.assertEqual([row["id"] for row in self.client.get(url, {"search": "alex"}).data["results"]], [patient.pk])
+        patient.first_name = "Beatrice"
+        patient.save()
+        self.assertEqual(self.client.get(url, {"search": "alex"}).data["results"], [])
+        self.assertEqual([row["id"] for row in self.client.get(url, {"search": "bea"}).data["results"]], [patient.pk])
+        patient.delete()
+        self.assertEqual(self.client.get(url, {"search": "bea"}).data["results"], [])
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api import sync
+from api.models import ChangeLog
+
+from .base import APITest
+
+
+class SyncTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("sync")
+        self.doctor = self.make_doctor()
+
+    def create_patient(self, n):
+        response = self.client.post(
+            reverse("patients-list"), {"first_name": f"Sync{n}", "email": f"sync{n}@example.com"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def changes(self, since, **params):
+        response = self.client.get(self.url, {"since": since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_after_the_head_cursor(self):
+        before = self.client.get(self.url).data["cursor"]
+        patient_id = self.create_patient(1)
+        data = self.changes(before)
+        self.assertEqual([row["id"] for row in data["patients"]["changed"]], [patient_id])
+        self.assertEqual(data["cursor"], self.client.get(self.url).data["cursor"])
+        self.assertEqual(self.changes(data["cursor"])["patients"]["changed"], [])
+
+    def test_deletes_are_tombstones(self):
+        patient_id = self.create_patient(1)
+        mapping = self.client.post(
+            reverse("mappings-list"), {"patient": patient_id, "doctor": self.doctor.pk}, format="json",
+        )
+        self.assertEqual(mapping.status_code, 201)
+        cursor = self.client.get(self.url).data["cursor"]
+        self.assertEqual(self.client.delete(reverse("patients-detail", args=[patient_id])).status_code, 204)
+
+        data = self.changes(cursor)
+        self.assertEqual(data["patients"], {"changed": [], "deleted": [patient_id]})
+        self.assertEqual(data["mappings"], {"changed": [], "deleted": [mapping.data["id"]]})
+
+    def test_a_row_created_and_deleted_in_one_page_is_only_a_tombstone(self):
+        cursor = self.client.get(self.url).data["cursor"]
+        patient_id = self.create_patient(1)
+        self.client.delete(reverse("patients-detail", args=[patient_id]))
+        self.assertEqual(self.changes(cursor)["patients"], {"changed": [], "deleted": [patient_id]})
+
+    def test_paging_follows_the_cursor(self):
+        cursor = self.client.get(self.url).data["cursor"]
+        created = [self.create_patient(n) for n in range(3)]
+        seen = []
+        for expected_more in (True, True, False):
+            data = self.changes(cursor, limit=1)
+            self.assertEqual(data["has_more"], expected_more)
+            seen += [row["id"] for row in data["patients"]["changed"]]
+            cursor = data["cursor"]
+        self.assertEqual(seen, created)
+
+    def test_other_owners_changes_are_not_served(self):
+        cursor = self.client.get(self.url).data["cursor"]
+        self.client.force_authenticate(self.make_user())
+        self.create_patient(1)
+        self.client.force_authenticate(self.user)
+        data = self.changes(cursor)
+        self.assertEqual(data["patients"]["changed"], [])
+        self.assertEqual(data["cursor"], cursor)
+
+    def test_purged_cursor_is_gone(self):
+        self.create_patient(1)
+        self.create_patient(2)
+        self.create_patient(3)
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(sync.purge(timezone.now()), 2)
+        self.assertEqual(self.client.get(self.url, {"since": 0}).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {"since": 1}).status_code, 410)
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_entries_younger_than_the_settle_window_wait(self):
+        cursor = self.client.get(self.url).data["cursor"]
+        patient_id = self.create_patient(1)
+        self.assertEqual(self.client.get(self.url).data["cursor"], cursor)
+        data = self.changes(cursor)
+        self.assertEqual((data["patients"]["changed"], data["cursor"]), ([], cursor))
+
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        data = self.changes(cursor)
+        self.assertEqual([row["id"] for row in data["patients"]["changed"]], [patient_id])
+        self.assertEqual(data["cursor"], self.client.get(self.url).data["cursor"])
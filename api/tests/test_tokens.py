@@ -0,0 +1,92 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from api import tokens
+from api.models import BlacklistedToken
+
+from .base import APITest
+
+
+class RefreshRotationTests(APITest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.refresh_token = tokens.RefreshToken.for_user(self.user)
+        self.url = reverse("token_refresh")
+
+    def refresh(self, token):
+        return self.client.post(self.url, {"refresh": str(token)}, format="json")
+
+    def test_rotated_token_reused_is_a_401(self):
+        response = self.refresh(self.refresh_token)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["refresh"], str(self.refresh_token))
+        self.assertTrue(BlacklistedToken.objects.filter(jti=self.refresh_token["jti"]).exists())
+
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+        # The rotated-in token still works, once
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 200)
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 401)
+
+    def test_refresh_reads_nothing_from_the_blacklist(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(self.refresh_token).status_code, 200)
+        blacklist = [query["sql"] for query in queries if BlacklistedToken._meta.db_table in query["sql"]]
+        self.assertEqual(len(blacklist), 1)
+        self.assertTrue(blacklist[0].startswith("INSERT"), blacklist)
+
+    def test_concurrent_refresh_loses_on_the_primary_key(self):
+        # The other request verified the same token and blacklisted it first;
+        # this one got past verification too, and its insert is the check
+        token = tokens.RefreshToken(str(self.refresh_token))
+        tokens.RefreshToken(str(self.refresh_token)).blacklist()
+        with transaction.atomic():
+            with self.assertRaisesMessage(TokenError, "Token is blacklisted"):
+                token.blacklist()
+            # Only the savepoint was rolled back: the enclosing transaction goes on
+            self.assertEqual(BlacklistedToken.objects.count(), 1)
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+
+    def test_blacklist_row_expires_with_the_token(self):
+        self.refresh(self.refresh_token)
+        row = BlacklistedToken.objects.get()
+        self.assertEqual(row.expires_at, datetime_from_epoch(self.refresh_token["exp"]))
+
+    def test_without_rotation_verify_checks_the_blacklist(self):
+        self.refresh_token.blacklist()
+        # simplejwt's modules hold the settings object they imported, so it is patched in place
+        with mock.patch.object(api_settings, "ROTATE_REFRESH_TOKENS", False):
+            with self.assertRaisesMessage(TokenError, "Token is blacklisted"):
+                tokens.RefreshToken(str(self.refresh_token))
+            self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+            self.assertEqual(self.refresh(tokens.RefreshToken.for_user(self.user)).status_code, 200)
+
+
+class PurgeBlacklistedTokensTests(APITest):
+    def test_only_expired_rows_are_deleted(self):
+        now = timezone.now()
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(jti="expired-1", expires_at=now - timedelta(days=1)),
+            BlacklistedToken(jti="expired-2", expires_at=now - timedelta(seconds=1)),
+            BlacklistedToken(jti="live", expires_at=now + timedelta(hours=1)),
+        ])
+        out = StringIO()
+        call_command("purge_blacklisted_tokens", stdout=out)
+        self.assertIn("Deleted 2 blacklisted tokens", out.getvalue())
+        self.assertEqual(list(BlacklistedToken.objects.values_list("jti", flat=True)), ["live"])
+
+    def test_purge_counts_only_before_the_given_time(self):
+        now = timezone.now()
+        BlacklistedToken.objects.create(jti="at-now", expires_at=now)
+        self.assertEqual(tokens.purge(now), 0)
+        self.assertEqual(tokens.purge(now + timedelta(microseconds=1)), 1)
@@ -0,0 +1,112 @@
+from django.urls import reverse
+
+from api.models import ChangeLog, Doctor, Patient, PatientDoctorMap
+
+from .base import APITest
+
+
+class WritePathTests(APITest):
+    """Statements issued by the single-row writes, and the bookkeeping they keep right.
+
+    Ownership is enforced by the owner-scoped read in ``get_object()``, and
+    each write reads the rows its counts and tombstones need once.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.doctors = [self.make_doctor() for _ in range(3)]
+        self.patients = [self.make_patient() for _ in range(2)]
+        self.mappings = [self.make_mapping(patient, doctor) for patient in self.patients for doctor in self.doctors[:2]]
+
+    def assertQueries(self, count, method, url, data=None, status=200, transactions=1):
+        # Inside the test case's transaction, each transaction.atomic() adds a SAVEPOINT and its RELEASE
+        with self.assertNumQueries(count + 2 * transactions):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def counts(self):
+        return (
+            dict(Patient.objects.values_list("id", "doctor_count")),
+            dict(Doctor.objects.values_list("id", "patient_count")),
+        )
+
+    def changes(self):
+        return set(ChangeLog.objects.values_list("kind", "object_id", "deleted"))
+
+    def test_moving_a_mapping_writes_only_the_doctors(self):
+        mapping, patient = self.mappings[0], self.patients[0]
+        # Read, new doctor, update, tombstone, one count update per doctor
+        self.assertQueries(
+            6, "patch", reverse("mappings-detail", args=[mapping.pk]), {"doctor": self.doctors[2].pk},
+        )
+        patients, doctors = self.counts()
+        self.assertEqual(patients[patient.pk], 2)
+        self.assertEqual([doctors[doctor.pk] for doctor in self.doctors], [1, 2, 1])
+        self.assertEqual(self.changes(), {(ChangeLog.MAPPING, mapping.pk, False)})
+        self.assertEqual(Patient.objects.get(pk=patient.pk).updated_at, patient.updated_at)
+
+    def test_moving_a_mapping_to_another_patient_writes_only_the_patients(self):
+        mapping = self.mappings[0]
+        patient = self.make_patient()
+        self.assertQueries(
+            7, "patch", reverse("mappings-detail", args=[mapping.pk]), {"patient": patient.pk},
+        )
+        patients, doctors = self.counts()
+        self.assertEqual([patients[p.pk] for p in (*self.patients, patient)], [1, 2, 1])
+        self.assertEqual([doctors[doctor.pk] for doctor in self.doctors], [2, 2, 0])
+        self.assertEqual(self.changes(), {
+            (ChangeLog.MAPPING, mapping.pk, False),
+            (ChangeLog.PATIENT, self.patients[0].pk, False),
+            (ChangeLog.PATIENT, patient.pk, False),
+        })
+
+    def test_deleting_a_mapping(self):
+        mapping = self.mappings[0]
+        self.assertQueries(6, "delete", reverse("mappings-detail", args=[mapping.pk]), status=204)
+        patients, doctors = self.counts()
+        self.assertEqual((patients[self.patients[0].pk], doctors[self.doctors[0].pk]), (1, 1))
+        self.assertEqual(self.changes(), {
+            (ChangeLog.MAPPING, mapping.pk, True), (ChangeLog.PATIENT, self.patients[0].pk, False),
+        })
+
+    def test_deleting_a_patient_reads_its_mappings_once(self):
+        patient = self.patients[1]
+        # Read, tombstone, cascade read, tombstones, doctor counts, two deletes
+        self.assertQueries(7, "delete", reverse("patients-detail", args=[patient.pk]), status=204)
+        _, doctors = self.counts()
+        self.assertEqual([doctors[doctor.pk] for doctor in self.doctors], [1, 1, 0])
+        self.assertEqual(self.changes(), {
+            (ChangeLog.PATIENT, patient.pk, True),
+            *((ChangeLog.MAPPING, mapping.pk, True) for mapping in self.mappings[2:]),
+        })
+
+    def test_deleting_a_doctor_reads_its_mappings_once(self):
+        doctor = self.doctors[0]
+        # Read, lock, cascade read, tombstones, patient counts and their log, two deletes
+        self.assertQueries(8, "delete", reverse("doctors-detail", args=[doctor.pk]), status=204)
+        patients, _ = self.counts()
+        self.assertEqual([patients[patient.pk] for patient in self.patients], [1, 1])
+        self.assertEqual(self.changes(), {
+            *((ChangeLog.MAPPING, mapping.pk, True) for mapping in self.mappings[::2]),
+            *((ChangeLog.PATIENT, patient.pk, False) for patient in self.patients),
+        })
+
+    def test_updating_a_patient(self):
+        patient = self.patients[0]
+        self.assertQueries(3, "patch", reverse("patients-detail", args=[patient.pk]), {"first_name": "Renamed"})
+        self.assertEqual(self.changes(), {(ChangeLog.PATIENT, patient.pk, False)})
+
+    def test_other_owners_rows_are_404s_before_any_write(self):
+        other = self.make_patient(user=self.make_user())
+        mapping = self.make_mapping(other, self.doctors[2])
+        for method, url, data in (
+            ("patch", reverse("patients-detail", args=[other.pk]), {"first_name": "Mine"}),
+            ("delete", reverse("patients-detail", args=[other.pk]), None),
+            ("patch", reverse("mappings-detail", args=[mapping.pk]), {"doctor": self.doctors[0].pk}),
+            ("delete", reverse("mappings-detail", args=[mapping.pk]), None),
+        ):
+            with self.subTest(method=method, url=url):
+                self.assertQueries(1, method, url, data, status=404, transactions=0)
+        self.assertEqual(self.changes(), set())
+        self.assertTrue(PatientDoctorMap.objects.filter(pk=mapping.pk, patient=other).exists())
@@ -0,0 +1,31 @@
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from .ratelimit import get_backend
+
+
+class SharedRateThrottleMixin:
+    """Count DRF throttle hits in the shared rate-limit backend.
+
+    Replaces ``SimpleRateThrottle``'s per-process history list (cache get +
+    set) with one atomic increment, so rates hold across all workers.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.result = get_backend().hit(self.key, self.num_requests, self.duration)
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retry_after
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class SharedUserRateThrottle(SharedRateThrottleMixin, UserRateThrottle):
+    pass
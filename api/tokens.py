@@ -0,0 +1,52 @@
+"""Refresh tokens that are blacklisted when a refresh rotates them.
+
+``SIMPLE_JWT["BLACKLIST_AFTER_ROTATION"]`` only takes effect through a
+token's ``blacklist()``, which simplejwt defines only when its
+``token_blacklist`` app is installed. That app keeps every issued token in
+an outstanding-token table and checks, then writes, several rows per
+refresh. Here the blacklist is ``api.models.BlacklistedToken``: one row per
+rotated-away token, keyed by its JTI and deleted once it has expired.
+
+Blacklisting is a single INSERT, and it is also the check: a token that
+was already rotated hits the primary key and is rejected. A refresh reads
+nothing from the blacklist, and two concurrent refreshes with the same token
+can't both succeed.
+"""
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import BlacklistedToken
+
+
+def purge(before):
+    """Delete blacklist entries of tokens that expired before ``before``; returns the number removed."""
+    return BlacklistedToken.objects.filter(expires_at__lt=before).delete()[0]
+
+
+class RefreshToken(tokens.RefreshToken):
+
+    def verify(self, *args, **kwargs):
+        # Signature and expiry first: expired tokens are never looked up
+        super().verify(*args, **kwargs)
+        if not (api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION):
+            # No rotation to do the check in blacklist()
+            self.check_blacklist()
+
+    def check_blacklist(self):
+        if BlacklistedToken.objects.filter(jti=self.payload[api_settings.JTI_CLAIM]).exists():
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """Blacklist this token; ``TokenError`` if it already was."""
+        try:
+            # A savepoint, so a rejected token doesn't break an enclosing transaction
+            with transaction.atomic():
+                return BlacklistedToken.objects.create(
+                    jti=self.payload[api_settings.JTI_CLAIM], expires_at=datetime_from_epoch(self.payload["exp"]),
+                )
+        except IntegrityError:
+            raise TokenError(_("Token is blacklisted")) from None
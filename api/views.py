@@ -1,33 +1,55 @@
 # api/views.py
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
 from django.utils import timezone
-from rest_framework import viewsets, status, mixins, serializers
+from rest_framework import generics, viewsets, status, mixins, serializers
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.parsers import MultiPartParser
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 
-from .models import Patient, Doctor, PatientDoctorMap
-from .serializers import RegisterSerializer, PatientSerializer, DoctorSerializer, MappingSerializer
+from .models import ChangeLog, Patient, Doctor, PatientDoctorMap
+from .serializers import (
+    RegisterSerializer, RotatingTokenRefreshSerializer, PatientSerializer, DoctorSerializer,
+    MappingSerializer, MappingListSerializer, AssignedDoctorSerializer,
+)
 from .permissions import IsOwnerOrReadOnly
+from .hashers import HashingBusy, refuse_when_busy
+from .filters import DoctorFilter, FullTextSearchFilter, OrderingFilter, PatientFilter
+from .ratelimit import get_backend as get_rate_limiter
+from .throttling import SharedAnonRateThrottle, SharedUserRateThrottle
+from .mixins import AsyncReadMixin, CachedReadMixin, ConditionalGetMixin, QueryBudgetMixin, RowListMixin
+from . import conditional, counts, sync
+from . import bulk as bulk_ops
+from . import export as export_ops
+from . import importer
+from .renderers import CSVRenderer, NDJSONRenderer
+from .queries import (
+    MAPPING_CONDITIONAL_FIELDS, MAPPING_EXPANSIONS, parse_expand,
+    patient_queryset, doctor_queryset, mapping_queryset,
+    patient_doctors_queryset, patient_mappings, doctor_patients_queryset, doctor_patients_batch,
+)
 
 User = get_user_model()
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
-    throttle_classes = [AnonRateThrottle]
+    throttle_classes = [SharedAnonRateThrottle]
     
     def post(self, request):
         # Rate limiting for registration
         ip_address = request.META.get('REMOTE_ADDR')
         cache_key = f"register_attempts_{ip_address}"
-        attempts = cache.get(cache_key, 0)
+        limiter = get_rate_limiter()
         
-        if attempts >= 5:  # Max 5 registration attempts per hour
+        # Max 5 registrations per IP per sliding hour, counted atomically in the shared store
+        if not limiter.hit(cache_key, 5, 3600).allowed:
             return Response(
                 {"error": "Too many registration attempts. Please try again later."}, 
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -35,12 +57,14 @@ class RegisterView(APIView):
         
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                with refuse_when_busy():
+                    user = serializer.save()
+            except HashingBusy:
+                limiter.release(cache_key, 3600)
+                raise
             refresh = RefreshToken.for_user(user)
             
-            # Increment attempts counter
-            cache.set(cache_key, attempts + 1, 3600)  # 1 hour
-            
             return Response({
                 'user': {
                     'id': user.id,
@@ -53,91 +77,362 @@ class RegisterView(APIView):
                     'access': str(refresh.access_token),
                 }
             }, status=status.HTTP_201_CREATED)
+
+        # Only successful registrations count towards the limit
+        limiter.release(cache_key, 3600)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class LoginView(TokenObtainPairView):
-    throttle_classes = [AnonRateThrottle]
+    throttle_classes = [SharedAnonRateThrottle]
     
     def post(self, request, *args, **kwargs):
         # Rate limiting for login attempts
         ip_address = request.META.get('REMOTE_ADDR')
         cache_key = f"login_attempts_{ip_address}"
-        attempts = cache.get(cache_key, 0)
+        limiter = get_rate_limiter()
         
-        if attempts >= 10:  # Max 10 login attempts per hour
+        # Max 10 failed login attempts per IP per sliding hour. The attempt is
+        # counted before authenticating so concurrent requests can't slip past
+        # the limit, and given back below unless the credentials were wrong.
+        if not limiter.hit(cache_key, 10, 3600).allowed:
             return Response(
                 {"error": "Too many login attempts. Please try again later."}, 
                 status=status.HTTP_429_TOO_MANY_REQUESTS
             )
         
-        response = super().post(request, *args, **kwargs)
+        try:
+            with refuse_when_busy():
+                response = super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            # Wrong credentials (401): the attempt stays counted
+            raise
+        except Exception:
+            # Malformed request, or HashingBusy: no password was rejected
+            limiter.release(cache_key, 3600)
+            raise
         
-        if response.status_code == 401:
-            # Increment failed attempts counter
-            cache.set(cache_key, attempts + 1, 3600)  # 1 hour
-        else:
-            # Reset counter on successful login
-            cache.delete(cache_key)
-            
+        # Reset counter on successful login
+        limiter.reset(cache_key, 3600)
         return response
 
 class RefreshTokenView(TokenRefreshView):
-    throttle_classes = [UserRateThrottle]
+    throttle_classes = [SharedUserRateThrottle]
+    serializer_class = RotatingTokenRefreshSerializer
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ConditionalGetMixin, RowListMixin, AsyncReadMixin, viewsets.ModelViewSet):
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated]
     queryset = Patient.objects.all()  # Required for DRF
-    throttle_classes = [UserRateThrottle]
+    throttle_classes = [SharedUserRateThrottle]
+    filter_backends = [PatientFilter, FullTextSearchFilter, OrderingFilter]
+    ordering_fields = ("doctor_count",)
     
     def get_queryset(self):
-        return Patient.objects.filter(created_by=self.request.user)
+        return patient_queryset(self.request.user)
     
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        patient = serializer.save(created_by_id=self.request.user.id)
+        sync.record(self.request.user.id, ChangeLog.PATIENT, [patient.pk])
     
+    # get_object() reads through the owner-scoped queryset, so another user's
+    # patient is already a 404 and the writes below need no ownership check
+
+    @transaction.atomic
     def perform_update(self, serializer):
-        # Ensure user can only update their own patients
-        if serializer.instance.created_by != self.request.user:
-            raise serializers.ValidationError("You can only update your own patients.")
         serializer.save()
+        sync.record(self.request.user.id, ChangeLog.PATIENT, [serializer.instance.pk])
     
+    @transaction.atomic
     def perform_destroy(self, instance):
-        # Ensure user can only delete their own patients
-        if instance.created_by != self.request.user:
-            raise serializers.ValidationError("You can only delete your own patients.")
+        counts.patients_deleting(sync.record_patients_deleted(self.request.user.id, [instance.pk]))
         instance.delete()
 
-class DoctorViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["post", "put", "patch", "delete"], url_path="bulk")
+    def bulk(self, request):
+        """Create (POST), update (PUT/PATCH) or delete (DELETE) many patients at once"""
+        if request.method == "POST":
+            body, code = bulk_ops.bulk_create_patients(request.user, request.data, self.get_serializer_context())
+        elif request.method == "DELETE":
+            body, code = bulk_ops.bulk_delete_patients(request.user, request.data)
+        else:
+            body, code = bulk_ops.bulk_update_patients(
+                request.user, request.data, self.get_serializer_context(),
+                partial=request.method == "PATCH",
+            )
+        return Response(body, status=code)
+
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream all of the user's patients as NDJSON (default) or CSV (?format=csv)"""
+        return export_ops.export_patients(request.user, request.accepted_renderer.format)
+
+class DoctorViewSet(CachedReadMixin, ConditionalGetMixin, RowListMixin, AsyncReadMixin, viewsets.ModelViewSet):
     serializer_class = DoctorSerializer
     permission_classes = [IsAuthenticated]
     queryset = Doctor.objects.all()
-    throttle_classes = [UserRateThrottle]
+    throttle_classes = [SharedUserRateThrottle]
+    filter_backends = [DoctorFilter, FullTextSearchFilter, OrderingFilter]
+    ordering_fields = ("patient_count",)
+    # The directory is global, so list and detail pages are shared by all users
+    response_cache_namespace = "doctors"
+
+    def get_queryset(self):
+        return doctor_queryset()
+
+    def get_response_cache_timeout(self):
+        # patient_count changes don't bump the version; pages show it at most this old
+        return settings.RESPONSE_CACHE_COUNT_TIMEOUT
 
-class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Mappings cascade with the doctor; their owners need tombstones
+        counts.doctor_deleting(sync.record_doctor_deleted(instance.pk))
+        instance.delete()
+
+class PatientDoctorMappingViewSet(QueryBudgetMixin, ConditionalGetMixin, RowListMixin, AsyncReadMixin, viewsets.ModelViewSet):
     serializer_class = MappingSerializer
     permission_classes = [IsAuthenticated]
     queryset = PatientDoctorMap.objects.all()  # Required for DRF
-    throttle_classes = [UserRateThrottle]
-    
+    throttle_classes = [SharedUserRateThrottle]
+    # Inlined patient/doctor details change the body too
+    conditional_fields = MAPPING_CONDITIONAL_FIELDS
+    async_actions = ("list", "retrieve", "by_patient")
+
+    def get_expand(self):
+        # List responses are compact unless ?expand= asks for nested objects;
+        # a delete renders nothing, and every other action the full MappingSerializer.
+        if self.action == "list":
+            return parse_expand(self.request, MAPPING_EXPANSIONS)
+        if self.action == "destroy":
+            return set()
+        return set(MAPPING_EXPANSIONS)
+
     def get_queryset(self):
-        return PatientDoctorMap.objects.filter(patient__created_by=self.request.user)
+        return mapping_queryset(self.request.user, expand=self.get_expand())
+
+    def get_query_budget_key(self):
+        # Bulk creates and deletes do different work
+        if self.action == "bulk":
+            return f"mappings-bulk-{self.request.method.lower()}"
+        return super().get_query_budget_key()
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return MappingListSerializer
+        return MappingSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand"] = self.get_expand()
+        return context
     
+    @transaction.atomic
     def perform_create(self, serializer):
         # Validate that the patient belongs to the requesting user
         patient = serializer.validated_data['patient']
-        if patient.created_by != self.request.user:
+        if patient.created_by_id != self.request.user.id:
             raise serializers.ValidationError("You can only map doctors to your own patients.")
-        serializer.save()
+        mapping = serializer.save(owner_id=self.request.user.id)
+        sync.record(self.request.user.id, ChangeLog.MAPPING, [mapping.pk])
+        counts.mappings_added(self.request.user.id, [(mapping.patient_id, mapping.doctor_id)])
     
+    # get_object() only finds mappings of the user's own patients, and
+    # MappingSerializer.validate() checks a new patient's owner by id
+
+    @transaction.atomic
     def perform_update(self, serializer):
-        # Ensure user can only update their own mappings
-        if serializer.instance.patient.created_by != self.request.user:
-            raise serializers.ValidationError("You can only update your own patient-doctor mappings.")
-        serializer.save()
+        before = (serializer.instance.patient_id, serializer.instance.doctor_id)
+        mapping = serializer.save()
+        sync.record(self.request.user.id, ChangeLog.MAPPING, [mapping.pk])
+        after = (mapping.patient_id, mapping.doctor_id)
+        if after != before:
+            counts.mapping_moved(self.request.user.id, before, after)
     
+    @transaction.atomic
     def perform_destroy(self, instance):
-        # Ensure user can only delete their own mappings
-        if instance.patient.created_by != self.request.user:
-            raise serializers.ValidationError("You can only delete your own patient-doctor mappings.")
+        sync.record(self.request.user.id, ChangeLog.MAPPING, [instance.pk], deleted=True)
+        counts.mappings_removed(self.request.user.id, [(instance.patient_id, instance.doctor_id)])
         instance.delete()
+
+    @action(detail=False, methods=["post", "delete"], url_path="bulk")
+    def bulk(self, request):
+        """Create (POST) or delete (DELETE) many mappings at once"""
+        if request.method == "POST":
+            body, code = bulk_ops.bulk_create_mappings(request.user, request.data, self.get_serializer_context())
+        else:
+            body, code = bulk_ops.bulk_delete_mappings(request.user, request.data)
+        return Response(body, status=code)
+
+    @action(detail=False, methods=["get"], url_path=r"by-patient/(?P<patient_id>[0-9]+)")
+    def by_patient(self, request, patient_id):
+        """One of the user's patients, once, and a page of the doctors assigned to them"""
+        patient = patient_queryset(request.user).filter(pk=patient_id).first()
+        if patient is None:
+            raise Http404
+        if not self.paginator.wants_cursor(request):
+            self.collection_count = patient_mappings(patient.pk).count()
+        doctors = self.paginator.paginate_queryset(patient_doctors_queryset(patient.pk), request, view=self)
+        return self.by_patient_response(request, patient, doctors)
+
+    async def aby_patient(self, request, patient_id):
+        patient = await patient_queryset(request.user).filter(pk=patient_id).afirst()
+        if patient is None:
+            raise Http404
+        if not self.paginator.wants_cursor(request):
+            self.collection_count = await patient_mappings(patient.pk).acount()
+        doctors = await self.paginator.apaginate_queryset(patient_doctors_queryset(patient.pk), request, view=self)
+        return self.by_patient_response(request, patient, doctors)
+
+    def by_patient_response(self, request, patient, doctors):
+        # The rows are loaded anyway, so the validators cost no extra query
+        etag, last_modified = conditional.validators(
+            request, conditional.object_state([patient, *doctors], ("updated_at", "mapping_updated_at")),
+        )
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            context = self.get_serializer_context()
+            page = self.paginator.get_paginated_response(
+                AssignedDoctorSerializer(doctors, many=True, context=context).data,
+            )
+            response = Response({"patient": PatientSerializer(patient, context=context).data, **page.data})
+        return conditional.add_validators(response, etag, last_modified)
+
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream all of the user's mappings, joined with patient and doctor data, as NDJSON or CSV"""
+        return export_ops.export_mappings(request.user, request.accepted_renderer.format)
+
+
+class DoctorPatientsView(QueryBudgetMixin, ConditionalGetMixin, RowListMixin, AsyncReadMixin, generics.ListAPIView):
+    """Get the requesting user's patients assigned to a specific doctor"""
+    serializer_class = PatientSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SharedUserRateThrottle]
+    filter_backends = []
+    query_budget_key = "doctors-patients"
+    async_actions = ("get",)
+
+    def get_queryset(self):
+        return doctor_patients_queryset(self.request.user, self.kwargs["doctor_id"])
+
+    async def aget(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+
+class DoctorPatientsBatchView(QueryBudgetMixin, AsyncReadMixin, APIView):
+    """The requesting user's patients of many doctors in one request, grouped by doctor.
+
+    ``?ids=1,2,3`` selects the doctors and ``?limit=`` the patients returned per
+    doctor. Each group carries the doctor's full ``count``; page through the
+    rest with ``/api/doctors/<id>/patients/``.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SharedUserRateThrottle]
+    query_budget_key = "doctors-patients-batch"
+    async_actions = ("get",)
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        doctor_ids, limit = self.parse_params(request.query_params)
+        rows = list(doctor_patients_batch(request.user, doctor_ids, limit))
+        return self.grouped_response(request, doctor_ids, rows)
+
+    async def aget(self, request):
+        doctor_ids, limit = self.parse_params(request.query_params)
+        rows = [row async for row in doctor_patients_batch(request.user, doctor_ids, limit)]
+        return self.grouped_response(request, doctor_ids, rows)
+
+    def parse_params(self, query_params):
+        try:
+            doctor_ids = [int(part) for part in query_params.get("ids", "").split(",") if part.strip()]
+        except ValueError:
+            doctor_ids = []
+        if not doctor_ids:
+            raise serializers.ValidationError({"ids": "Expected a comma-separated list of integer ids."})
+        doctor_ids = list(dict.fromkeys(doctor_ids))
+        if len(doctor_ids) > settings.API_BATCH_MAX_IDS:
+            raise serializers.ValidationError({"ids": f"At most {settings.API_BATCH_MAX_IDS} ids per request."})
+        try:
+            limit = int(query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise serializers.ValidationError({"limit": "Expected an integer."})
+        if limit < 1:
+            raise serializers.ValidationError({"limit": "Must be at least 1."})
+        return doctor_ids, min(limit, self.max_limit)
+
+    def grouped_response(self, request, doctor_ids, rows):
+        # Every requested doctor gets a group, in request order, empty if none of the user's patients match
+        groups = {pk: {"doctor": pk, "count": 0, "patients": []} for pk in doctor_ids}
+        data = PatientSerializer(rows, many=True, context={"request": request}).data
+        for row, item in zip(rows, data):
+            group = groups[row.mapped_doctor_id]
+            group["count"] = row.doctor_total
+            group["patients"].append(item)
+        return Response({"results": list(groups.values())})
+
+
+class SyncView(QueryBudgetMixin, APIView):
+    """Patients and mappings changed since a cursor, with tombstones for deletes.
+
+    Without ``since`` only the current cursor is returned: take it, download
+    the lists, then sync from it. Follow ``cursor`` while ``has_more`` is true.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SharedUserRateThrottle]
+    query_budget_key = "sync"
+
+    def get(self, request):
+        since, limit = sync.parse_params(request.query_params)
+        if since is None:
+            return Response({"cursor": sync.head_cursor()})
+        try:
+            return Response(sync.changes_since(request.user, since, limit, {"request": request}))
+        except sync.CursorExpired:
+            return Response(
+                {"detail": "Cursor has expired; take a full snapshot and sync from a new cursor."},
+                status=status.HTTP_410_GONE,
+            )
+
+
+class ImportView(APIView):
+    """Upload a CSV or NDJSON file of patients, doctors or mappings.
+
+    Send the file as the raw body (``Content-Type: text/csv`` or
+    ``application/x-ndjson``) or as the ``file`` field of a multipart form.
+    The body is read as a stream and imported batch by batch.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SharedUserRateThrottle]
+    parser_classes = [MultiPartParser]
+    max_rejects = 100
+
+    def post(self, request, kind):
+        importer_class = importer.IMPORTERS.get(kind)
+        if importer_class is None:
+            return Response({"detail": f"Unknown import {kind!r}."}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.content_type.startswith("multipart/"):
+            upload = request.FILES.get("file")
+            if upload is None:
+                raise serializers.ValidationError({"file": "No file was submitted."})
+            fmt = importer.detect_format(name=upload.name, content_type=upload.content_type)
+            stream = upload
+        else:
+            # Read the raw body directly; request.data would buffer it whole
+            fmt = importer.detect_format(content_type=request.content_type)
+            stream = request.stream
+        if fmt is None:
+            raise serializers.ValidationError(
+                {"detail": "Send text/csv or application/x-ndjson, or upload a .csv / .ndjson file."}
+            )
+        if stream is None:
+            raise serializers.ValidationError({"detail": "The request body is empty."})
+
+        result = importer_class(user=request.user, max_rejects=self.max_rejects).run(
+            importer.read_records(importer.text_lines(stream), fmt)
+        )
+        if not result.read:
+            raise serializers.ValidationError({"detail": "No records found."})
+        return Response(result.as_dict(), status=importer.import_status(result))
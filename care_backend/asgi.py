@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'care_backend.settings')
+# Selects the ASGI profile in settings: async read views, no persistent DB connections
+os.environ.setdefault('SERVER_INTERFACE', 'asgi')
 
 application = get_asgi_application()
@@ -29,16 +29,22 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "api.middleware.ScopedSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.ScopedCsrfViewMiddleware",
+    "api.middleware.ScopedAuthenticationMiddleware",
+    "api.middleware.ScopedMessageMiddleware",
+    "api.middleware.ScopedXFrameOptionsMiddleware",
 ]
 
+# Paths served without the Scoped* middleware above (sessions, CSRF,
+# request.user, messages, X-Frame-Options), which only the admin's HTML pages
+# need. API_LEAN_MIDDLEWARE=False runs the full stack everywhere.
+LEAN_MIDDLEWARE_PATHS = ["/api/"] if os.getenv("API_LEAN_MIDDLEWARE", "True") == "True" else []
+
 ROOT_URLCONF = "care_backend.urls"
 
 TEMPLATES = [
@@ -59,20 +65,110 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "care_backend.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Server profile: care_backend/asgi.py sets "asgi" before loading settings;
+# manage.py and wsgi.py leave the default.
+SERVER_INTERFACE = os.getenv("SERVER_INTERFACE", "wsgi")
+
+# Database profile: "sqlite" for local development, "postgres" for production.
+# DB_POOL=pgbouncer points Django at PgBouncer (transaction pooling) instead of
+# Postgres directly; see docker-compose.yml.
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+DB_POOL = os.getenv("DB_POOL", "none")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME", "caredb"),
+            "USER": os.getenv("DB_USER", "careuser"),
+            "PASSWORD": os.getenv("DB_PASSWORD", "carepass"),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "6432" if DB_POOL == "pgbouncer" else "5432"),
+            # Keep connections open between requests instead of reconnecting each time,
+            # and check them before reuse so a restarted server doesn't surface as 500s
+            # Under ASGI each request's queries run on a short-lived thread, whose
+            # connection can't be reused, so that profile closes them instead
+            # (pool them with DB_POOL=pgbouncer)
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0 if SERVER_INTERFACE == "asgi" else 600)),
+            "CONN_HEALTH_CHECKS": True,
+            # Named server-side cursors (used by QuerySet.iterator() for large exports)
+            # don't survive PgBouncer transaction pooling outside a transaction
+            "DISABLE_SERVER_SIDE_CURSORS": DB_POOL == "pgbouncer",
+            "OPTIONS": {
+                "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", 5)),
+                "application_name": "care_backend",
+            },
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
     }
-}
 
-# Cache Configuration for Rate Limiting
+# Cache Configuration
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "unique-snowflake",
-    }
+    },
+}
+
+# Versioned response cache for global reads (api.cache). Entries and their
+# version must be shared by every worker process, or a write in one worker
+# leaves the others serving old pages: "file" shares them between workers on
+# one host, "redis" across hosts. "locmem" is per process and only meant for
+# development. File and locmem entries are culled past MAX_ENTRIES.
+RESPONSE_CACHE_BACKENDS = {
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("RESPONSE_CACHE_DIR", str(BASE_DIR / "response-cache")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000))},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/1"),
+    },
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "api-responses",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000))},
+    },
 }
+CACHES["responses"] = {
+    **RESPONSE_CACHE_BACKENDS[os.getenv(
+        "RESPONSE_CACHE_BACKEND", "redis" if os.getenv("RESPONSE_CACHE_REDIS_URL") else "file",
+    )],
+    "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300)),
+}
+# Relationship counts change with every mapping write, so they don't bump the
+# cache version: cached pages that show them (the doctor directory) expire
+# after this many seconds instead, and show counts at most this old.
+RESPONSE_CACHE_COUNT_TIMEOUT = int(os.getenv("RESPONSE_CACHE_COUNT_TIMEOUT", 30))
+
+# Rate limiting (auth views and DRF throttles). Counters must be shared by all
+# worker processes: "sqlite" shares them between workers on one host, "redis"
+# across hosts. "locmem" is per process and only meant for development.
+RATE_LIMIT_BACKENDS = {
+    "sqlite": {
+        "BACKEND": "api.ratelimit.SQLiteRateLimitBackend",
+        "OPTIONS": {"path": os.getenv("RATE_LIMIT_SQLITE_PATH", str(BASE_DIR / "ratelimit.sqlite3"))},
+    },
+    "redis": {
+        "BACKEND": "api.ratelimit.RedisRateLimitBackend",
+        "OPTIONS": {"url": os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")},
+    },
+    "locmem": {
+        "BACKEND": "api.ratelimit.LocMemRateLimitBackend",
+    },
+    # Disables rate limiting entirely; only for load testing
+    "off": {
+        "BACKEND": "api.ratelimit.DummyRateLimitBackend",
+    },
+}
+RATE_LIMIT = RATE_LIMIT_BACKENDS[os.getenv("RATE_LIMIT_BACKEND", "sqlite")]
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -81,6 +177,33 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# Password hashing (api.hashers). The policy's hasher hashes new passwords; a
+# password stored with another hasher or other costs is rehashed on the user's
+# next login. "argon2" needs the argon2-cffi package.
+PASSWORD_HASH_POLICY = os.getenv("PASSWORD_HASH_POLICY", "pbkdf2")
+PASSWORD_HASH_POLICIES = {
+    "pbkdf2": "api.hashers.PBKDF2PasswordHasher",
+    "scrypt": "api.hashers.ScryptPasswordHasher",
+    "argon2": "api.hashers.Argon2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASH_POLICIES[PASSWORD_HASH_POLICY],
+    *(path for policy, path in PASSWORD_HASH_POLICIES.items() if policy != PASSWORD_HASH_POLICY),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+# Costs; the defaults are Django 4.2's
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 600000))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR", 2 ** 14))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", 102400))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", 8))
+# Hash in this many worker processes per server process instead of on the
+# request thread (0: off). At most PASSWORD_HASH_QUEUE more hashes wait for a
+# worker; further logins and registrations get a 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Asia/Kolkata"
 USE_I18N = True
@@ -93,6 +216,8 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.getenv("ACCESS_TOKEN_LIFETIME_MIN", 15))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.getenv("REFRESH_TOKEN_LIFETIME_DAYS", 1))),
     "ROTATE_REFRESH_TOKENS": True,
+    # Done by api.tokens.RefreshToken (the refresh view's token class), not
+    # simplejwt's token_blacklist app
     "BLACKLIST_AFTER_ROTATION": True,
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
@@ -105,8 +230,22 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
+    "TOKEN_USER_CLASS": "api.authentication.ClaimsUser",
+}
+
+# "stateless" authenticates reads from the token claims alone (no user query;
+# a deleted or deactivated user can read until the access token expires) and
+# checks the user through the cached lookup before a write. "database" loads
+# the User row on every request.
+JWT_AUTH_MODE = os.getenv("JWT_AUTH_MODE", "stateless")
+JWT_AUTHENTICATION_CLASSES = {
+    "stateless": "api.authentication.ClaimsAuthentication",
+    "database": "rest_framework_simplejwt.authentication.JWTAuthentication",
 }
 
+# How long a full User loaded on demand for a stateless request stays cached
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+
 # Security Headers
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -135,10 +274,20 @@ CSRF_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Strict'
 CSRF_COOKIE_SAMESITE = 'Strict'
 
+# JSON renderer and parser. "orjson" writes and reads JSON with orjson (falling
+# back to the stdlib when it isn't installed) with the same results as "stdlib",
+# DRF's own json-module classes, except float exponents ("1e300", not "1e+300")
+# and non-finite floats, rendered as null instead of raising.
+API_JSON_BACKEND = os.getenv("API_JSON_BACKEND", "orjson")
+JSON_BACKENDS = {
+    "orjson": ("api.renderers.FastJSONRenderer", "api.parsers.FastJSONParser"),
+    "stdlib": ("rest_framework.renderers.JSONRenderer", "rest_framework.parsers.JSONParser"),
+}
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        JWT_AUTHENTICATION_CLASSES[JWT_AUTH_MODE],
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -146,17 +295,69 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "api.pagination.DefaultPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        JSON_BACKENDS[API_JSON_BACKEND][0],
     ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        JSON_BACKENDS[API_JSON_BACKEND][1],
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle"
+        "api.throttling.SharedAnonRateThrottle",
+        "api.throttling.SharedUserRateThrottle"
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/hour",
         "user": "1000/hour"
     }
-}
\ No newline at end of file
+}
+
+# Log requests over their SQL statement budget (see api.queries.QUERY_BUDGETS): off or warn
+API_QUERY_BUDGET_MODE = os.getenv("API_QUERY_BUDGET_MODE", "warn" if DEBUG else "off")
+
+# Serve list/detail reads with async views and the async ORM (api.mixins.AsyncReadMixin).
+# Only useful under an ASGI server, so on by default in that profile.
+API_ASYNC_READS = os.getenv("API_ASYNC_READS", str(SERVER_INTERFACE == "asgi")) == "True"
+
+# Render list pages from .values() rows instead of model instances (api.mixins.RowListMixin)
+API_ROW_LISTS = os.getenv("API_ROW_LISTS", "True") == "True"
+
+# Largest array accepted by the /bulk/ endpoints
+API_BULK_MAX_ITEMS = int(os.getenv("API_BULK_MAX_ITEMS", 1000))
+
+# Most doctor ids accepted by GET /api/doctors/patients/?ids=
+API_BATCH_MAX_IDS = int(os.getenv("API_BATCH_MAX_IDS", 200))
+
+# ?search= on the patient and doctor lists (api.search): "fulltext" uses the
+# tsvector (PostgreSQL) or FTS5 (SQLite) index, "basic" a LIKE scan
+API_SEARCH_MODE = os.getenv("API_SEARCH_MODE", "fulltext")
+
+# Delta sync (api.sync): change-log entries per page, and how long entries
+# must settle before they are served. Concurrent writers on PostgreSQL can
+# commit ids out of order; SQLite serializes writes, so it needs no delay.
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", 500))
+SYNC_MAX_PAGE_SIZE = 1000
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", 2 if DB_ENGINE == "postgres" else 0))
+# Entries older than this are removed by `manage.py purge_sync_changes`
+SYNC_RETENTION_DAYS = int(os.getenv("SYNC_RETENTION_DAYS", 30))
+
+# Per-request instrumentation (api.middleware.RequestTimingMiddleware)
+REQUEST_TIMING = {
+    "HEADER_SAMPLE_RATE": float(os.getenv("SERVER_TIMING_SAMPLE_RATE", 1.0 if DEBUG else 0.0)),
+    "LOG_SAMPLE_RATE": float(os.getenv("REQUEST_LOG_SAMPLE_RATE", 0.01)),
+    "SLOW_REQUEST_MS": float(os.getenv("SLOW_REQUEST_MS", 1000)),
+    "SLOW_QUERY_SAMPLES": int(os.getenv("SLOW_QUERY_SAMPLES", 3)),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.timing": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
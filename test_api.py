@@ -189,14 +189,14 @@ def test_api():
     # Test 9: Get Doctors by Patient ID
     print(f"\n9️⃣ Testing Get Doctors by Patient ID ({patient_id})...")
     try:
-        response = requests.get(f"{BASE_URL}/mappings/{patient_id}/", headers=headers)
+        response = requests.get(f"{BASE_URL}/mappings/by-patient/{patient_id}/", headers=headers)
         print(f"Status Code: {response.status_code}")
         if response.status_code == 200:
             print("✅ Retrieved doctors for patient successfully!")
             doctors = response.json()
-            print(f"Number of doctors for this patient: {len(doctors)}")
-            for doctor in doctors:
-                print(f"  - {doctor['doctor_detail']['first_name']} {doctor['doctor_detail']['last_name']} - {doctor['doctor_detail']['specialization']}")
+            print(f"Number of doctors for {doctors['patient']['first_name']}: {doctors['count']}")
+            for doctor in doctors['results']:
+                print(f"  - {doctor['first_name']} {doctor['last_name']} - {doctor['specialization']}")
         else:
             print(f"❌ Get doctors by patient failed: {response.text}")
     except Exception as e: